@@ -0,0 +1,139 @@
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+from metrics import ANALYTICS_SECONDS
+from snapshot import SnapshotCache
+
+# Distance stored for pairs with no connecting path
+UNREACHABLE = -1
+# Largest k for top-k distance matrices (k BFS runs, k x k int32 entries: 4 MB at 1000)
+MAX_TOP_K = 1000
+# Largest k rendered as an HTML table
+MAX_RENDERED_TOP_K = 100
+
+
+class PageRankCache:
+    """PageRank scores memoized on the owning graph's version counter.
+
+    A lookup on an unchanged version is O(1). After a mutation the scores are
+    recomputed on the graph's CSR snapshot with the previous vector as the
+    power-iteration start, which converges in a few iterations when only a
+    small part of the graph changed.
+    """
+
+    def __init__(self, snapshots=None, alpha=0.85, tol=1e-06):
+        self.snapshots = snapshots or SnapshotCache()
+        self.alpha = alpha
+        self.tol = tol
+        self.hits = 0
+        self.misses = 0
+        self.iterations = 0
+        self._version = None
+        self._scores = {}
+        self._ranking = []
+        self._lock = threading.Lock()
+
+    def scores(self, graph, version):
+        """Return ``{node: score}``; the dict is shared, do not mutate it."""
+        with self._lock:
+            if version != self._version:
+                self._recompute(graph, version)
+            else:
+                self.hits += 1
+            return self._scores
+
+    def ranking(self, graph, version):
+        """Return ``[(node, score), ...]`` sorted by descending score."""
+        with self._lock:
+            if version != self._version:
+                self._recompute(graph, version)
+            else:
+                self.hits += 1
+            return self._ranking
+
+    def _recompute(self, graph, version):
+        self.misses += 1
+        snapshot = self.snapshots.get(graph, version)
+        nstart = None
+        if self._scores and snapshot.number_of_nodes() > 0:
+            default = 1.0 / snapshot.number_of_nodes()
+            nstart = [self._scores.get(node, default) for node in snapshot.node_ids]
+        with ANALYTICS_SECONDS.time(analysis="pagerank"):
+            vector, self.iterations = snapshot.pagerank(self.alpha, self.tol, nstart=nstart)
+        self._scores = dict(zip(snapshot.node_ids, vector.tolist()))
+        self._ranking = sorted(self._scores.items(), key=lambda x: x[1], reverse=True)
+        self._version = version
+
+
+@dataclass(frozen=True)
+class DistanceMatrix:
+    nodes: list
+    matrix: np.ndarray
+    max_distance: int
+    mean_distance: float
+    unreachable_pairs: int
+
+
+def distance_matrix(snapshot, nodes):
+    """Pairwise hop distances between ``nodes`` with one BFS per node on ``snapshot``.
+
+    Each BFS stops once it has reached the nodes later in the list and fills
+    both halves of the symmetric matrix. Unreachable pairs hold ``UNREACHABLE``.
+    """
+    size = len(nodes)
+    matrix = np.full((size, size), UNREACHABLE, dtype=np.int32)
+    np.fill_diagonal(matrix, 0)
+    positions = np.array([snapshot.index[node] for node in nodes], dtype=np.int64)
+    for i, source in enumerate(nodes[:-1]):
+        later = positions[i + 1 :]
+        row = snapshot.bfs(source, later)[later]
+        row[row < 0] = UNREACHABLE
+        matrix[i, i + 1 :] = matrix[i + 1 :, i] = row
+
+    off_diagonal = ~np.eye(size, dtype=bool)
+    reachable = matrix[off_diagonal & (matrix != UNREACHABLE)]
+    return DistanceMatrix(
+        nodes=list(nodes),
+        matrix=matrix,
+        max_distance=int(reachable.max()) if reachable.size else 0,
+        mean_distance=float(reachable.mean()) if reachable.size else 0.0,
+        unreachable_pairs=int((matrix[off_diagonal] == UNREACHABLE).sum()),
+    )
+
+
+class DistanceMatrixCache:
+    """Distance matrices among the top-k PageRank nodes, memoized per graph version."""
+
+    def __init__(self, pagerank_cache, max_entries=4):
+        self.pagerank_cache = pagerank_cache
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def top_k(self, graph, version, k=20):
+        key = (version, k)
+        with self._lock:
+            result = self._results.get(key)
+            if result is None:
+                self.misses += 1
+                ranking = self.pagerank_cache.ranking(graph, version)
+                nodes = [node for node, _ in ranking[:k]]
+                snapshot = self.pagerank_cache.snapshots.get(graph, version)
+                with ANALYTICS_SECONDS.time(analysis="bfs_distances"):
+                    result = distance_matrix(snapshot, nodes)
+                # Entries for older versions can never be hit again
+                self._results = {
+                    cached: value
+                    for cached, value in self._results.items()
+                    if cached[0] == version
+                }
+                if len(self._results) >= self.max_entries:
+                    self._results.pop(next(iter(self._results)))
+                self._results[key] = result
+            else:
+                self.hits += 1
+            return result
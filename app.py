@@ -1,55 +1,144 @@
+import functools
 import json
+import logging
 import os
+import threading
+import time
 from datetime import datetime
 
 import networkx as nx
-from community import community_louvain
-from flask import Flask, jsonify, render_template, request
+from flask import (Flask, Response, g, jsonify, render_template, request,
+                   stream_with_context)
 
-from bedrock_helper import (enrich_node_info, invoke_bedrock_model,
-                            list_bedrock_models, query_knowledge_base)
-from database import create_database, save_graph_to_db, load_graph_from_db
+import graph_cache
+from analytics import (MAX_RENDERED_TOP_K, MAX_TOP_K, UNREACHABLE,
+                       DistanceMatrixCache, PageRankCache)
+from batch import BatchError, plan_batch
+from communities import CommunityCache
+from database import (create_database, load_graph_from_db, save_edge,
+                      save_graph_changes, save_node, update_node_attrs,
+                      update_node_attrs_many)
+from embeddings import EmbeddingIndex
+from enrichment import (DEFAULT_BATCH_SIZE, DEFAULT_CONCURRENCY, get_job,
+                        start_enrichment_job)
+from expiry import ExpiryQueue, ExpiryWorker, expiry_attributes
+from export import (MAX_PAGE_LIMIT, graph_etag, iter_node_link_json,
+                    iter_node_link_ndjson)
+from ingest import bulk_load
+from layout import LayoutCache
+from metrics import (PROFILING_ENABLED, REGISTRY, REQUEST_SECONDS,
+                     SamplingProfiler)
+from paths import LandmarkCache, bidirectional_path
+from response_cache import response_cache
+from rwlock import ReadWriteLock
+from scheduler import AnalyticsScheduler
+from search import SearchIndex
+from singleflight import SingleFlight
+from snapshot import SnapshotCache
+from subgraph import DEFAULT_MAX_EDGES, DEFAULT_MAX_NODES, k_hop
+from versions import (VersionHistory, apply_changes, edge_state, graph_changes,
+                      node_state, summarize)
+
+logger = logging.getLogger(__name__)
 
 class NeurosymbolicKnowledgeGraph:
     def __init__(self):
         self.graph = nx.Graph()
+        # Bumped on every mutation; caches key their results on it. Continues
+        # from the recorded history, so it is stable across restarts
+        self.version = 0
+        self.history = VersionHistory()
+        self._version_lock = threading.Lock()
+        self.snapshots = SnapshotCache()
+        self.pagerank_cache = PageRankCache(self.snapshots)
+        self.distance_cache = DistanceMatrixCache(self.pagerank_cache)
+        self.landmark_cache = LandmarkCache(self.snapshots)
+        self.layout_cache = LayoutCache()
+        self.community_cache = CommunityCache(self.snapshots, self.history)
+        self.search_index = SearchIndex()
+        self.embedding_index = EmbeddingIndex()
+        # Deadlines of nodes added with a TTL
+        self.expiry = ExpiryQueue()
+        self.expired = 0
+        # Writers (single edits, batches, checkouts, expiry, reset) hold it
+        # exclusively; code iterating self.graph holds it shared via reading()
+        self._graph_lock = ReadWriteLock()
+        # Concurrent enrichments of the same node share one provider call and write
+        self.enrich_flights = SingleFlight()
+
+    def reading(self):
+        """Context manager keeping writers out while ``self.graph`` is read.
+
+        Inside it ``self.graph`` and ``self.version`` stay consistent, so
+        results computed there can be keyed on that version.
+        """
+        return self._graph_lock.read()
+
+    def mark_changed(self, changes=None, message=""):
+        """Bump the version; ``changes`` (see versions.py) are recorded as its diff."""
+        with self._version_lock:
+            self.version += 1
+            if changes is not None:
+                self.history.record(self.version, changes, message)
 
     def load_graph(self, filename="knowledge_graph.json"):
-        try:
-            with open(filename, "r") as f:
-                data = json.load(f)
-            
-            # Check if the data is in the expected format
-            if "nodes" in data and "edges" in data:
-                # Create graph from nodes and edges
-                self.graph = nx.Graph()
-                for node in data["nodes"]:
-                    self.graph.add_node(node["id"], **node)
-                for edge in data["edges"]:
-                    self.graph.add_edge(edge["source"], edge["target"], **edge)
-            elif "nodes" in data and "links" in data:
-                # Use node_link_graph if the format matches
-                self.graph = nx.node_link_graph(data)
-            else:
-                print(f"Unexpected data format in {filename}. Starting with an empty graph.")
-                self.graph = nx.Graph()
+        """Load ``filename`` into memory and make the database hold the same graph.
 
-            print(f"Graph loaded from {filename}")
-            
-            # Sync the loaded graph with the database
-            save_graph_to_db(self.graph)
+        The parsed graph comes from the binary cache when the file is
+        unchanged. When the newest base in the history was loaded from the
+        same file, only the rows changed since then are rewritten (none on
+        a plain restart) instead of reloading the whole database.
+        """
+        self.version = max(self.version, self.history.latest())
+        try:
+            stat = os.stat(filename)
+            graph, digest = graph_cache.load(filename)
+            restorable = self.history.restorable_from(digest)
+            if restorable is not None:
+                if graph is None:
+                    graph, _ = bulk_load(filename, progress=None, store=False)
+                    graph_cache.save(filename, graph, digest, stat)
+                self._restore(graph, *restorable, filename)
+                return
+            # Streams the file into the graph and the database in one transaction
+            self.graph, stats = bulk_load(filename, progress=None)
+            self.mark_changed()
+            self.history.record_base(self.version, self.graph, f"load {filename}", digest)
+            graph_cache.save(filename, self.graph, digest, stat)
+            print(f"Graph loaded from {filename}: {stats}")
         except FileNotFoundError:
             print(f"File {filename} not found. Attempting to load from database.")
             self.load_graph_from_db()
-        except json.JSONDecodeError:
-            print(f"Error decoding JSON from {filename}. Starting with an empty graph.")
-            self.graph = nx.Graph()
+        except ValueError:
+            print(f"Error decoding {filename}. Starting with an empty graph.")
+            self._start_empty(f"unreadable {filename}")
         except Exception as e:
             print(f"An error occurred while loading the graph: {str(e)}. Starting with an empty graph.")
-            self.graph = nx.Graph()
+            self._start_empty(f"failed to load {filename}")
+
+    def _start_empty(self, message):
+        # Recorded like any load, so the new version is never reused for another graph
+        self.graph = nx.Graph()
+        self.mark_changed()
+        self.history.record_base(self.version, self.graph, message)
+
+    def _restore(self, graph, base, latest, filename):
+        changes = self.history.changes(latest, base)
+        self.graph = graph
+        if changes or self.version != latest:
+            save_graph_changes(changes)
+            self.mark_changed(changes, f"load {filename}")
+        else:
+            self.history.head = latest
+        print(
+            f"Graph loaded from {filename} (cached, {len(changes)} stored changes rolled back): "
+            f"{graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges"
+        )
 
     def load_graph_from_db(self):
         self.graph = load_graph_from_db()
+        self.mark_changed()
+        self.history.record_base(self.version, self.graph, "load from database")
         if self.graph.number_of_nodes() > 0:
             print("Graph loaded from database")
         else:
@@ -59,36 +148,235 @@ class NeurosymbolicKnowledgeGraph:
         return nx.node_link_data(self.graph)
 
     def get_all_nodes(self):
-        return list(self.graph.nodes)
+        with self.reading():
+            return list(self.graph.nodes)
 
-    def add_node(self, node, attributes=None, lifetime=None):
+    def add_node(self, node, attributes=None, lifetime=None, ttl_seconds=None):
         node_attrs = attributes or {}
         if lifetime:
             node_attrs['lifetime'] = lifetime
-        self.graph.add_node(node, **node_attrs)
+        if ttl_seconds:
+            # The node is removed once ``expires_at`` passes
+            node_attrs.update(expiry_attributes(ttl_seconds))
+        with self._graph_lock.write():
+            before = node_state(self.graph, node)
+            self.graph.add_node(node, **node_attrs)
+            self.mark_changed([("node", node, before, node_state(self.graph, node))])
+            self.search_index.update(node, self.graph.nodes[node])
+            self.expiry.schedule(node, self.graph.nodes[node])
+            pending = self.embedding_index.prepare([(node, self.graph.nodes[node])])
+            save_node(node, node_attrs)
+        self.embedding_index.complete(pending)
 
     def add_edge(self, node1, node2, attributes=None):
-        self.graph.add_edge(node1, node2, **attributes if attributes else {})
+        with self._graph_lock.write():
+            new_nodes = [node for node in dict.fromkeys((node1, node2)) if node not in self.graph]
+            before = edge_state(self.graph, node1, node2)
+            self.graph.add_edge(node1, node2, **attributes if attributes else {})
+            self.mark_changed(
+                [("node", node, None, {}) for node in new_nodes]
+                + [("edge", (node1, node2), before, edge_state(self.graph, node1, node2))]
+            )
+            for node in (node1, node2):
+                self.search_index.update(node, self.graph.nodes[node])
+            pending = self.embedding_index.prepare((node, self.graph.nodes[node]) for node in new_nodes)
+            save_edge(node1, node2, attributes)
+        self.embedding_index.complete(pending)
+
+    def snapshot(self):
+        """Compact CSR view of the current graph, rebuilt only after mutations."""
+        with self.reading():
+            return self.snapshots.get(self.graph, self.version)
+
+    def page_rank(self):
+        with self.reading():
+            return self.pagerank_cache.scores(self.graph, self.version)
 
     def enrich_node(self, node_name):
-        if node_name not in self.graph:
-            return {"error": f"Node '{node_name}' not found in the graph."}
+        return self.enrich_flights.do(node_name, lambda: self._enrich_node(node_name))
 
-        attributes = self.graph.nodes[node_name]
-        connections = list(self.graph.neighbors(node_name))
+    def _enrich_node(self, node_name):
+        from bedrock_helper import enrich_node_info
+
+        with self.reading():
+            if node_name not in self.graph:
+                return {"error": f"Node '{node_name}' not found in the graph."}
+            attributes = dict(self.graph.nodes[node_name])
+            connections = list(self.graph.neighbors(node_name))
         enriched_info = enrich_node_info(node_name, attributes, connections)
 
-        # Update the node with the enriched information
-        self.graph.nodes[node_name]["enriched_info"] = enriched_info.enriched_content
+        with self._graph_lock.write():
+            if node_name not in self.graph:
+                return {"error": f"Node '{node_name}' was removed while being enriched."}
+            # Update the node with the enriched information
+            before = node_state(self.graph, node_name)
+            self.graph.nodes[node_name]["enriched_info"] = enriched_info.enriched_content
+            self.mark_changed(
+                [("node", node_name, before, node_state(self.graph, node_name))], "enrich"
+            )
 
-        # Save the updated graph to the database
-        save_graph_to_db(self.graph)
+            # Persist only the changed attribute row
+            update_node_attrs(node_name, {"enriched_info": enriched_info.enriched_content})
+            pending = self.embedding_index.prepare([(node_name, self.graph.nodes[node_name])])
+        self.embedding_index.complete(pending)
 
         return {
             "original_info": str(attributes),
             "enriched_info": enriched_info.enriched_content,
         }
 
+    def apply_enrichments(self, results):
+        """Store ``[(node, enriched_content), ...]`` with one version bump and one write."""
+        pending = []
+        with self._graph_lock.write():
+            rows = [(node, content) for node, content in results if node in self.graph]
+            changes = []
+            for node, content in rows:
+                before = node_state(self.graph, node)
+                self.graph.nodes[node]["enriched_info"] = content
+                changes.append(("node", node, before, node_state(self.graph, node)))
+            if rows:
+                self.mark_changed(changes, "enrich")
+                update_node_attrs_many([(node, {"enriched_info": content}) for node, content in rows])
+                pending = self.embedding_index.prepare((node, self.graph.nodes[node]) for node, _ in rows)
+        self.embedding_index.complete(pending)
+
+    def checkout(self, version, message=None):
+        """Restore the graph to its state at ``version`` as a new version.
+
+        Only the nodes and edges that differ are rewritten, in memory and in
+        the database; returns the applied changes.
+        """
+        with self._graph_lock.write():
+            changes, pending = self._checkout(version, message)
+        self.embedding_index.complete(pending)
+        return changes
+
+    def _checkout(self, version, message=None):
+        if not self.history.exists(version):
+            raise KeyError(version)
+        if self.history.head == self.version:
+            changes = self.history.changes(self.version, version)
+        else:
+            # The in-memory graph has unrecorded changes, so diff it directly
+            changes = graph_changes(self.graph, self.history.materialize(version))
+        pending = self._apply_changes(changes, message or f"checkout {version}")
+        return changes, pending
+
+    def reset(self, filename="knowledge_graph.json"):
+        """Roll back to the graph loaded from ``filename`` at startup, or reload the file."""
+        pending = []
+        with self._graph_lock.write():
+            base = self.history.base_before(self.version)
+            if base is not None:
+                _, pending = self._checkout(base, "reset")
+            else:
+                self.graph, _ = bulk_load(filename, progress=None)
+                self.mark_changed()
+                self.history.record_base(
+                    self.version, self.graph, f"load {filename}", graph_cache.file_digest(filename)
+                )
+        self.embedding_index.complete(pending)
+
+    def _apply_changes(self, changes, message):
+        """Apply ``changes`` to the graph, its indexes and storage as one new version.
+
+        Returns the pending embeddings; pass them to ``embedding_index.complete``
+        once the write lock is released.
+        """
+        apply_changes(self.graph, changes)
+        changed = []
+        for kind, node, _, after in changes:
+            if kind == "node":
+                if after is None:
+                    self.search_index.remove(node)
+                    self.embedding_index.remove(node)
+                else:
+                    self.search_index.update(node, self.graph.nodes[node])
+                    self.expiry.schedule(node, self.graph.nodes[node])
+                    changed.append((node, self.graph.nodes[node]))
+        pending = self.embedding_index.prepare(changed)
+        save_graph_changes(changes)
+        self.mark_changed(changes, message)
+        return pending
+
+    def apply_batch(self, ops, message="batch"):
+        """Apply node/edge upserts and deletes (see batch.py) atomically as one version.
+
+        The whole batch is validated against the current graph before
+        anything changes, so an invalid operation leaves graph and storage
+        untouched; storage is written in a single transaction. Returns the
+        resulting version and the net changes.
+        """
+        pending = []
+        with self._graph_lock.write():
+            changes = plan_batch(self.graph, ops)
+            if changes:
+                pending = self._apply_changes(changes, message)
+            version = self.version
+        self.embedding_index.complete(pending)
+        return version, changes
+
+    def expire_nodes(self, now=None):
+        """Remove one batch of nodes whose TTL has passed, with their edges, as one version.
+
+        Runs before every request and periodically in the background; when
+        nothing is due it only peeks at the expiry heap, without waiting for
+        the write lock. Returns the removed nodes.
+        """
+        if not self.expiry.may_be_due(self.graph, now):
+            return []
+        with self._graph_lock.write():
+            nodes = self.expiry.due(self.graph, now)
+            if not nodes:
+                return []
+            changes = []
+            seen = set()
+            for node in nodes:
+                for neighbor in self.graph.adj[node]:
+                    edge = frozenset((node, neighbor))
+                    if edge not in seen:
+                        seen.add(edge)
+                        changes.append(("edge", (node, neighbor), edge_state(self.graph, node, neighbor), None))
+            changes.extend(("node", node, node_state(self.graph, node), None) for node in nodes)
+            pending = self._apply_changes(changes, f"expire {len(nodes)} nodes")
+            self.expired += len(nodes)
+        self.embedding_index.complete(pending)
+        return nodes
+
+def sse_response(tokens):
+    """Stream ``tokens`` as server-sent events.
+
+    Each token is a ``data: {"token": ...}`` event; a final ``done`` event
+    reports the time to first token and total time in seconds.
+    """
+    def events():
+        start = time.perf_counter()
+        first_token = None
+        for token in tokens:
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            yield f"data: {json.dumps({'token': token})}\n\n"
+        timing = {
+            "time_to_first_token": first_token,
+            "total_time": time.perf_counter() - start,
+        }
+        if first_token is None:
+            logger.info("Streamed response: no tokens, done after %.3fs", timing["total_time"])
+        else:
+            logger.info(
+                "Streamed response: first token after %.3fs, done after %.3fs",
+                first_token,
+                timing["total_time"],
+            )
+        yield f"event: done\ndata: {json.dumps(timing)}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 def create_app():
     app = Flask(__name__)
     
@@ -100,6 +388,152 @@ def create_app():
 
     kg = NeurosymbolicKnowledgeGraph()
     kg.load_graph()
+    scheduler = AnalyticsScheduler(kg)
+
+    def graph_metrics():
+        llm = response_cache.stats()
+        caches = [
+            ("llm_response", llm["hits"], llm["misses"]),
+            ("csr_snapshot", kg.snapshots.hits, kg.snapshots.misses),
+            ("pagerank", kg.pagerank_cache.hits, kg.pagerank_cache.misses),
+            ("distances", kg.distance_cache.hits, kg.distance_cache.misses),
+            ("landmarks", kg.landmark_cache.hits, kg.landmark_cache.misses),
+            (
+                "communities",
+                kg.community_cache.hits,
+                kg.community_cache.full_runs + kg.community_cache.refinements,
+            ),
+        ]
+        coalesced = [
+            ({"flight": "llm_response"}, llm["coalesced"]),
+            ({"flight": "enrichment"}, kg.enrich_flights.coalesced),
+        ]
+        return [
+            ("graph_nodes", "gauge", "Nodes in the in-memory graph.",
+             [({}, kg.graph.number_of_nodes())]),
+            ("graph_edges", "gauge", "Edges in the in-memory graph.",
+             [({}, kg.graph.number_of_edges())]),
+            ("graph_version", "gauge", "Current graph version.", [({}, kg.version)]),
+            ("graph_expiry_scheduled", "gauge",
+             "Deadlines in the expiry heap, including ones already superseded.",
+             [({}, len(kg.expiry))]),
+            ("graph_nodes_expired_total", "counter", "Nodes removed because their TTL passed.",
+             [({}, kg.expired)]),
+            ("cache_hits_total", "counter", "Lookups served from a cache.",
+             [({"cache": name}, hits) for name, hits, _ in caches]),
+            ("cache_misses_total", "counter", "Lookups that had to (re)compute.",
+             [({"cache": name}, misses) for name, _, misses in caches]),
+            ("cache_hit_ratio", "gauge", "Hits over lookups since startup.",
+             [({"cache": name}, hits / (hits + misses) if hits + misses else 0.0)
+              for name, hits, misses in caches]),
+            ("singleflight_coalesced_total", "counter",
+             "Calls that waited for an identical in-flight call instead of making their own.",
+             coalesced),
+        ]
+
+    REGISTRY.register_collector("graph", graph_metrics)
+
+    def reads_graph(view):
+        """Run ``view`` inside ``kg.reading()``: it iterates the graph, so writers must wait."""
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with kg.reading():
+                return view(*args, **kwargs)
+
+        return wrapper
+    ExpiryWorker(kg.expire_nodes).start()
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+        g.profiler = None
+        if PROFILING_ENABLED and request.headers.get("X-Profile") == "1":
+            g.profiler = SamplingProfiler().start()
+
+    @app.before_request
+    def expire_due_nodes():
+        kg.expire_nodes()
+
+    @app.after_request
+    def record_request(response):
+        """Record the request's latency; return its sampled stacks if it was profiled.
+
+        Latency is observed when the response is closed, so streamed bodies
+        are timed to their last chunk. A profiled response is consumed here,
+        inside the sampling window, and replaced by the collapsed stacks.
+        """
+        start = g.request_start
+        labels = {
+            "route": request.url_rule.rule if request.url_rule else "<unmatched>",
+            "method": request.method,
+            "status": response.status_code,
+        }
+        profiler = g.profiler
+        if profiler is not None:
+            g.profiler = None
+            response.get_data()
+            profiler.stop()
+            elapsed = time.perf_counter() - start
+            REQUEST_SECONDS.observe(elapsed, **labels)
+            return Response(
+                profiler.collapsed(),
+                mimetype="text/plain",
+                headers={
+                    "X-Profile-Status": str(response.status_code),
+                    "X-Profile-Samples": str(profiler.samples),
+                    "X-Profile-Seconds": f"{elapsed:.6f}",
+                },
+            )
+        response.call_on_close(
+            lambda: REQUEST_SECONDS.observe(time.perf_counter() - start, **labels)
+        )
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        """Prometheus text exposition of request, storage, analytics and provider metrics."""
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+    def stream_graph():
+        """Stream the graph as chunked JSON/NDJSON with a version-keyed ETag.
+
+        Query parameters: ``format=ndjson``, ``nodes=a,b,c`` (induced subgraph),
+        ``offset`` and ``limit`` (paginate nodes).
+        """
+        output_format = request.args.get("format", "json")
+        nodes = request.args.get("nodes")
+        offset = request.args.get("offset", 0, type=int)
+        limit = request.args.get("limit", type=int)
+        # Checked up front: errors raised while streaming would truncate a 200 response
+        if offset < 0:
+            return jsonify({"error": "offset must not be negative"}), 400
+        if limit is not None and not 0 < limit <= MAX_PAGE_LIMIT:
+            return jsonify({"error": f"limit must be between 1 and {MAX_PAGE_LIMIT}"}), 400
+
+        with kg.reading():
+            graph, version, index = kg.graph, kg.version, kg.snapshot().index
+        etag = graph_etag(version, output_format, nodes, offset, limit)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        if output_format == "ndjson":
+            iterate, mimetype = iter_node_link_ndjson, "application/x-ndjson"
+        else:
+            iterate, mimetype = iter_node_link_json, "application/json"
+        chunks = iterate(
+            graph,
+            index,
+            nodes=nodes.split(",") if nodes else None,
+            offset=offset,
+            limit=limit,
+            guard=kg.reading,
+        )
+        response = Response(stream_with_context(chunks), mimetype=mimetype)
+        response.set_etag(etag)
+        return response
 
     @app.route("/")
     def index():
@@ -107,57 +541,189 @@ def create_app():
 
     @app.route("/visualize")
     def visualize():
-        graph_data = kg.get_graph_data()
-        return render_template("visualize.html", graph_data=graph_data)
+        return render_template("visualize.html")
+
+    @app.route("/layout", methods=["GET"])
+    @reads_graph
+    def get_layout():
+        """Precomputed node positions; ``?since=<version>`` returns only the changes."""
+        since = request.args.get("since", type=int)
+        return jsonify(kg.layout_cache.payload(kg.graph, kg.version, since))
+
+    @app.route("/subgraph", methods=["GET"])
+    @reads_graph
+    def subgraph():
+        """Node-link JSON for the k-hop neighborhood of ``seeds``.
+
+        Query parameters: ``seeds=a,b`` (required), ``hops`` (default 1),
+        ``relations=r1,r2`` (edge relations to follow), ``max_nodes`` and
+        ``max_edges`` budgets. ``expandable`` lists returned nodes that have
+        more neighbors to fetch.
+        """
+        seeds = request.args.get("seeds")
+        if not seeds:
+            return jsonify({"error": "Missing seeds"}), 400
+        hops = request.args.get("hops", 1, type=int)
+        relations = request.args.get("relations")
+        max_nodes = min(request.args.get("max_nodes", DEFAULT_MAX_NODES, type=int), 10000)
+        max_edges = min(request.args.get("max_edges", DEFAULT_MAX_EDGES, type=int), 50000)
+
+        etag = graph_etag(kg.version, "subgraph", seeds, hops, relations, max_nodes, max_edges)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        try:
+            result = k_hop(
+                kg.graph,
+                seeds.split(","),
+                hops=hops,
+                relations=set(relations.split(",")) if relations else None,
+                max_nodes=max_nodes,
+                max_edges=max_edges,
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not result.seeds:
+            return jsonify({"error": f"None of the seeds {seeds} are in the graph."}), 404
+        response = jsonify(result.node_link_data(kg.graph))
+        response.set_etag(etag)
+        return response
+
+    @app.route("/shortest_path", methods=["GET"])
+    @reads_graph
+    def shortest_path():
+        """Shortest hop path between ``source`` and ``target``.
+
+        ``method=landmarks`` searches with the landmark distance table (built
+        once per graph version) instead of plain bidirectional BFS;
+        ``estimate=1`` returns only the table's lower/upper distance bounds.
+        """
+        source = request.args.get("source")
+        target = request.args.get("target")
+        method = request.args.get("method", "bidirectional")
+        if not source or not target:
+            return jsonify({"error": "Missing source or target"}), 400
+        if method not in ("bidirectional", "landmarks"):
+            return jsonify({"error": f"Unknown method '{method}'"}), 400
+        for node in (source, target):
+            if node not in kg.graph:
+                return jsonify({"error": f"Node '{node}' not found in the graph."}), 404
+
+        result = {"source": source, "target": target, "version": kg.version}
+        if request.args.get("estimate") == "1":
+            lower, upper = kg.landmark_cache.get(kg.graph, kg.version).bounds(source, target)
+            result.update(reachable=lower is not None, lower_bound=lower, upper_bound=upper)
+            return jsonify(result)
+
+        start = time.perf_counter()
+        if method == "landmarks":
+            path = kg.landmark_cache.get(kg.graph, kg.version).path(source, target)
+        else:
+            path = bidirectional_path(kg.graph, source, target)
+        result.update(
+            method=method,
+            path=path,
+            length=len(path) - 1 if path is not None else None,
+            elapsed_ms=round((time.perf_counter() - start) * 1000, 3),
+        )
+        return jsonify(result)
 
     @app.route("/philosophers_pagerank")
+    @reads_graph
     def philosophers_pagerank():
-        pagerank = nx.pagerank(kg.graph)
-        sorted_pagerank = sorted(pagerank.items(), key=lambda x: x[1], reverse=True)
+        sorted_pagerank = kg.pagerank_cache.ranking(kg.graph, kg.version)
         return render_template("philosophers_pagerank.html", pagerank=sorted_pagerank)
 
     @app.route("/top_nodes_distances")
+    @reads_graph
     def top_nodes_distances():
-        pagerank = nx.pagerank(kg.graph)
-        top_20_nodes = sorted(pagerank, key=pagerank.get, reverse=True)[:20]
-
-        distances = {}
-        for node1 in top_20_nodes:
-            distances[node1] = {}
-            for node2 in top_20_nodes:
-                if node1 != node2:
-                    try:
-                        distances[node1][node2] = nx.shortest_path_length(
-                            kg.graph, node1, node2
-                        )
-                    except nx.NetworkXNoPath:
-                        distances[node1][node2] = float("inf")
+        """Distances among the top-k PageRank nodes.
+
+        ``format=json`` returns the matrix for k up to ``MAX_TOP_K``; the HTML
+        table shows at most ``MAX_RENDERED_TOP_K`` nodes.
+        """
+        k = request.args.get("k", 20, type=int)
+        if k < 1:
+            return jsonify({"error": "k must be a positive integer"}), 400
+        as_json = request.args.get("format") == "json"
+        k = min(k, MAX_TOP_K if as_json else MAX_RENDERED_TOP_K)
+        result = kg.distance_cache.top_k(kg.graph, kg.version, k)
+        if as_json:
+            return jsonify({
+                "nodes": result.nodes,
+                "matrix": result.matrix.tolist(),
+                "max_distance": result.max_distance,
+                "mean_distance": result.mean_distance,
+                "unreachable_pairs": result.unreachable_pairs,
+                "unreachable": UNREACHABLE,
+                "graph_version": kg.version,
+            })
 
         return render_template(
-            "top_nodes_distances.html", nodes=top_20_nodes, distances=distances
+            "top_nodes_distances.html",
+            nodes=result.nodes,
+            distances=result.matrix.tolist(),
+            max_distance=result.max_distance,
+            mean_distance=result.mean_distance,
+            unreachable_pairs=result.unreachable_pairs,
+            unreachable=UNREACHABLE,
         )
 
+    @app.route("/communities", methods=["GET"])
+    @reads_graph
+    def communities():
+        """Louvain communities with modularity and per-community summaries.
+
+        ``top`` caps the members listed per community, ``limit`` the number
+        of summaries; ``assignment=0`` omits the node -> community map.
+        """
+        top = request.args.get("top", 5, type=int)
+        limit = request.args.get("limit", type=int)
+        state = kg.community_cache.partition(kg.graph, kg.version)
+        summaries = kg.community_cache.summaries(kg.graph, kg.version, top)
+        payload = {
+            "version": state.version,
+            "mode": state.mode,
+            "moved": state.moved,
+            "modularity": state.modularity,
+            "count": len(summaries),
+            "communities": summaries[:limit] if limit is not None else summaries,
+        }
+        if request.args.get("assignment", "1") != "0":
+            payload["assignment"] = state.assignment
+        return jsonify(payload)
+
     @app.route("/debug")
     def debug():
         debug_info = {
             "graph_nodes": len(kg.graph.nodes),
             "graph_edges": len(kg.graph.edges),
-            "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "llm_cache": response_cache.stats(),
+            "enrichment": kg.enrich_flights.stats(),
         }
         return render_template("debug.html", debug_info=debug_info)
 
     @app.route("/export_json", methods=["GET"])
     def export_json():
-        graph_data = kg.get_graph_data()
-        return jsonify(graph_data)
+        return stream_graph()
+
+    # Provider SDKs (boto3, botocore, pydantic, requests) are imported on the
+    # first request that needs them rather than at startup
 
     @app.route("/bedrock_models", methods=["GET"])
     def get_bedrock_models():
+        from bedrock_helper import list_bedrock_models
+
         models = list_bedrock_models()
         return jsonify(models)
 
     @app.route("/bedrock_invoke", methods=["POST"])
     def invoke_bedrock():
+        from bedrock_helper import invoke_bedrock_model, stream_bedrock_model
+
         data = request.json
         model_id = data.get("model_id")
         prompt = data.get("prompt")
@@ -166,49 +732,193 @@ def create_app():
         if not model_id or not prompt:
             return jsonify({"error": "Missing model_id or prompt"}), 400
 
+        if data.get("stream"):
+            return sse_response(stream_bedrock_model(model_id, prompt, system_prompt))
         response = invoke_bedrock_model(model_id, prompt, system_prompt)
         return jsonify({"response": response})
 
+    @app.route("/ollama_help", methods=["POST"])
+    def ollama_help():
+        from ollama_helper import get_ollama_help, stream_ollama_help
+
+        data = request.json
+        model_name = data.get("model")
+        prompt = data.get("prompt")
+        system_prompt = data.get("system_prompt", "")
+
+        if not model_name or not prompt:
+            return jsonify({"error": "Missing model or prompt"}), 400
+
+        if data.get("stream"):
+            return sse_response(stream_ollama_help(model_name, prompt, system_prompt))
+        return jsonify({"response": get_ollama_help(model_name, prompt, system_prompt)})
+
     @app.route("/reset_database", methods=["POST"])
     def reset_database():
         try:
-            # Load the original graph data from JSON
-            with open("knowledge_graph.json", "r") as f:
-                data = json.load(f)
-        
-                # Reset the graph
-                kg.graph = nx.Graph()
-                for node in data["nodes"]:
-                    kg.graph.add_node(node["id"], **node)
-                    for edge in data["edges"]:
-                        kg.graph.add_edge(edge["source"], edge["target"], **edge)
-        
-                # Save the reset graph to the database
-                save_graph_to_db(kg.graph)
-        
-                # Get updated graph statistics
-                node_count = kg.graph.number_of_nodes()
-                edge_count = kg.graph.number_of_edges()
-                last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-                return jsonify({
-                    "message": "Database reset to original philosophers data.",
-                    "graph_nodes": node_count,
-                    "graph_edges": edge_count,
-                    "last_updated": last_updated
-                })
+            # Roll back to the graph loaded from knowledge_graph.json at startup
+            kg.reset("knowledge_graph.json")
+
+            # Get updated graph statistics
+            node_count = kg.graph.number_of_nodes()
+            edge_count = kg.graph.number_of_edges()
+            last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            return jsonify({
+                "message": "Database reset to original philosophers data.",
+                "graph_nodes": node_count,
+                "graph_edges": edge_count,
+                "last_updated": last_updated,
+                "version": kg.version,
+            })
         except Exception as e:
             return jsonify({"error": str(e)}), 500
 
 
+    @app.route("/versions", methods=["GET"])
+    def list_versions():
+        """Recorded graph versions, newest first; page with ``limit`` and ``before``."""
+        limit = min(request.args.get("limit", 50, type=int), 1000)
+        before = request.args.get("before", type=int)
+        return jsonify({"current": kg.version, "versions": kg.history.versions(limit, before)})
+
+    @app.route("/versions/<int:version>/checkout", methods=["POST"])
+    def checkout_version(version):
+        try:
+            changes = kg.checkout(version)
+        except KeyError:
+            return jsonify({"error": f"Version {version} not found."}), 404
+        return jsonify({
+            "checked_out": version,
+            "version": kg.version,
+            "summary": summarize(changes),
+        })
+
+    @app.route("/graph/batch", methods=["POST"])
+    def graph_batch():
+        """Apply ``{"ops": [...], "message": ...}`` atomically; see ``batch.plan_batch`` for the ops.
+
+        Returns the new version (unchanged if the batch changed nothing) and
+        a summary of the net changes; an invalid op rejects the whole batch.
+        """
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "Expected a JSON object with an 'ops' list"}), 400
+        try:
+            version, changes = kg.apply_batch(data.get("ops"), str(data.get("message") or "batch"))
+        except BatchError as e:
+            return jsonify({"error": str(e), "index": e.index}), 400
+        return jsonify({
+            "version": version,
+            "operations": len(data["ops"]),
+            "summary": summarize(changes),
+        })
+
+    @app.route("/versions/diff", methods=["GET"])
+    def diff_versions():
+        """Net node/edge changes from version ``from`` to ``to`` (default: current).
+
+        ``limit`` caps the listed changes; the summary always counts all of them.
+        """
+        start = request.args.get("from", type=int)
+        end = request.args.get("to", kg.version, type=int)
+        limit = request.args.get("limit", 1000, type=int)
+        if start is None:
+            return jsonify({"error": "Missing from"}), 400
+        for version in (start, end):
+            if not kg.history.exists(version):
+                return jsonify({"error": f"Version {version} not found."}), 404
+        changes = kg.history.changes(start, end)
+        return jsonify({
+            "from": start,
+            "to": end,
+            "summary": summarize(changes),
+            "changes": [
+                {"type": kind, "key": key, "before": before, "after": after}
+                for kind, key, before, after in changes[:limit]
+            ],
+            "truncated": len(changes) > limit,
+        })
+
     @app.route("/graph_data", methods=["GET"])
     def get_graph_data():
-        return jsonify(kg.get_graph_data())
+        return stream_graph()
 
     @app.route("/get_nodes", methods=["GET"])
     def get_nodes():
         return jsonify(kg.get_all_nodes())
 
+    @app.route("/search", methods=["GET"])
+    @reads_graph
+    def search():
+        """Typeahead node search: ``q`` matches ids, labels and schools (last term as a prefix).
+
+        ``fulltext=1`` searches labels, schools and enriched info in SQLite
+        instead. Any other query argument filters on that node attribute,
+        e.g. ``school=Analytic``.
+        """
+        query = request.args.get("q", "")
+        limit = min(request.args.get("limit", 10, type=int), 100)
+        filters = {
+            key: value for key, value in request.args.items()
+            if key not in ("q", "limit", "fulltext")
+        }
+        if request.args.get("fulltext") == "1":
+            nodes = [
+                node for node in kg.search_index.fulltext(query, limit)
+                if node in kg.graph and all(
+                    str(kg.graph.nodes[node].get(key)) == value for key, value in filters.items()
+                )
+            ]
+        else:
+            nodes = kg.search_index.search(kg.graph, query, filters, limit)
+        return jsonify({
+            "query": query,
+            "results": [
+                {
+                    "id": node,
+                    "label": kg.graph.nodes[node].get("label"),
+                    "school": kg.graph.nodes[node].get("school"),
+                }
+                for node in nodes
+            ],
+        })
+
+    @app.route("/similar_nodes", methods=["GET"])
+    @reads_graph
+    def similar_nodes():
+        """Nodes with the most similar embedded text (id, label, attributes, enriched info).
+
+        ``node=a`` ranks neighbors of one node, ``nodes=a,b,c`` answers several
+        in one batched search, ``q=<text>`` ranks against free text; ``k``
+        sets the number of results (at most 100).
+        """
+        k = max(1, min(request.args.get("k", 10, type=int), 100))
+        text = request.args.get("q")
+        names = request.args.get("nodes") or request.args.get("node")
+        if text is None and not names:
+            return jsonify({"error": "Provide node, nodes or q"}), 400
+
+        def described(results):
+            return [
+                {"id": node, "label": kg.graph.nodes[node].get("label"), "score": round(score, 6)}
+                for node, score in results
+                if node in kg.graph
+            ]
+
+        if text is not None:
+            results = kg.embedding_index.similar_to_text(kg.graph, text, k)
+            return jsonify({"query": text, "results": described(results)})
+
+        nodes = list(dict.fromkeys(names.split(",")))
+        missing = [node for node in nodes if node not in kg.graph]
+        if missing:
+            return jsonify({"error": f"Nodes not found: {', '.join(missing)}"}), 404
+        results = kg.embedding_index.similar_to_nodes(kg.graph, nodes, k)
+        if "nodes" in request.args:
+            return jsonify({"results": {node: described(results[node]) for node in nodes}})
+        return jsonify({"node": nodes[0], "results": described(results[nodes[0]])})
+
     @app.route("/enrich_node", methods=["POST"])
     def enrich_node():
         data = request.json
@@ -220,8 +930,78 @@ def create_app():
         node_info = kg.enrich_node(node_name)
         return jsonify(node_info)
 
+    @app.route("/enrich_nodes", methods=["POST"])
+    def enrich_nodes():
+        """Start a background job enriching many nodes; poll ``/enrich_nodes/<job_id>``.
+
+        Without ``nodes`` every node lacking ``enriched_info`` is enriched.
+        """
+        data = request.json or {}
+        nodes = data.get("nodes")
+        if nodes is None:
+            with kg.reading():
+                nodes = [
+                    node for node, attrs in kg.graph.nodes(data=True)
+                    if "enriched_info" not in attrs
+                ]
+        try:
+            job = start_enrichment_job(
+                kg,
+                nodes,
+                concurrency=data.get("concurrency", DEFAULT_CONCURRENCY),
+                batch_size=data.get("batch_size", DEFAULT_BATCH_SIZE),
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(job.to_dict()), 202
+
+    @app.route("/enrich_nodes/<job_id>", methods=["GET"])
+    def enrich_nodes_status(job_id):
+        job = get_job(job_id)
+        if job is None:
+            return jsonify({"error": f"Job '{job_id}' not found."}), 404
+        return jsonify(job.to_dict())
+
+    @app.route("/jobs", methods=["POST"])
+    def submit_job():
+        """Queue an analysis (``pagerank``, ``distances``, ``communities`` or ``landmarks``).
+
+        Returns 200 with a finished job when the result for the current graph
+        version is already stored, else 202; poll ``/jobs/<job_id>``.
+        """
+        data = request.json or {}
+        try:
+            job = scheduler.submit(data.get("kind"), data.get("params"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify(job.to_dict()), 200 if job.finished else 202
+
+    @app.route("/jobs", methods=["GET"])
+    def list_jobs():
+        return jsonify([job.to_dict() for job in scheduler.jobs()])
+
+    @app.route("/jobs/<job_id>", methods=["GET"])
+    def job_status(job_id):
+        job = scheduler.get(job_id)
+        if job is None:
+            return jsonify({"error": f"Job '{job_id}' not found."}), 404
+        return jsonify(job.to_dict())
+
+    @app.route("/jobs/<job_id>/result", methods=["GET"])
+    def job_result(job_id):
+        job = scheduler.get(job_id)
+        if job is None:
+            return jsonify({"error": f"Job '{job_id}' not found."}), 404
+        if job.status == "failed":
+            return jsonify(dict(job.to_dict(), error=job.error)), 500
+        if not job.finished:
+            return jsonify(job.to_dict()), 202
+        return jsonify(dict(job.to_dict(), result=job.result))
+
     @app.route("/query_knowledge_base", methods=["POST"])
     def query_kb():
+        from bedrock_helper import query_knowledge_base
+
         data = request.json
         query = data.get("query")
         max_results = data.get("max_results", 5)
@@ -234,11 +1014,15 @@ def create_app():
 
     @app.route("/test_bedrock", methods=["POST"])
     def test_bedrock():
+        from bedrock_helper import invoke_bedrock_model, stream_bedrock_model
+
         data = request.json
         model_id = data.get("model_id", "anthropic.claude-v2")
         prompt = data.get("prompt", "What is the capital of France?")
         system_prompt = data.get("system_prompt", "")
 
+        if data.get("stream"):
+            return sse_response(stream_bedrock_model(model_id, prompt, system_prompt))
         response = invoke_bedrock_model(model_id, prompt, system_prompt)
         return jsonify({"response": response})
 
@@ -0,0 +1,124 @@
+from collections import defaultdict
+
+from expiry import expiry_attributes
+from versions import edge_state, fold, node_state
+
+# Largest number of operations accepted in one batch
+MAX_BATCH_OPS = 100000
+
+NODE_OPS = ("upsert_node", "delete_node")
+EDGE_OPS = ("upsert_edge", "delete_edge")
+
+
+class BatchError(ValueError):
+    """An invalid operation; nothing in the batch was applied."""
+
+    def __init__(self, index, message):
+        super().__init__(message if index is None else f"Operation {index}: {message}")
+        self.index = index
+
+
+def _node_id(op, field, index):
+    value = op.get(field)
+    if isinstance(value, bool) or not isinstance(value, (str, int)) or value == "":
+        raise BatchError(index, f"'{field}' must be a non-empty string or an integer")
+    return value
+
+
+def _attributes(op, index):
+    attributes = op.get("attributes") or {}
+    if not isinstance(attributes, dict):
+        raise BatchError(index, "'attributes' must be an object")
+    return attributes
+
+
+def plan_batch(graph, ops):
+    """Validate ``ops`` and return the net changes (see versions.py) they make to ``graph``.
+
+    The graph is not modified. Each operation is a dict:
+
+    - ``{"op": "upsert_node", "id", "attributes", "replace", "ttl_seconds"}``
+      merges ``attributes`` into the node (creating it), or replaces all of
+      them with ``replace``; ``ttl_seconds`` gives it seconds to live
+    - ``{"op": "delete_node", "id"}`` removes the node and its edges
+    - ``{"op": "upsert_edge", "source", "target", "attributes", "replace"}``
+      creates missing endpoints like ``add_edge``
+    - ``{"op": "delete_edge", "source", "target"}``
+
+    Operations apply in order, so later ones see earlier ones; deleting
+    something that does not exist is a no-op. Raises ``BatchError`` for the
+    first invalid operation.
+    """
+    if not isinstance(ops, list):
+        raise BatchError(None, "'ops' must be a list")
+    if len(ops) > MAX_BATCH_OPS:
+        raise BatchError(None, f"at most {MAX_BATCH_OPS} operations per batch")
+
+    # State as of the operations applied so far, layered over the graph
+    nodes = {}
+    edges = {}
+    # Neighbors gained through edges added by this batch
+    added_neighbors = defaultdict(set)
+    changes = []
+
+    def node_now(node):
+        return nodes[node] if node in nodes else node_state(graph, node)
+
+    def edge_now(source, target):
+        identity = frozenset((source, target))
+        return edges[identity] if identity in edges else edge_state(graph, source, target)
+
+    def set_node(node, after):
+        changes.append(("node", node, node_now(node), after))
+        nodes[node] = after
+
+    def set_edge(source, target, after):
+        changes.append(("edge", (source, target), edge_now(source, target), after))
+        edges[frozenset((source, target))] = after
+        if after is not None:
+            added_neighbors[source].add(target)
+            added_neighbors[target].add(source)
+
+    for index, op in enumerate(ops):
+        if not isinstance(op, dict):
+            raise BatchError(index, "must be an object")
+        kind = op.get("op")
+        if kind == "upsert_node":
+            node = _node_id(op, "id", index)
+            attributes = dict(_attributes(op, index))
+            if op.get("ttl_seconds") is not None:
+                try:
+                    attributes.update(expiry_attributes(op["ttl_seconds"]))
+                except (TypeError, ValueError) as e:
+                    raise BatchError(index, f"invalid ttl_seconds: {str(e)}")
+            before = node_now(node)
+            after = {} if op.get("replace") or before is None else dict(before)
+            after.update(attributes)
+            set_node(node, after)
+        elif kind == "delete_node":
+            node = _node_id(op, "id", index)
+            if node_now(node) is None:
+                continue
+            neighbors = set(graph.adj[node]) if node in graph else set()
+            for neighbor in neighbors | added_neighbors.pop(node, set()):
+                if edge_now(node, neighbor) is not None:
+                    set_edge(node, neighbor, None)
+            set_node(node, None)
+        elif kind in EDGE_OPS:
+            source = _node_id(op, "source", index)
+            target = _node_id(op, "target", index)
+            if kind == "delete_edge":
+                if edge_now(source, target) is not None:
+                    set_edge(source, target, None)
+                continue
+            attributes = _attributes(op, index)
+            for node in dict.fromkeys((source, target)):
+                if node_now(node) is None:
+                    set_node(node, {})
+            before = edge_now(source, target)
+            after = {} if op.get("replace") or before is None else dict(before)
+            after.update(attributes)
+            set_edge(source, target, after)
+        else:
+            raise BatchError(index, f"unknown op {kind!r}; expected one of {', '.join(NODE_OPS + EDGE_OPS)}")
+    return fold([changes])
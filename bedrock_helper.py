@@ -1,15 +1,16 @@
 import json
 import logging
-import os
 import time
 import traceback
-from typing import Dict, List
+from typing import Dict, Iterator, List
 
-import boto3
 from botocore.exceptions import ClientError, NoRegionError
 from pydantic import BaseModel, Field
 
+from clients import get_boto3_client
 from database import create_database, save_response
+from metrics import PROVIDER_RETRIES, provider_call
+from response_cache import cache_key, response_cache
 
 # Set up logging
 logging.basicConfig(
@@ -17,6 +18,41 @@ logging.basicConfig(
 )
 
 
+# Generation settings used by invoke_bedrock_model; part of the response cache key
+GENERATION_PARAMS = {"max_tokens": 300, "temperature": 0.7, "top_p": 0.9}
+
+KB_MODEL_ID = "amazon.titan-text-express-v1"
+KB_GENERATION_CONFIG = {
+    "maxTokenCount": 200,
+    "temperature": 0.7,
+    "topP": 1,
+    "stopSequences": [],
+}
+
+
+THROTTLING_ERROR_CODES = ("ThrottlingException", "RequestLimitExceeded")
+
+
+class ProviderThrottled(Exception):
+    """Raised when Bedrock rejects a call because of rate limiting."""
+
+
+def is_throttling_error(e: Exception) -> bool:
+    return isinstance(e, ProviderThrottled) or (
+        isinstance(e, ClientError)
+        and e.response["Error"]["Code"] in THROTTLING_ERROR_CODES
+    )
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0) -> float:
+    """Exponential backoff delay before retry number ``attempt`` (0-based)."""
+    return base_delay * (2**attempt)
+
+
+def _is_cacheable(response):
+    return isinstance(response, str) and bool(response.strip()) and not response.startswith("Error:")
+
+
 class KnowledgeBaseResult(BaseModel):
     relation: str
     source: str
@@ -30,13 +66,9 @@ class EnrichedNodeInfo(BaseModel):
 
 def list_bedrock_models():
     try:
-        client = boto3.client(
-            "bedrock",
-            aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
-            region_name=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
-        )
-        response = client.list_foundation_models()
+        client = get_boto3_client("bedrock")
+        with provider_call("Bedrock", "list_models"):
+            response = client.list_foundation_models()
         return [model["modelId"] for model in response["modelSummaries"]]
     except Exception as e:
         logging.error(f"Error listing Bedrock models: {str(e)}")
@@ -44,41 +76,52 @@ def list_bedrock_models():
 
 
 def invoke_bedrock_model(model_id: str, prompt: str, system_prompt: str = ""):
-    try:
-        client = boto3.client(
-            "bedrock-runtime",
-            aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
-            region_name=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
-        )
+    """Invoke a Bedrock model, serving repeated identical calls from the response cache."""
+    return response_cache.get_or_call(
+        "Bedrock",
+        model_id,
+        system_prompt,
+        prompt,
+        GENERATION_PARAMS,
+        lambda: _invoke_bedrock_model(model_id, prompt, system_prompt),
+        cacheable=_is_cacheable,
+    )
 
-        if model_id.startswith("anthropic."):
-            payload = {
-                "prompt": f"{system_prompt}\n\nHuman: {prompt}\n\nAssistant:",
-                "max_tokens_to_sample": 300,
-                "temperature": 0.7,
-                "top_p": 0.9,
-            }
-        elif model_id.startswith("ai21."):
-            payload = {
-                "prompt": f"{system_prompt}\n\n{prompt}",
-                "maxTokens": 300,
-                "temperature": 0.7,
-                "topP": 0.9,
-            }
-        elif model_id.startswith("amazon."):
-            payload = {
-                "inputText": f"{system_prompt}\n\n{prompt}",
-                "textGenerationConfig": {
-                    "maxTokenCount": 300,
-                    "temperature": 0.7,
-                    "topP": 0.9,
-                },
-            }
-        else:
-            raise ValueError(f"Unsupported model ID: {model_id}")
 
-        response = client.invoke_model(modelId=model_id, body=json.dumps(payload))
+def _bedrock_payload(model_id: str, prompt: str, system_prompt: str) -> Dict:
+    if model_id.startswith("anthropic."):
+        return {
+            "prompt": f"{system_prompt}\n\nHuman: {prompt}\n\nAssistant:",
+            "max_tokens_to_sample": GENERATION_PARAMS["max_tokens"],
+            "temperature": GENERATION_PARAMS["temperature"],
+            "top_p": GENERATION_PARAMS["top_p"],
+        }
+    elif model_id.startswith("ai21."):
+        return {
+            "prompt": f"{system_prompt}\n\n{prompt}",
+            "maxTokens": GENERATION_PARAMS["max_tokens"],
+            "temperature": GENERATION_PARAMS["temperature"],
+            "topP": GENERATION_PARAMS["top_p"],
+        }
+    elif model_id.startswith("amazon."):
+        return {
+            "inputText": f"{system_prompt}\n\n{prompt}",
+            "textGenerationConfig": {
+                "maxTokenCount": GENERATION_PARAMS["max_tokens"],
+                "temperature": GENERATION_PARAMS["temperature"],
+                "topP": GENERATION_PARAMS["top_p"],
+            },
+        }
+    raise ValueError(f"Unsupported model ID: {model_id}")
+
+
+def _invoke_bedrock_model(model_id: str, prompt: str, system_prompt: str = ""):
+    try:
+        client = get_boto3_client("bedrock-runtime")
+        payload = _bedrock_payload(model_id, prompt, system_prompt)
+
+        with provider_call("Bedrock", "invoke"):
+            response = client.invoke_model(modelId=model_id, body=json.dumps(payload))
         response_body = json.loads(response["body"].read())
 
         if model_id.startswith("anthropic."):
@@ -100,52 +143,152 @@ def invoke_bedrock_model(model_id: str, prompt: str, system_prompt: str = ""):
         return f"Error: {str(e)}"
 
 
+def stream_bedrock_model(
+    model_id: str, prompt: str, system_prompt: str = ""
+) -> Iterator[str]:
+    """Yield completion text as Bedrock streams it.
+
+    Uses ``invoke_model_with_response_stream`` for Anthropic and Amazon
+    models; other models (and cached prompts) yield the whole text at once.
+    On every path that ends without an error the full text is stored via
+    ``save_response``, and in the response cache only if it is non-empty.
+    """
+
+    def save(text):
+        save_response(
+            architecture_name="Neurosymbolic Knowledge Graph",
+            provider="Bedrock",
+            model=model_id,
+            user_text=prompt,
+            front_content=system_prompt,
+            back_content=text,
+            system_prompt=system_prompt,
+        )
+
+    key = cache_key("Bedrock", model_id, system_prompt, prompt, GENERATION_PARAMS)
+    cached = response_cache.get(key)
+    if cached is not None:
+        yield cached
+        save(cached)
+        return
+    if not model_id.startswith(("anthropic.", "amazon.")):
+        text = invoke_bedrock_model(model_id, prompt, system_prompt)
+        yield text
+        # invoke_bedrock_model reports failures as "Error: ..." text
+        if not text.startswith("Error:"):
+            save(text)
+        return
+
+    parts = []
+    try:
+        client = get_boto3_client("bedrock-runtime")
+        payload = _bedrock_payload(model_id, prompt, system_prompt)
+        # Times the call up to the first byte; the stream itself is paced by the client
+        with provider_call("Bedrock", "invoke_stream"):
+            response = client.invoke_model_with_response_stream(
+                modelId=model_id, body=json.dumps(payload)
+            )
+        for event in response["body"]:
+            chunk = event.get("chunk")
+            if not chunk:
+                # Errors after the first byte arrive as exception events
+                error = next((name for name in event if name.endswith("Exception")), None)
+                if error:
+                    raise RuntimeError(f"{error}: {event[error].get('message', '')}")
+                continue
+            body = json.loads(chunk["bytes"])
+            text = body.get("completion") or body.get("outputText") or ""
+            if text:
+                parts.append(text)
+                yield text
+    except Exception as e:
+        logging.error(f"Error streaming Bedrock model: {str(e)}")
+        yield f"Error: {str(e)}"
+        return
+
+    full_text = "".join(parts)
+    if _is_cacheable(full_text):
+        response_cache.put(key, "Bedrock", model_id, full_text)
+    save(full_text)
+
+
+def embed_texts(texts: List[str], model_id: str, dimensions: int) -> List[List[float]]:
+    """Embed each of ``texts`` with a Titan text embedding model."""
+    client = get_boto3_client("bedrock-runtime")
+    vectors = []
+    for text in texts:
+        payload = {"inputText": text, "dimensions": dimensions, "normalize": True}
+        with provider_call("Bedrock", "embed"):
+            response = client.invoke_model(modelId=model_id, body=json.dumps(payload))
+        vectors.append(json.loads(response["body"].read())["embedding"])
+    return vectors
+
+
 def query_bedrock_kb(query: str) -> str:
+    """Query the knowledge-base model, serving repeated queries from the response cache."""
+    return response_cache.get_or_call(
+        "Bedrock",
+        KB_MODEL_ID,
+        "",
+        query,
+        KB_GENERATION_CONFIG,
+        lambda: _query_bedrock_kb(query),
+        cacheable=_is_cacheable,
+    )
+
+
+def _query_bedrock_kb(query: str) -> str:
     try:
         # Initialize Bedrock client
-        bedrock_client = boto3.client(
-            "bedrock-runtime",
-            aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-            aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
-            region_name=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
-        )
+        bedrock_client = get_boto3_client("bedrock-runtime")
 
         # Prepare the request payload
         payload = {
             "inputText": query,
-            "textGenerationConfig": {
-                "maxTokenCount": 200,
-                "temperature": 0.7,
-                "topP": 1,
-                "stopSequences": [],
-            }
+            "textGenerationConfig": KB_GENERATION_CONFIG,
         }
 
         # Invoke the Bedrock model
-        response = bedrock_client.invoke_model(
-            modelId="amazon.titan-text-express-v1",
-            contentType="application/json",
-            accept="application/json",
-            body=json.dumps(payload),
-        )
+        with provider_call("Bedrock", "query_kb"):
+            response = bedrock_client.invoke_model(
+                modelId=KB_MODEL_ID,
+                contentType="application/json",
+                accept="application/json",
+                body=json.dumps(payload),
+            )
 
         # Parse and return the response
         response_body = json.loads(response["body"].read())
         return response_body["results"][0]["outputText"]
     except Exception as e:
+        if is_throttling_error(e):
+            raise ProviderThrottled(str(e)) from e
         logging.error(f"Error querying Bedrock knowledge base: {str(e)}")
         return f"Error: {str(e)}"
 
 
 def enrich_node_info(
-    node_name: str, attributes: Dict, connections: List[str]
+    node_name: str,
+    attributes: Dict,
+    connections: List[str],
+    raise_throttling: bool = False,
 ) -> EnrichedNodeInfo:
+    """Enrich a node via Bedrock.
+
+    Errors are reported in ``enriched_content``; with ``raise_throttling``,
+    rate-limit rejections raise ``ProviderThrottled`` so callers can back off.
+    """
     try:
         query = f"Provide additional information about the philosopher {node_name}, known for {attributes.get('school', 'philosophy')}. Include key ideas, major works, and historical context."
         bedrock_info = query_bedrock_kb(query)
 
         enriched_content = f"Additional information from Bedrock:\n{bedrock_info}\n\nOriginal Attributes: {attributes}\nConnections: {connections}"
         return EnrichedNodeInfo(enriched_content=enriched_content)
+    except ProviderThrottled:
+        if raise_throttling:
+            raise
+        logging.error(f"Throttled while enriching node info for {node_name}")
+        return EnrichedNodeInfo(enriched_content="Error enriching node info: request throttled")
     except Exception as e:
         logging.error(f"Error enriching node info for {node_name}: {str(e)}")
         return EnrichedNodeInfo(enriched_content=f"Error enriching node info: {str(e)}")
@@ -160,12 +303,7 @@ def query_knowledge_base(
 
     for attempt in range(max_retries):
         try:
-            client = boto3.client(
-                "bedrock-agent-runtime",
-                aws_access_key_id=os.environ.get("AWS_ACCESS_KEY_ID"),
-                aws_secret_access_key=os.environ.get("AWS_SECRET_ACCESS_KEY"),
-                region_name=os.environ.get("AWS_DEFAULT_REGION", "us-east-1"),
-            )
+            client = get_boto3_client("bedrock-agent-runtime")
 
             logging.info(f"Querying knowledge base with: {query}")
             payload = {
@@ -178,7 +316,8 @@ def query_knowledge_base(
 
             logging.debug(f"Bedrock API payload: {json.dumps(payload, indent=2)}")
 
-            response = client.retrieve(**payload)
+            with provider_call("Bedrock", "retrieve"):
+                response = client.retrieve(**payload)
 
             logging.info(
                 f"Successfully queried knowledge base. Results: {len(response['retrievalResults'])}"
@@ -207,10 +346,11 @@ def query_knowledge_base(
                     f"Validation error details: {e.response['Error']['Message']}"
                 )
 
-            if error_code in ["ThrottlingException", "RequestLimitExceeded"]:
+            if is_throttling_error(e):
                 if attempt < max_retries - 1:
-                    delay = base_delay * (2**attempt)
+                    delay = backoff_delay(attempt, base_delay)
                     logging.info(f"Retrying in {delay} seconds...")
+                    PROVIDER_RETRIES.inc(provider="Bedrock", operation="retrieve")
                     time.sleep(delay)
                     continue
 
@@ -220,8 +360,9 @@ def query_knowledge_base(
             logging.debug(f"Stack trace: {traceback.format_exc()}")
 
             if attempt < max_retries - 1:
-                delay = base_delay * (2**attempt)
+                delay = backoff_delay(attempt, base_delay)
                 logging.info(f"Retrying in {delay} seconds...")
+                PROVIDER_RETRIES.inc(provider="Bedrock", operation="retrieve")
                 time.sleep(delay)
                 continue
 
@@ -0,0 +1,67 @@
+"""Measure per-request latency of bare requests calls vs. the pooled provider session.
+
+Starts a local stub of the Ollama API, so no model server is needed.
+
+Usage: python benchmarks/bench_clients.py [requests]
+"""
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ollama_helper  # noqa: E402
+from clients import get_http_session  # noqa: E402
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, Nagle plus
+    # delayed ACKs adds ~40 ms to every keep-alive response
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        body = json.dumps({"models": [{"name": "stub:latest"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def measure(label, get, url, count):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        get(url, timeout=5).raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(
+        f"{label:>16}: median {statistics.median(latencies):.3f} ms, "
+        f"p95 {sorted(latencies)[int(0.95 * (count - 1))]:.3f} ms"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/tags"
+    ollama_helper.OLLAMA_API_URL = f"http://127.0.0.1:{server.server_port}/api"
+
+    measure("requests.get", requests.get, url, count)
+    measure("pooled session", get_http_session().get, url, count)
+    assert ollama_helper.get_ollama_models() == ["stub:latest"]
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Compare graph write throughput for sync-per-op and group-commit durability.
+
+Usage: python benchmarks/bench_journal.py [operations]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+def run(durability, operations):
+    database.DB_FILE = os.path.join(tempfile.mkdtemp(), f"bench_{durability}.db")
+    database.create_database()
+    database.configure_journal(durability=durability)
+
+    start = time.perf_counter()
+    for i in range(operations):
+        database.save_node(f"node-{i}", {"school": "Benchmark"})
+        if i:
+            database.save_edge(f"node-{i - 1}", f"node-{i}", {"relation": ":next"})
+    database.flush_journal()
+    elapsed = time.perf_counter() - start
+
+    writes = 2 * operations - 1
+    print(
+        f"{durability:>5}: {writes} writes in {elapsed:.3f}s "
+        f"({writes / elapsed:,.0f} writes/sec, {database.journal.commits} commits)"
+    )
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for durability in ("sync", "group"):
+        database.journal.commits = 0
+        run(durability, operations)
+
+
+if __name__ == "__main__":
+    main()
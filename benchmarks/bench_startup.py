@@ -0,0 +1,77 @@
+"""Measure app startup: import time and create_app() on a cold and a warm start.
+
+Each start runs in a fresh interpreter inside a temporary directory holding a
+synthetic knowledge_graph.json. The cold start has no database or graph cache;
+the warm starts reuse the ones the previous start left behind.
+
+Usage: python benchmarks/bench_startup.py [nodes] [--max-warm SECONDS]
+
+With ``--max-warm`` the script exits non-zero when the slowest warm start
+exceeds the limit, so it can guard against cold-start regressions in CI.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from synthetic import write_graph
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints its timings as one JSON line
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+ready = time.perf_counter()
+providers = [m for m in ("boto3", "botocore", "pydantic", "community") if m in sys.modules]
+print(json.dumps({"import": imported - start, "create_app": ready - imported, "providers": providers}))
+"""
+
+
+def start(workdir):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=workdir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    args = sys.argv[1:]
+    max_warm = None
+    if "--max-warm" in args:
+        i = args.index("--max-warm")
+        max_warm = float(args[i + 1])
+        del args[i : i + 2]
+    nodes = int(args[0]) if args else 20000
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    write_graph(os.path.join(workdir, "knowledge_graph.json"), nodes)
+
+    warm = []
+    for run in ("cold", "warm", "warm"):
+        timings = start(workdir)
+        total = timings["import"] + timings["create_app"]
+        print(
+            f"{run:>4}: import {timings['import']:.3f}s, create_app {timings['create_app']:.3f}s, "
+            f"total {total:.3f}s ({nodes} nodes; provider modules loaded: {timings['providers'] or 'none'})"
+        )
+        if run == "warm":
+            warm.append(total)
+
+    if max_warm is not None and max(warm) > max_warm:
+        print(f"Warm start took {max(warm):.3f}s, over the {max_warm:.3f}s limit")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Time graph loading, storage, serialization and analytics on synthetic scale-free graphs.
+
+Usage: python benchmarks/bench_suite.py [--sizes 1000,10000,100000] [--repeat 3]
+           [--ops pagerank,detect_communities] [--seed 0]
+           [--output benchmarks/results/latest.json]
+           [--baseline FILE] [--threshold 0.2] [--floor 0.005]
+
+Each size runs in its own temporary directory holding a generated
+knowledge_graph.json, database and graph cache. Every operation starts
+from cold caches and is repeated ``--repeat`` times; the median and
+minimum are written to ``--output`` as JSON. With ``--baseline`` the
+medians are compared to an earlier results file, and the script exits
+non-zero when an operation got more than ``--threshold`` slower (and by
+more than ``--floor`` seconds, to ignore noise on fast operations).
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from synthetic import write_graph
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import app  # noqa: E402
+import database  # noqa: E402
+import graph_cache  # noqa: E402
+from analytics import DistanceMatrixCache, PageRankCache  # noqa: E402
+from communities import CommunityCache  # noqa: E402
+from snapshot import SnapshotCache  # noqa: E402
+
+OPERATIONS = [
+    "load_graph_cold",
+    "load_graph_warm",
+    "save_graph_to_db",
+    "load_graph_from_db",
+    "graph_batch",
+    "csr_snapshot",
+    "pagerank",
+    "top_nodes_distances",
+    "detect_communities",
+    "graph_data",
+]
+
+
+def measure(operation, repeat, setup=None):
+    """Run ``operation(*setup())`` ``repeat`` times; setup time is not counted."""
+    runs = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        operation(*args)
+        runs.append(time.perf_counter() - start)
+    return {"median": statistics.median(runs), "min": min(runs), "runs": runs}
+
+
+def run_size(nodes, repeat, operations, seed):
+    workdir = tempfile.mkdtemp(prefix=f"bench_suite_{nodes}_")
+    previous = os.getcwd()
+    os.chdir(workdir)
+    try:
+        write_graph("knowledge_graph.json", nodes, seed=seed)
+        return _run_operations(repeat, operations)
+    finally:
+        database.flush_journal()
+        os.chdir(previous)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run_operations(repeat, operations):
+    results = {}
+    databases = iter(range(sys.maxsize))
+
+    def fresh_database():
+        # A new file per run: connections are cached per thread and path
+        database.flush_journal()
+        database.DB_FILE = f"bench-{next(databases)}.db"
+        database.create_database()
+        shutil.rmtree(graph_cache.CACHE_DIR, ignore_errors=True)
+        return (app.NeurosymbolicKnowledgeGraph(),)
+
+    def load(kg):
+        kg.load_graph("knowledge_graph.json")
+        database.flush_journal()
+
+    def timed(name, operation, setup=None):
+        if name in operations:
+            results[name] = measure(operation, repeat, setup)
+            print(f"  {name:<22} median {results[name]['median']:.4f}s  min {results[name]['min']:.4f}s")
+
+    # Always loaded once: the other operations run against this graph and database
+    kg = fresh_database()[0]
+    load(kg)
+    timed("load_graph_cold", load, fresh_database)
+    timed("load_graph_warm", load, lambda: (app.NeurosymbolicKnowledgeGraph(),))
+    graph, version = kg.graph, kg.version
+    print(f"  ({graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges)")
+
+    timed("save_graph_to_db", database.save_graph_to_db, lambda: (graph,))
+    timed("load_graph_from_db", database.load_graph_from_db)
+
+    # A tenth of the graph's size in new nodes, each linked to an existing one, committed to disk
+    batches = iter(range(sys.maxsize))
+
+    def batch_ops():
+        run, existing = next(batches), list(graph.nodes)
+        count = max(1, len(existing) // 10)
+        ops = [
+            {"op": "upsert_node", "id": f"batch{run}_{i}", "attributes": {"label": f"Batch {i}"}}
+            for i in range(count)
+        ]
+        ops += [
+            {"op": "upsert_edge", "source": f"batch{run}_{i}", "target": existing[i % len(existing)]}
+            for i in range(count)
+        ]
+        return (ops,)
+
+    def apply_batch(ops):
+        kg.apply_batch(ops)
+        database.flush_journal()
+
+    timed("graph_batch", apply_batch, batch_ops)
+    graph, version = kg.graph, kg.version
+
+    snapshots = SnapshotCache()
+    timed("csr_snapshot", lambda cache: cache.get(graph, version), lambda: (SnapshotCache(),))
+    snapshots.get(graph, version)
+    pagerank = PageRankCache(snapshots)
+    timed(
+        "pagerank",
+        lambda cache: cache.ranking(graph, version),
+        lambda: (PageRankCache(snapshots),),
+    )
+    pagerank.ranking(graph, version)
+    timed(
+        "top_nodes_distances",
+        lambda cache: cache.top_k(graph, version, 20),
+        lambda: (DistanceMatrixCache(pagerank),),
+    )
+    timed(
+        "detect_communities",
+        lambda cache: cache.partition(graph, version),
+        lambda: (CommunityCache(),),
+    )
+
+    if "graph_data" in operations:
+        del kg, graph, snapshots, pagerank
+        client = app.create_app().test_client()
+        timed("graph_data", lambda: client.get("/graph_data").get_data())
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold, floor):
+    """Print per-operation changes against ``baseline``; return the regressions."""
+    regressions = []
+    for size, operations in results["results"].items():
+        for name, current in operations.items():
+            previous = baseline["results"].get(size, {}).get(name)
+            if previous is None:
+                continue
+            before, after = previous["median"], current["median"]
+            ratio = after / before if before else float("inf")
+            regressed = ratio > 1 + threshold and after - before > floor
+            if regressed:
+                regressions.append((size, name, before, after))
+            print(
+                f"{size:>8} {name:<22} {before:.4f}s -> {after:.4f}s ({ratio:.2f}x)"
+                f"{'  REGRESSION' if regressed else ''}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ops", default=",".join(OPERATIONS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results", "latest.json"))
+    parser.add_argument("--baseline")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--floor", type=float, default=0.005)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    operations = set(args.ops.split(","))
+    unknown = operations - set(OPERATIONS)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+
+    results = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    for nodes in sizes:
+        print(f"{nodes} nodes:")
+        results["results"][str(nodes)] = run_size(nodes, args.repeat, operations, args.seed)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.floor)
+        if regressions:
+            print(f"{len(regressions)} operation(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Deterministic synthetic knowledge graphs for the benchmarks.
+
+Graphs are written in the same node-link layout as knowledge_graph.json,
+with ``school`` node attributes and ``relation`` edge attributes.
+"""
+import json
+import random
+
+SCHOOLS = ["Analytic", "Continental", "Existentialism", "Idealism", "Pragmatism", "Stoicism"]
+RELATIONS = [":influenced", ":critiqued", ":studied_with"]
+
+
+def scale_free_edges(nodes, edges_per_node=2, seed=0):
+    """Barabási–Albert preferential attachment: ``[(source, target), ...]`` over ``range(nodes)``.
+
+    Each new node links to ``edges_per_node`` distinct earlier nodes chosen
+    with probability proportional to their degree, giving the heavy-tailed
+    degree distribution of citation and influence graphs.
+    """
+    rng = random.Random(seed)
+    edges = []
+    # Every node appears once per incident edge, so uniform picks are degree-weighted
+    endpoints = []
+    targets = list(range(min(edges_per_node, nodes)))
+    for source in range(len(targets), nodes):
+        edges.extend((source, target) for target in targets)
+        endpoints.extend(targets)
+        endpoints.extend([source] * len(targets))
+        chosen = set()
+        while len(chosen) < min(edges_per_node, source + 1):
+            chosen.add(rng.choice(endpoints))
+        targets = sorted(chosen)
+    return edges
+
+
+def scale_free_graph(nodes, edges_per_node=2, seed=0):
+    """Node-link data for a scale-free graph of ``nodes`` philosophers."""
+    rng = random.Random(seed)
+    return {
+        "name": f"Synthetic scale-free graph ({nodes} nodes, seed {seed})",
+        "nodes": [
+            {"id": f"p{i}", "label": f"Philosopher {i}", "school": rng.choice(SCHOOLS)}
+            for i in range(nodes)
+        ],
+        "links": [
+            {"source": f"p{source}", "target": f"p{target}", "relation": rng.choice(RELATIONS)}
+            for source, target in scale_free_edges(nodes, edges_per_node, seed)
+        ],
+    }
+
+
+def write_graph(path, nodes, edges_per_node=2, seed=0):
+    with open(path, "w") as f:
+        json.dump(scale_free_graph(nodes, edges_per_node, seed), f)
@@ -0,0 +1,83 @@
+import os
+import threading
+
+import boto3
+import requests
+from botocore.config import Config
+from requests.adapters import HTTPAdapter
+
+POOL_SIZE = int(os.environ.get("PROVIDER_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.environ.get("PROVIDER_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.environ.get("PROVIDER_READ_TIMEOUT", "60"))
+# ``timeout`` for requests calls, matching the boto3 clients' settings
+HTTP_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+_boto3_clients = {}
+_boto3_lock = threading.Lock()
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_boto3_client(service):
+    """Return the process-wide boto3 client for ``service``, creating it on first use.
+
+    boto3 clients are thread-safe, so one client (and its connection pool of
+    ``POOL_SIZE``) is shared by every thread. Clients are keyed on the current
+    credentials and region so a change in the environment yields a new one.
+    """
+    region = os.environ.get("AWS_DEFAULT_REGION", "us-east-1")
+    access_key = os.environ.get("AWS_ACCESS_KEY_ID")
+    secret_key = os.environ.get("AWS_SECRET_ACCESS_KEY")
+    key = (service, region, access_key, secret_key)
+    client = _boto3_clients.get(key)
+    if client is None:
+        with _boto3_lock:
+            client = _boto3_clients.get(key)
+            if client is None:
+                client = boto3.client(
+                    service,
+                    aws_access_key_id=access_key,
+                    aws_secret_access_key=secret_key,
+                    region_name=region,
+                    config=Config(
+                        max_pool_connections=POOL_SIZE,
+                        connect_timeout=CONNECT_TIMEOUT,
+                        read_timeout=READ_TIMEOUT,
+                    ),
+                )
+                _boto3_clients[key] = client
+    return client
+
+
+def get_http_session():
+    """Return the process-wide keep-alive ``requests.Session``.
+
+    Every thread shares it, so keep-alive connections outlive the
+    per-request threads of the dev server. That is safe because nothing
+    changes the session (headers, cookies, adapters) after it is built; its
+    adapter's urllib3 pool is thread-safe and keeps up to ``POOL_SIZE``
+    connections per host.
+    """
+    global _session
+    session = _session
+    if session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+            session = _session
+    return session
+
+
+def reset_clients():
+    """Drop cached clients, e.g. after changing pool or timeout settings."""
+    global _session
+    with _boto3_lock:
+        _boto3_clients.clear()
+    with _session_lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
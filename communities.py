@@ -0,0 +1,270 @@
+import threading
+import time
+from collections import Counter, defaultdict, deque
+
+import numpy as np
+
+from metrics import ANALYTICS_SECONDS
+from snapshot import SnapshotCache
+
+
+class _CommunityStats:
+    """Per-community internal edge weight and total degree, kept current as edges and nodes change.
+
+    Modularity is ``internal / m - squares / (4 m^2)`` for the total edge
+    weight ``m``, so it updates in O(1) per changed edge or moved node
+    instead of a pass over the graph.
+    """
+
+    def __init__(self):
+        self.internal = defaultdict(float)
+        self.totals = defaultdict(float)
+        self.size = 0.0
+        self.internal_sum = 0.0
+        self.squares = 0.0
+
+    @classmethod
+    def from_graph(cls, graph, assignment, weight):
+        stats = cls()
+        for u, v, data in graph.edges(data=True):
+            stats.add_edge(assignment[u], assignment[v], data.get(weight, 1))
+        return stats
+
+    def copy(self):
+        stats = _CommunityStats()
+        stats.internal = self.internal.copy()
+        stats.totals = self.totals.copy()
+        stats.size, stats.internal_sum, stats.squares = self.size, self.internal_sum, self.squares
+        return stats
+
+    def _add_total(self, community, delta):
+        old = self.totals[community]
+        self.totals[community] = old + delta
+        self.squares += (old + delta) ** 2 - old**2
+
+    def _add_internal(self, community, delta):
+        self.internal[community] += delta
+        self.internal_sum += delta
+
+    def add_edge(self, source, target, weight):
+        """Count an edge of ``weight`` (negative to remove it) between two communities."""
+        self.size += weight
+        self._add_total(source, weight)
+        self._add_total(target, weight)
+        if source == target:
+            self._add_internal(source, weight)
+
+    def move(self, degree, loop, source_links, target_links, source, target):
+        """Move a node of ``degree`` with self-loop weight ``loop`` from ``source`` to ``target``."""
+        self._add_internal(source, -(source_links + loop))
+        self._add_internal(target, target_links + loop)
+        self._add_total(source, -degree)
+        self._add_total(target, degree)
+
+    def modularity(self):
+        if not self.size:
+            return 0.0
+        return self.internal_sum / self.size - self.squares / (4 * self.size * self.size)
+
+
+class _PartitionState:
+    def __init__(self, version, assignment, stats, mode, moved=0, next_id=None):
+        self.version = version
+        # node -> community id
+        self.assignment = assignment
+        self.stats = stats
+        self.modularity = stats.modularity()
+        # "full" or "refined"
+        self.mode = mode
+        self.moved = moved
+        # Id for the next new community
+        self.next_id = max(assignment.values(), default=-1) + 1 if next_id is None else next_id
+        self.summaries = None
+
+
+class CommunityCache:
+    """Louvain partition memoized on the graph version and refined incrementally.
+
+    With a ``history`` (see versions.py), the net changes since the cached
+    version come from the recorded diffs. After an edit touching at most
+    ``refine_fraction`` of the nodes, only the endpoints of changed edges
+    and new nodes (and, transitively, neighbors of nodes that move) are
+    re-evaluated with Louvain's local moving step, and modularity is
+    updated from the changed edges and moved nodes, so the cost follows
+    the size of the edit rather than the graph. Every other node keeps its
+    community, so ids stay stable for the views. Larger edits, or no
+    history, recompute the whole partition, warm-started from the previous
+    one. Summaries are computed on the graph's CSR snapshot.
+    """
+
+    def __init__(
+        self, snapshots=None, history=None, refine_fraction=0.05, max_passes=10, seed=0, weight="weight"
+    ):
+        self.snapshots = snapshots or SnapshotCache()
+        self.history = history
+        self.refine_fraction = refine_fraction
+        self.max_passes = max_passes
+        self.seed = seed
+        self.weight = weight
+        self.hits = 0
+        self.full_runs = 0
+        self.refinements = 0
+        self._state = None
+        self._lock = threading.Lock()
+
+    def partition(self, graph, version):
+        with self._lock:
+            if self._state is None or self._state.version != version:
+                start = time.perf_counter()
+                self._state = self._compute(graph, version, self._state)
+                ANALYTICS_SECONDS.observe(
+                    time.perf_counter() - start, analysis=f"louvain_{self._state.mode}"
+                )
+            else:
+                self.hits += 1
+            return self._state
+
+    def summaries(self, graph, version, top_members=5):
+        """Per-community size, internal edges, best-connected members and dominant school."""
+        state = self.partition(graph, version)
+        snapshot = self.snapshots.get(graph, version)
+        with self._lock:
+            if state.summaries is None or state.summaries[0] != top_members:
+                state.summaries = (top_members, self._summarize(snapshot, state.assignment, top_members))
+            return state.summaries[1]
+
+    def _compute(self, graph, version, previous):
+        if previous is None or self.history is None:
+            return self._full(graph, version, previous)
+        try:
+            changes = self.history.changes(previous.version, version)
+        except ValueError:
+            return self._full(graph, version, previous)
+
+        assignment = dict(previous.assignment)
+        stats = previous.stats.copy()
+        next_id = previous.next_id
+        affected = set()
+        removed = []
+        # Nodes that exist afterwards come first, so changed edges find both endpoints
+        for kind, key, before, after in changes:
+            if kind == "node":
+                if after is None:
+                    removed.append(key)
+                elif before is None:
+                    # New nodes start alone; local moving merges them into a neighbor's community
+                    assignment[key] = next_id
+                    next_id += 1
+                    affected.add(key)
+                continue
+            u, v = key
+            delta = self._edge_weight(after) - self._edge_weight(before)
+            if not delta:
+                continue
+            if u not in assignment or v not in assignment:
+                return self._full(graph, version, previous)
+            stats.add_edge(assignment[u], assignment[v], delta)
+            affected.update(key)
+        for node in removed:
+            assignment.pop(node, None)
+        affected.difference_update(removed)
+
+        if len(assignment) != graph.number_of_nodes() or len(affected) > self.refine_fraction * len(assignment):
+            return self._full(graph, version, previous)
+        self.refinements += 1
+        moved = self._local_moves(graph, assignment, affected, stats)
+        return _PartitionState(version, assignment, stats, "refined", moved, next_id)
+
+    def _edge_weight(self, data):
+        return 0 if data is None else data.get(self.weight, 1)
+
+    def _full(self, graph, version, previous):
+        self.full_runs += 1
+        initial = None
+        if previous is not None:
+            initial = {node: c for node, c in previous.assignment.items() if node in graph}
+            next_id = max(initial.values(), default=-1) + 1
+            for node in graph:
+                if node not in initial:
+                    initial[node] = next_id
+                    next_id += 1
+        from community import community_louvain
+
+        assignment = community_louvain.best_partition(
+            graph, partition=initial, weight=self.weight, random_state=self.seed
+        )
+        stats = _CommunityStats.from_graph(graph, assignment, self.weight)
+        return _PartitionState(version, assignment, stats, "full")
+
+    def _local_moves(self, graph, assignment, affected, stats):
+        """Louvain phase one restricted to ``affected``; returns the number of moves."""
+        total_weight = 2 * stats.size
+        if not total_weight:
+            return 0
+        totals = stats.totals
+
+        queue = deque(affected)
+        queued = set(affected)
+        budget = self.max_passes * max(len(affected), 1)
+        moved = 0
+        while queue and budget:
+            budget -= 1
+            node = queue.popleft()
+            queued.discard(node)
+            current = assignment[node]
+            degree = graph.degree(node, weight=self.weight)
+            loop = 0
+            links = defaultdict(float)
+            for neighbor, data in graph.adj[node].items():
+                if neighbor == node:
+                    loop = data.get(self.weight, 1)
+                else:
+                    links[assignment[neighbor]] += data.get(self.weight, 1)
+
+            # Gains are compared with the node taken out of its own community
+            best = current
+            best_gain = links.get(current, 0.0) - (totals[current] - degree) * degree / total_weight
+            for community, weight in links.items():
+                if community == current:
+                    continue
+                gain = weight - totals[community] * degree / total_weight
+                if gain > best_gain + 1e-12:
+                    best, best_gain = community, gain
+
+            if best != current:
+                stats.move(degree, loop, links.get(current, 0.0), links.get(best, 0.0), current, best)
+                assignment[node] = best
+                moved += 1
+                for neighbor in graph.adj[node]:
+                    if neighbor not in queued:
+                        queue.append(neighbor)
+                        queued.add(neighbor)
+        return moved
+
+    @staticmethod
+    def _summarize(snapshot, assignment, top_members):
+        members = defaultdict(list)
+        for node, community in assignment.items():
+            members[community].append(node)
+        labels = np.array([assignment[node] for node in snapshot.node_ids], dtype=np.int64)
+        # Each edge once (self-loops included), counted when both ends share a community
+        once = snapshot.rows <= snapshot.indices
+        same = once & (labels[snapshot.rows] == labels[snapshot.indices])
+        internal = Counter(labels[snapshot.rows[same]].tolist())
+        degrees = snapshot.degree()
+        school_of = snapshot.node_attribute("school")
+        summaries = []
+        for community, nodes in members.items():
+            schools = Counter(school_of[node] for node in nodes if node in school_of)
+            school, count = schools.most_common(1)[0] if schools else (None, 0)
+            top = sorted(nodes, key=degrees.get, reverse=True)[:top_members]
+            summaries.append({
+                "id": community,
+                "size": len(nodes),
+                "internal_edges": internal[community],
+                "top_members": top,
+                "dominant_school": school,
+                "dominant_school_share": count / len(nodes),
+            })
+        summaries.sort(key=lambda summary: summary["size"], reverse=True)
+        return summaries
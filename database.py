@@ -1,43 +1,718 @@
+import atexit
+import logging
 import os
+from contextlib import contextmanager
 import sqlite3
 import json
+import threading
+import time
+
 import networkx as nx
 
+from metrics import GRAPH_DB_SECONDS, JOURNAL_BATCH_SIZE, JOURNAL_FAILURES
+
+logger = logging.getLogger(__name__)
+
 DB_FILE = "knowledge_graph.db"
 
-def create_database():
-    if not os.path.exists(DB_FILE):
-        conn = sqlite3.connect(DB_FILE)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE graph_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data TEXT NOT NULL
-            )
-        """)
-        conn.commit()
-        conn.close()
+# "sync" commits (and fsyncs) every mutation before returning; "group" queues
+# mutations in the journal and commits them together, bounded by
+# GROUP_COMMIT_SIZE operations or GROUP_COMMIT_LATENCY seconds.
+DURABILITY = os.environ.get("GRAPH_DB_DURABILITY", "group")
+GROUP_COMMIT_SIZE = int(os.environ.get("GRAPH_DB_GROUP_COMMIT_SIZE", "256"))
+GROUP_COMMIT_LATENCY = float(os.environ.get("GRAPH_DB_GROUP_COMMIT_MS", "50")) / 1000
 
-def save_graph_to_db(graph):
-    conn = sqlite3.connect(DB_FILE)
+# Node attributes indexed in the node_search full-text table
+SEARCH_FIELDS = ("label", "school", "enriched_info")
+
+# PRAGMA user_version of the current layout; 1 stores node ids JSON-encoded,
+# so integer ids are not turned into strings by the TEXT columns
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+    -- Node ids (nodes.id, node_id, source, target) are JSON-encoded
+    CREATE TABLE IF NOT EXISTS nodes (
+        id TEXT PRIMARY KEY
+    );
+    CREATE TABLE IF NOT EXISTS node_attrs (
+        node_id TEXT NOT NULL REFERENCES nodes(id) ON DELETE CASCADE,
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        PRIMARY KEY (node_id, key)
+    );
+    CREATE TABLE IF NOT EXISTS edges (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        source TEXT NOT NULL REFERENCES nodes(id) ON DELETE CASCADE,
+        target TEXT NOT NULL REFERENCES nodes(id) ON DELETE CASCADE,
+        data TEXT NOT NULL DEFAULT '{}',
+        UNIQUE (source, target)
+    );
+    CREATE INDEX IF NOT EXISTS idx_edges_source ON edges (source);
+    CREATE INDEX IF NOT EXISTS idx_edges_target ON edges (target);
+    CREATE TABLE IF NOT EXISTS versioned_responses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        architecture_name TEXT NOT NULL,
+        provider TEXT NOT NULL,
+        model TEXT NOT NULL,
+        user_text TEXT NOT NULL,
+        front_content TEXT NOT NULL,
+        back_content TEXT NOT NULL,
+        system_prompt TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS response_cache (
+        key TEXT PRIMARY KEY,
+        provider TEXT NOT NULL,
+        model TEXT NOT NULL,
+        response TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_response_cache_created ON response_cache (created_at);
+    CREATE TABLE IF NOT EXISTS analytics_results (
+        kind TEXT NOT NULL,
+        params TEXT NOT NULL,
+        graph_version TEXT NOT NULL,
+        result JSON NOT NULL,
+        created_at REAL NOT NULL,
+        PRIMARY KEY (kind, params)
+    );
+    -- Stable FTS rowids for nodes (plain rowids may change on VACUUM)
+    CREATE TABLE IF NOT EXISTS node_search_ids (
+        rowid INTEGER PRIMARY KEY,
+        node_id TEXT NOT NULL UNIQUE
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS node_search USING fts5(
+        node_id UNINDEXED, label, school, enriched_info, prefix = '2 3'
+    );
+    -- Graph history: "base" versions point at a full snapshot, "diff" versions
+    -- hold JSON [[kind, key, before, after], ...] for the nodes/edges they touched
+    CREATE TABLE IF NOT EXISTS graph_versions (
+        version INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        message TEXT NOT NULL DEFAULT '',
+        changes TEXT,
+        snapshot TEXT REFERENCES graph_snapshots(digest),
+        created_at REAL NOT NULL
+    );
+    -- zlib-compressed node-link JSON, shared by bases with the same content
+    CREATE TABLE IF NOT EXISTS graph_snapshots (
+        digest TEXT PRIMARY KEY,
+        data BLOB NOT NULL
+    );
+"""
+
+
+_local = threading.local()
+
+
+def _connect(synchronous="NORMAL"):
+    """Return this thread's long-lived WAL connection to ``DB_FILE``."""
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    key = (DB_FILE, synchronous)
+    conn = connections.get(key)
+    if conn is None:
+        conn = sqlite3.connect(DB_FILE, timeout=30)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(f"PRAGMA synchronous = {synchronous}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        connections[key] = conn
+    return conn
+
+
+def create_database():
+    conn = _connect()
     cursor = conn.cursor()
-    graph_data = json.dumps(nx.node_link_data(graph))
-    cursor.execute("INSERT OR REPLACE INTO graph_data (id, data) VALUES (1, ?)", (graph_data,))
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'nodes')")
+    existing = cursor.fetchone()[0]
+    conn.executescript(SCHEMA)
     conn.commit()
-    conn.close()
+    cursor.execute("PRAGMA user_version")
+    if cursor.fetchone()[0] < SCHEMA_VERSION:
+        if existing:
+            migrate_node_ids(conn)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    migrate_graph_blob(conn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM node_search_ids)")
+    if not cursor.fetchone()[0]:
+        # Databases created before the search table existed
+        with conn:
+            _reindex_search(cursor)
 
-def load_graph_from_db():
-    conn = sqlite3.connect(DB_FILE)
+
+def migrate_node_ids(conn):
+    """JSON-encode the node ids of a database written with raw TEXT ids.
+
+    Such databases already stored integer ids as strings, so every
+    existing id is migrated as a string.
+    """
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        with conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE nodes SET id = json_quote(id)")
+            cursor.execute("UPDATE node_attrs SET node_id = json_quote(node_id)")
+            cursor.execute("UPDATE edges SET source = json_quote(source), target = json_quote(target)")
+            _reindex_search(cursor)
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+    logger.info("Migrated node ids to JSON-encoded storage")
+
+
+def migrate_graph_blob(conn):
+    """Move the legacy single-row ``graph_data`` JSON blob into the node/edge tables.
+
+    Runs once: the blob table is dropped after a successful migration.
+    """
     cursor = conn.cursor()
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'graph_data'"
+    )
+    if cursor.fetchone() is None:
+        return
+
     cursor.execute("SELECT data FROM graph_data WHERE id = 1")
     result = cursor.fetchone()
-    conn.close()
-    
-    if result:
-        graph_data = json.loads(result[0])
-        return nx.node_link_graph(graph_data)
+    with conn:
+        if result:
+            graph = nx.node_link_graph(json.loads(result[0]))
+            _replace_graph(cursor, graph)
+        cursor.execute("DROP TABLE graph_data")
+    logger.info("Migrated legacy graph_data blob to normalized tables")
+
+
+def _encode(value):
+    return json.dumps(value)
+
+
+def _edge_where():
+    # Graphs are undirected, so an edge may have been stored in either orientation
+    return "(source = ? AND target = ?) OR (source = ? AND target = ?)"
+
+
+def _search_rows(where):
+    columns = ",\n".join(
+        f"MAX(CASE WHEN a.key = '{field}' THEN json_extract(a.value, '$') END)"
+        for field in SEARCH_FIELDS
+    )
+    keys = ", ".join(f"'{field}'" for field in SEARCH_FIELDS)
+    return f"""
+        SELECT s.rowid, s.node_id, {columns}
+        FROM node_search_ids s JOIN node_attrs a ON a.node_id = s.node_id
+        WHERE a.key IN ({keys}) {where}
+        GROUP BY s.node_id
+    """
+
+
+_SEARCH_INSERT = f"INSERT INTO node_search (rowid, node_id, {', '.join(SEARCH_FIELDS)})"
+
+
+def _reindex_search(cursor, nodes=None):
+    """Rebuild the full-text rows of ``nodes``, or of every node when None."""
+    keys = ", ".join(f"'{field}'" for field in SEARCH_FIELDS)
+    if nodes is None:
+        cursor.execute("DELETE FROM node_search")
+        cursor.execute("DELETE FROM node_search_ids")
+        cursor.execute(
+            f"INSERT INTO node_search_ids (node_id) "
+            f"SELECT DISTINCT node_id FROM node_attrs WHERE key IN ({keys})"
+        )
+        cursor.execute(f"{_SEARCH_INSERT} {_search_rows('')}")
+        return
+    # One grouped insert over a temp table of ids: per-node inserts are far slower for batches
+    rows = [(node,) for node in nodes]
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS reindex_ids (node_id PRIMARY KEY)")
+    cursor.executemany("INSERT OR IGNORE INTO temp.reindex_ids (node_id) VALUES (?)", rows)
+    cursor.execute(
+        "DELETE FROM node_search WHERE rowid IN "
+        "(SELECT s.rowid FROM node_search_ids s JOIN temp.reindex_ids r ON r.node_id = s.node_id)"
+    )
+    cursor.execute("INSERT OR IGNORE INTO node_search_ids (node_id) SELECT node_id FROM temp.reindex_ids")
+    cursor.execute(
+        f"{_SEARCH_INSERT} {_search_rows('AND s.node_id IN (SELECT node_id FROM temp.reindex_ids)')}"
+    )
+    cursor.execute("DELETE FROM temp.reindex_ids")
+
+
+def _upsert_node(cursor, node, attributes):
+    node = _encode(node)
+    cursor.execute("INSERT OR IGNORE INTO nodes (id) VALUES (?)", (node,))
+    cursor.executemany(
+        "INSERT OR REPLACE INTO node_attrs (node_id, key, value) VALUES (?, ?, ?)",
+        [(node, key, _encode(value)) for key, value in attributes.items()],
+    )
+    if any(field in attributes for field in SEARCH_FIELDS):
+        _reindex_search(cursor, [node])
+
+
+def _upsert_edge(cursor, source, target, attributes):
+    source, target = _encode(source), _encode(target)
+    cursor.execute("INSERT OR IGNORE INTO nodes (id) VALUES (?)", (source,))
+    cursor.execute("INSERT OR IGNORE INTO nodes (id) VALUES (?)", (target,))
+    cursor.execute(
+        f"SELECT source, target, data FROM edges WHERE {_edge_where()}",
+        (source, target, target, source),
+    )
+    existing = cursor.fetchone()
+    if existing:
+        data = json.loads(existing[2])
+        data.update(attributes)
+        cursor.execute(
+            "UPDATE edges SET data = ? WHERE source = ? AND target = ?",
+            (_encode(data), existing[0], existing[1]),
+        )
     else:
-        return nx.Graph()
+        cursor.execute(
+            "INSERT INTO edges (source, target, data) VALUES (?, ?, ?)",
+            (source, target, _encode(attributes)),
+        )
+
+
+def _upsert_nodes(cursor, rows):
+    for node, attributes in rows:
+        _upsert_node(cursor, node, attributes)
+
+
+def _delete_node(cursor, node):
+    node = _encode(node)
+    cursor.execute(
+        "DELETE FROM node_search WHERE rowid = (SELECT rowid FROM node_search_ids WHERE node_id = ?)",
+        (node,),
+    )
+    cursor.execute("DELETE FROM node_search_ids WHERE node_id = ?", (node,))
+    cursor.execute("DELETE FROM edges WHERE source = ? OR target = ?", (node, node))
+    cursor.execute("DELETE FROM node_attrs WHERE node_id = ?", (node,))
+    cursor.execute("DELETE FROM nodes WHERE id = ?", (node,))
+
+
+def _delete_edge(cursor, source, target):
+    source, target = _encode(source), _encode(target)
+    cursor.execute(
+        f"DELETE FROM edges WHERE {_edge_where()}", (source, target, target, source)
+    )
+
+
+def _apply_graph_changes(cursor, changes):
+    """Write ``[(kind, key, before, after), ...]``, replacing each node/edge with ``after``.
+
+    Statements are batched per kind, so large change sets (batch writes,
+    checkouts) cost a handful of ``executemany`` calls. Kept nodes are
+    written before edges and deleted nodes after them, matching the order
+    of ``versions`` change lists.
+    """
+    nodes = [(_encode(key), after) for kind, key, _, after in changes if kind == "node" and after is not None]
+    deleted = [_encode(key) for kind, key, _, after in changes if kind == "node" and after is None]
+    edges = [
+        ((_encode(key[0]), _encode(key[1])), after) for kind, key, _, after in changes if kind == "edge"
+    ]
+
+    cursor.executemany("INSERT OR IGNORE INTO nodes (id) VALUES (?)", [(node,) for node, _ in nodes])
+    cursor.executemany("DELETE FROM node_attrs WHERE node_id = ?", [(node,) for node, _ in nodes])
+    cursor.executemany(
+        "INSERT INTO node_attrs (node_id, key, value) VALUES (?, ?, ?)",
+        [(node, key, _encode(value)) for node, attributes in nodes for key, value in attributes.items()],
+    )
+    _reindex_search(cursor, [node for node, _ in nodes])
+
+    cursor.executemany(
+        f"DELETE FROM edges WHERE {_edge_where()}",
+        [(source, target, target, source) for (source, target), _ in edges],
+    )
+    cursor.executemany(
+        "INSERT INTO edges (source, target, data) VALUES (?, ?, ?)",
+        [(source, target, _encode(after)) for (source, target), after in edges if after is not None],
+    )
+
+    rows = [(node,) for node in deleted]
+    cursor.executemany(
+        "DELETE FROM node_search WHERE rowid = (SELECT rowid FROM node_search_ids WHERE node_id = ?)",
+        rows,
+    )
+    cursor.executemany("DELETE FROM node_search_ids WHERE node_id = ?", rows)
+    cursor.executemany("DELETE FROM edges WHERE source = ? OR target = ?", [(node, node) for node in deleted])
+    cursor.executemany("DELETE FROM node_attrs WHERE node_id = ?", rows)
+    cursor.executemany("DELETE FROM nodes WHERE id = ?", rows)
+
+
+def _replace_graph(cursor, graph):
+    cursor.execute("DELETE FROM edges")
+    cursor.execute("DELETE FROM node_attrs")
+    cursor.execute("DELETE FROM nodes")
+    cursor.executemany("INSERT INTO nodes (id) VALUES (?)", [(_encode(n),) for n in graph.nodes])
+    cursor.executemany(
+        "INSERT INTO node_attrs (node_id, key, value) VALUES (?, ?, ?)",
+        [
+            (_encode(node), key, _encode(value))
+            for node, attrs in graph.nodes(data=True)
+            for key, value in attrs.items()
+        ],
+    )
+    cursor.executemany(
+        "INSERT INTO edges (source, target, data) VALUES (?, ?, ?)",
+        [(_encode(u), _encode(v), _encode(attrs)) for u, v, attrs in graph.edges(data=True)],
+    )
+    _reindex_search(cursor)
+
+
+def _insert_response(cursor, *fields):
+    cursor.execute(
+        """
+        INSERT INTO versioned_responses
+        (architecture_name, provider, model, user_text, front_content, back_content, system_prompt)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+        fields,
+    )
+
+
+def _put_cached_response(cursor, key, provider, model, response, created_at):
+    cursor.execute(
+        """
+        INSERT OR REPLACE INTO response_cache (key, provider, model, response, created_at)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+        (key, provider, model, response, created_at),
+    )
+
+
+def _prune_cached_responses(cursor, expires_before, max_entries):
+    cursor.execute("DELETE FROM response_cache WHERE created_at < ?", (expires_before,))
+    cursor.execute(
+        """
+        DELETE FROM response_cache WHERE key IN (
+            SELECT key FROM response_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+        )
+    """,
+        (max_entries,),
+    )
+
+
+def _put_analytics_result(cursor, kind, params, graph_version, result, created_at):
+    cursor.execute(
+        """
+        INSERT OR REPLACE INTO analytics_results (kind, params, graph_version, result, created_at)
+        VALUES (?, ?, ?, ?, ?)
+    """,
+        (kind, params, graph_version, result, created_at),
+    )
+
+
+def _record_graph_version(cursor, version, kind, message, changes, snapshot, created_at):
+    cursor.execute(
+        """
+        INSERT OR REPLACE INTO graph_versions (version, kind, message, changes, snapshot, created_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """,
+        (version, kind, message, changes, snapshot, created_at),
+    )
+
+
+def _put_graph_snapshot(cursor, digest, data):
+    cursor.execute(
+        "INSERT OR IGNORE INTO graph_snapshots (digest, data) VALUES (?, ?)", (digest, data)
+    )
+
+
+_OPERATIONS = {
+    "upsert_node": _upsert_node,
+    "upsert_nodes": _upsert_nodes,
+    "delete_node": _delete_node,
+    "upsert_edge": _upsert_edge,
+    "delete_edge": _delete_edge,
+    "apply_graph_changes": _apply_graph_changes,
+    "record_graph_version": _record_graph_version,
+    "put_graph_snapshot": _put_graph_snapshot,
+    "insert_response": _insert_response,
+    "put_cached_response": _put_cached_response,
+    "prune_cached_responses": _prune_cached_responses,
+    "put_analytics_result": _put_analytics_result,
+}
+
+
+class JournalError(RuntimeError):
+    """A queued mutation batch could not be committed by the background flusher."""
+
+
+class MutationJournal:
+    """In-process write-ahead queue that applies mutations in group commits.
+
+    With ``durability="sync"`` every submitted operation is committed before
+    ``submit`` returns. With ``durability="group"`` operations are queued and
+    a background flusher commits them in one transaction once ``max_batch``
+    operations are pending or the oldest has waited ``max_latency`` seconds.
+
+    A batch that fails with ``sqlite3.OperationalError`` (locked or busy
+    database, I/O) is put back and retried; any other failure drops the
+    batch. A failure is logged and counted once, where it happens, and
+    raised as ``JournalError`` from the next ``flush`` (a writer's).
+    Readers call ``catch_up`` instead, which never raises: they read what
+    is committed rather than fail with a write error they did not cause.
+    """
+
+    def __init__(
+        self,
+        durability=DURABILITY,
+        max_batch=GROUP_COMMIT_SIZE,
+        max_latency=GROUP_COMMIT_LATENCY,
+    ):
+        self.durability = durability
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.operations = 0
+        self.commits = 0
+        self._pending = []
+        self._oldest = None
+        self._cond = threading.Condition()
+        # Held while a batch is taken off the queue and committed, so batches
+        # reach the database in submission order
+        self._commit_lock = threading.Lock()
+        self._flusher = None
+        # Last failure not yet reported to a writer, raised by the next flush()
+        self._error = None
+
+    def submit(self, operation, *args):
+        if self.durability == "sync":
+            with self._commit_lock:
+                self._apply([(operation, args)], synchronous="FULL")
+            return
+
+        with self._cond:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((operation, args))
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._run, name="graph-db-journal", daemon=True
+                )
+                self._flusher.start()
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify()
+
+    def flush(self):
+        """Commit everything queued so far; returns once it is on disk."""
+        self._commit_pending()
+        with self._cond:
+            error, self._error = self._error, None
+        if error is not None:
+            raise JournalError(f"A queued graph journal batch failed to commit: {str(error)}") from error
+
+    def catch_up(self):
+        """Commit everything queued so far before a read, keeping failures for ``flush``."""
+        try:
+            self._commit_pending()
+        except Exception as e:
+            self._failed(e)
+
+    def _failed(self, error):
+        logger.error("Error committing graph journal batch", exc_info=error)
+        JOURNAL_FAILURES.inc()
+        with self._cond:
+            self._error = error
+
+    def _commit_pending(self):
+        with self._commit_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                self._apply(batch)
+            except sqlite3.OperationalError:
+                with self._cond:
+                    self._pending[:0] = batch
+                    self._oldest = time.monotonic()
+                raise
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                while len(self._pending) < self.max_batch:
+                    remaining = self._oldest + self.max_latency - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            try:
+                self._commit_pending()
+            except Exception as e:
+                self._failed(e)
+
+    def _apply(self, batch, synchronous="NORMAL"):
+        conn = _connect(synchronous)
+        with GRAPH_DB_SECONDS.time(operation="journal_commit"), conn:
+            cursor = conn.cursor()
+            for operation, args in batch:
+                _OPERATIONS[operation](cursor, *args)
+        JOURNAL_BATCH_SIZE.observe(len(batch))
+        self.operations += len(batch)
+        self.commits += 1
+
+
+journal = MutationJournal()
+atexit.register(journal.flush)
+
+
+def configure_journal(durability=None, max_batch=None, max_latency=None):
+    """Flush pending mutations and change the journal's commit policy."""
+    journal.flush()
+    if durability is not None:
+        journal.durability = durability
+    if max_batch is not None:
+        journal.max_batch = max_batch
+    if max_latency is not None:
+        journal.max_latency = max_latency
+
+
+def flush_journal():
+    journal.flush()
+
+
+def save_graph_to_db(graph):
+    """Replace the stored graph with ``graph``.
+
+    Only needed for bulk loads; single mutations should use ``save_node``,
+    ``update_node_attrs``, ``save_edge`` and the ``delete_*`` functions,
+    which touch only the affected rows.
+    """
+    journal.flush()
+    conn = _connect()
+    with GRAPH_DB_SECONDS.time(operation="save_graph"), conn:
+        _replace_graph(conn.cursor(), graph)
+
+
+class BulkWriter:
+    """Batch inserts inside the single transaction opened by ``bulk_writer``."""
+
+    def __init__(self, cursor, replace):
+        self.cursor = cursor
+        self.replace = replace
+        # Nodes whose search rows need rebuilding when appending
+        self.searchable = set()
+
+    def nodes(self, rows):
+        """Write ``[(node, attributes), ...]``; attributes are merged into existing nodes."""
+        rows = [(_encode(node), attributes) for node, attributes in rows]
+        if not self.replace:
+            self.searchable.update(
+                node for node, attributes in rows
+                if any(field in attributes for field in SEARCH_FIELDS)
+            )
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO nodes (id) VALUES (?)", [(node,) for node, _ in rows]
+        )
+        self.cursor.executemany(
+            "INSERT OR REPLACE INTO node_attrs (node_id, key, value) VALUES (?, ?, ?)",
+            [
+                (node, key, _encode(value))
+                for node, attributes in rows
+                for key, value in attributes.items()
+            ],
+        )
+
+    def edges(self, rows):
+        """Write ``[(source, target, attributes), ...]`` with the edge's full attributes."""
+        if not self.replace:
+            # Existing rows may be stored in the opposite orientation
+            for source, target, attributes in rows:
+                _upsert_edge(self.cursor, source, target, attributes)
+            return
+        self.cursor.executemany(
+            "INSERT OR IGNORE INTO nodes (id) VALUES (?)",
+            [(_encode(node),) for source, target, _ in rows for node in (source, target)],
+        )
+        self.cursor.executemany(
+            """
+            INSERT INTO edges (source, target, data) VALUES (?, ?, ?)
+            ON CONFLICT (source, target) DO UPDATE SET data = excluded.data
+        """,
+            [
+                (_encode(source), _encode(target), _encode(attributes))
+                for source, target, attributes in rows
+            ],
+        )
+
+
+@contextmanager
+def bulk_writer(replace=False):
+    """Open one transaction for a bulk load, optionally clearing the stored graph first.
+
+    Foreign-key checks are suspended for the load (the writer inserts edge
+    endpoints itself). When replacing, the secondary edge indexes and the
+    full-text search rows are dropped and rebuilt once at the end, which is
+    much cheaper than maintaining them row by row.
+    """
+    journal.flush()
+    conn = _connect()
+    conn.execute("PRAGMA foreign_keys = OFF")
+    try:
+        with GRAPH_DB_SECONDS.time(operation="bulk_load"), conn:
+            cursor = conn.cursor()
+            if replace:
+                cursor.execute("DROP INDEX IF EXISTS idx_edges_source")
+                cursor.execute("DROP INDEX IF EXISTS idx_edges_target")
+                cursor.execute("DELETE FROM edges")
+                cursor.execute("DELETE FROM node_attrs")
+                cursor.execute("DELETE FROM nodes")
+            writer = BulkWriter(cursor, replace)
+            yield writer
+            if replace:
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_edges_source ON edges (source)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_edges_target ON edges (target)")
+                _reindex_search(cursor)
+            elif writer.searchable:
+                _reindex_search(cursor, writer.searchable)
+    finally:
+        conn.execute("PRAGMA foreign_keys = ON")
+
+
+def load_graph_from_db():
+    journal.catch_up()
+    conn = _connect()
+    cursor = conn.cursor()
+    graph = nx.Graph()
+    with GRAPH_DB_SECONDS.time(operation="load_graph"):
+        cursor.execute("SELECT id FROM nodes")
+        graph.add_nodes_from(json.loads(row[0]) for row in cursor.fetchall())
+        cursor.execute("SELECT node_id, key, value FROM node_attrs")
+        for node, key, value in cursor.fetchall():
+            graph.nodes[json.loads(node)][key] = json.loads(value)
+        cursor.execute("SELECT source, target, data FROM edges")
+        for source, target, data in cursor.fetchall():
+            graph.add_edge(json.loads(source), json.loads(target), **json.loads(data))
+    return graph
+
+
+def save_node(node, attributes=None):
+    """Insert a node, or merge ``attributes`` into an existing one."""
+    journal.submit("upsert_node", node, dict(attributes or {}))
+
+
+def update_node_attrs(node, attributes):
+    """Upsert only the given attribute rows of ``node``."""
+    save_node(node, attributes)
+
+
+def update_node_attrs_many(rows):
+    """Upsert ``[(node, attributes), ...]`` as one journal operation, so one transaction."""
+    journal.submit("upsert_nodes", [(node, dict(attributes)) for node, attributes in rows])
+
+
+def delete_node(node):
+    """Delete a node together with its attributes and incident edges."""
+    journal.submit("delete_node", node)
+
+
+def save_edge(source, target, attributes=None):
+    """Insert an edge, or merge ``attributes`` into an existing one."""
+    journal.submit("upsert_edge", source, target, dict(attributes or {}))
+
+
+def delete_edge(source, target):
+    journal.submit("delete_edge", source, target)
+
 
 def save_response(
     architecture_name,
@@ -48,23 +723,145 @@ def save_response(
     back_content,
     system_prompt,
 ):
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
+    journal.submit(
+        "insert_response",
+        architecture_name,
+        provider,
+        model,
+        user_text,
+        front_content,
+        back_content,
+        system_prompt,
+    )
+
+
+def get_cached_response(key):
+    """Return ``(response, created_at)`` for a cache key, or None."""
+    journal.catch_up()
+    cursor = _connect().cursor()
+    cursor.execute("SELECT response, created_at FROM response_cache WHERE key = ?", (key,))
+    return cursor.fetchone()
+
+
+def put_cached_response(key, provider, model, response, created_at):
+    journal.submit("put_cached_response", key, provider, model, response, created_at)
+
+
+def prune_cached_responses(expires_before, max_entries):
+    """Drop cache rows created before ``expires_before`` and all but the newest ``max_entries``."""
+    journal.submit("prune_cached_responses", expires_before, max_entries)
+
+
+def get_analytics_result(kind, params, graph_version):
+    """Return the stored JSON result of ``kind`` for ``graph_version``, or None."""
+    journal.catch_up()
+    cursor = _connect().cursor()
+    cursor.execute(
+        "SELECT result FROM analytics_results WHERE kind = ? AND params = ? AND graph_version = ?",
+        (kind, params, graph_version),
+    )
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def put_analytics_result(kind, params, graph_version, result, created_at):
+    """Store a JSON result, replacing the one computed for an older graph version."""
+    journal.submit("put_analytics_result", kind, params, graph_version, result, created_at)
+
+
+def search_nodes_fulltext(match, limit=10):
+    """Return node ids matching the FTS5 ``match`` expression, best first."""
+    journal.catch_up()
+    cursor = _connect().cursor()
+    cursor.execute(
+        "SELECT node_id FROM node_search WHERE node_search MATCH ? ORDER BY rank LIMIT ?",
+        (match, limit),
+    )
+    return [json.loads(row[0]) for row in cursor.fetchall()]
+
+
+def save_graph_changes(changes):
+    """Replace the changed nodes and edges with their ``after`` state in one transaction."""
+    journal.submit("apply_graph_changes", [tuple(change) for change in changes])
+
+
+def record_graph_version(version, kind, message="", changes=None, snapshot=None):
+    """Append ``version`` to the graph history; ``changes`` is JSON text for diffs."""
+    journal.submit("record_graph_version", version, kind, message, changes, snapshot, time.time())
+
+
+def put_graph_snapshot(digest, data):
+    journal.submit("put_graph_snapshot", digest, data)
+
+
+def has_graph_snapshot(digest):
+    journal.catch_up()
+    cursor = _connect().cursor()
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM graph_snapshots WHERE digest = ?)", (digest,))
+    return bool(cursor.fetchone()[0])
+
+
+def get_graph_snapshot(digest):
+    journal.catch_up()
+    cursor = _connect().cursor()
+    cursor.execute("SELECT data FROM graph_snapshots WHERE digest = ?", (digest,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def latest_graph_version():
+    """Highest recorded graph version, or 0 when there is no history."""
+    journal.catch_up()
+    cursor = _connect().cursor()
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM graph_versions")
+    return cursor.fetchone()[0]
+
+
+def get_graph_version(version):
+    """Return ``(version, kind, snapshot)`` or None."""
+    journal.catch_up()
+    cursor = _connect().cursor()
+    cursor.execute("SELECT version, kind, snapshot FROM graph_versions WHERE version = ?", (version,))
+    return cursor.fetchone()
+
+
+def latest_graph_base(version):
+    """Return ``(version, snapshot)`` of the newest base at or before ``version``, or None."""
+    journal.catch_up()
+    cursor = _connect().cursor()
     cursor.execute(
         """
-        INSERT INTO versioned_responses
-        (architecture_name, provider, model, user_text, front_content, back_content, system_prompt)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+        SELECT version, snapshot FROM graph_versions
+        WHERE kind = 'base' AND version <= ? ORDER BY version DESC LIMIT 1
     """,
-        (
-            architecture_name,
-            provider,
-            model,
-            user_text,
-            front_content,
-            back_content,
-            system_prompt,
-        ),
+        (version,),
     )
-    conn.commit()
-    conn.close()
+    return cursor.fetchone()
+
+
+def list_graph_versions(limit=50, before=None):
+    """Newest first: ``[(version, kind, message, change_count, created_at), ...]``."""
+    journal.catch_up()
+    cursor = _connect().cursor()
+    cursor.execute(
+        """
+        SELECT version, kind, message, COALESCE(json_array_length(changes), 0), created_at
+        FROM graph_versions WHERE version < ? ORDER BY version DESC LIMIT ?
+    """,
+        (before if before is not None else 2**62, limit),
+    )
+    return cursor.fetchall()
+
+
+def load_graph_versions(after, upto):
+    """Versions in ``(after, upto]`` in order: ``[(version, kind, changes, snapshot), ...]``."""
+    journal.catch_up()
+    cursor = _connect().cursor()
+    cursor.execute(
+        """
+        SELECT version, kind, changes, snapshot FROM graph_versions
+        WHERE version > ? AND version <= ? ORDER BY version
+    """,
+        (after, upto),
+    )
+    return cursor.fetchall()
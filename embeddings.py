@@ -0,0 +1,380 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from metrics import ANALYTICS_SECONDS
+from search import tokenize
+
+# Embedding matrices and their row metadata are stored here
+EMBEDDINGS_DIR = os.environ.get("EMBEDDINGS_DIR", ".embeddings")
+EMBEDDER = os.environ.get("EMBEDDER", "hashing")
+# Rows compared per matrix product when searching, bounding temporary memory
+SEARCH_BLOCK_ROWS = 65536
+EMBED_BATCH_SIZE = 256
+INITIAL_CAPACITY = 1024
+
+
+def node_text(node, attributes):
+    """Text embedded for a node: its id and scalar attribute values (label, school, enriched info...)."""
+    values = [str(node)]
+    for key in sorted(attributes):
+        value = attributes[key]
+        if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+            values.append(str(value))
+    return " ".join(values)
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class HashingEmbedder:
+    """Deterministic offline embedder: feature-hashed words and character trigrams.
+
+    Each feature is hashed (with a stable hash, unlike ``hash()``) to a
+    dimension and a sign; vectors are L2-normalized, so texts sharing words
+    or word fragments get a high cosine similarity.
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    @staticmethod
+    def _features(text):
+        for word in tokenize(text):
+            yield word
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i : i + 3]
+
+    @lru_cache(maxsize=1 << 16)
+    def _bucket(self, feature):
+        value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+        return value % self.dim, 1.0 if value >> 63 else -1.0
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                column, sign = self._bucket(feature)
+                matrix[row, column] += sign
+        return _normalize(matrix)
+
+
+class BedrockEmbedder:
+    """Embeddings from a Bedrock embedding model (one provider call per text)."""
+
+    def __init__(self, model_id="amazon.titan-embed-text-v2:0", dim=1024):
+        self.model_id = model_id
+        self.dim = dim
+        self.name = f"bedrock-{model_id.replace(':', '-')}-{dim}"
+
+    def embed(self, texts):
+        # Imported here so that the offline embedder does not pull in boto3
+        from bedrock_helper import embed_texts
+
+        vectors = embed_texts(texts, self.model_id, self.dim)
+        return _normalize(np.array(vectors, dtype=np.float32).reshape(len(texts), self.dim))
+
+
+EMBEDDERS = {"hashing": HashingEmbedder, "bedrock": BedrockEmbedder}
+
+
+def get_embedder(name=None):
+    return EMBEDDERS[name or EMBEDDER]()
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+class EmbeddingIndex:
+    """Cosine-similarity index over node embeddings in a memory-mapped float32 matrix.
+
+    Rows are unit vectors, so cosine similarity is a dot product and a
+    search is a few blocked matrix products plus a top-k partition. Like
+    ``SearchIndex`` it is rebuilt when handed a different graph object and
+    otherwise maintained with ``update``/``remove`` (or ``prepare`` and
+    ``complete``, to embed after releasing the graph lock). The matrix lives in
+    ``directory`` next to a metadata file naming each row's node and the
+    digest of the text it embeds, so a rebuild after a restart only embeds
+    nodes whose text changed. Rows are never reused in place for another
+    node, so a crash between the matrix and metadata writes only costs
+    re-embedding; deleted rows are compacted away on rebuild.
+    """
+
+    def __init__(self, embedder=None, directory=None):
+        self.embedder = embedder or get_embedder()
+        self.directory = directory or EMBEDDINGS_DIR
+        self._graph = None
+        self._matrix = None
+        self._data_file = None
+        self._generation = 0
+        self._nodes = []
+        self._digests = []
+        self._rows = {}
+        # Digest of the latest prepared text per node whose embedding is in flight
+        self._wanted = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._dirty = False
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.directory, f"{self.embedder.name}.json")
+
+    def _data_path(self, generation):
+        return os.path.join(self.directory, f"{self.embedder.name}.{generation}.f32")
+
+    def _map(self, path, rows):
+        self._matrix = np.memmap(path, dtype=np.float32, mode="r+", shape=(rows, self.embedder.dim))
+        self._data_file = path
+
+    def _open(self):
+        """Map the stored matrix, or start an empty one if there is none for this embedder."""
+        os.makedirs(self.directory, exist_ok=True)
+        row_bytes = self.embedder.dim * 4
+        try:
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            path = os.path.join(self.directory, meta["data"])
+            capacity = os.path.getsize(path) // row_bytes
+            if meta["dim"] != self.embedder.dim or capacity < len(meta["nodes"]):
+                raise ValueError("embedding store does not match its metadata")
+            self._generation = meta["generation"]
+            self._nodes, self._digests = meta["nodes"], meta["digests"]
+            self._map(path, capacity)
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"Ignoring unreadable embedding store in {self.directory}: {str(e)}")
+            self._generation += 1
+            self._nodes, self._digests = [], []
+            path = self._data_path(self._generation)
+            with open(path, "wb") as f:
+                f.truncate(INITIAL_CAPACITY * row_bytes)
+            self._map(path, INITIAL_CAPACITY)
+        self._rows = {node: row for row, node in enumerate(self._nodes) if node is not None}
+        self._live = np.zeros(len(self._matrix), dtype=bool)
+        self._live[list(self._rows.values())] = True
+
+    def _reserve(self, rows):
+        """Grow the matrix file (doubling) so it has room for ``rows`` rows."""
+        capacity = len(self._matrix)
+        if rows <= capacity:
+            return
+        capacity = max(rows, 2 * capacity)
+        self._matrix.flush()
+        path = self._data_file
+        self._matrix = None
+        with open(path, "r+b") as f:
+            f.truncate(capacity * self.embedder.dim * 4)
+        self._map(path, capacity)
+        self._live = np.concatenate([self._live, np.zeros(capacity - len(self._live), dtype=bool)])
+
+    def _compact(self):
+        """Copy the live rows to a new matrix file and switch the metadata to it."""
+        rows = [row for row, node in enumerate(self._nodes) if node is not None]
+        self._generation += 1
+        path = self._data_path(self._generation)
+        capacity = max(INITIAL_CAPACITY, 2 * len(rows))
+        with open(path, "wb") as f:
+            f.truncate(capacity * self.embedder.dim * 4)
+        compacted = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, self.embedder.dim))
+        compacted[: len(rows)] = self._matrix[rows]
+        old = self._data_file
+        self._matrix = compacted
+        self._data_file = path
+        self._nodes = [self._nodes[row] for row in rows]
+        self._digests = [self._digests[row] for row in rows]
+        self._rows = {node: row for row, node in enumerate(self._nodes)}
+        self._live = np.zeros(capacity, dtype=bool)
+        self._live[: len(rows)] = True
+        self._save()
+        os.remove(old)
+
+    def _store(self, items):
+        """Write ``[(node, digest, vector), ...]``, appending a row for every changed node."""
+        self._reserve(len(self._nodes) + len(items))
+        for node, digest, vector in items:
+            old = self._rows.get(node)
+            if old is not None:
+                self._nodes[old] = None
+                self._live[old] = False
+            row = len(self._nodes)
+            self._matrix[row] = vector
+            self._nodes.append(node)
+            self._digests.append(digest)
+            self._rows[node] = row
+            self._live[row] = True
+        self._dirty = True
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        # Changed nodes leave their old row behind; reclaim them once they are the majority
+        if len(self._nodes) > INITIAL_CAPACITY and len(self._rows) < len(self._nodes) / 2:
+            self._compact()
+
+    def _embed(self, texts):
+        vectors = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            vectors.append(self.embedder.embed(texts[start : start + EMBED_BATCH_SIZE]))
+        return np.concatenate(vectors) if vectors else np.zeros((0, self.embedder.dim), np.float32)
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._matrix.flush()
+        meta = {
+            "embedder": self.embedder.name,
+            "dim": self.embedder.dim,
+            "generation": self._generation,
+            "data": os.path.basename(self._data_file),
+            "nodes": self._nodes,
+            "digests": self._digests,
+        }
+        temporary = f"{self._meta_path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(meta, f)
+        os.replace(temporary, self._meta_path)
+        self._dirty = False
+
+    def flush(self):
+        """Persist the row metadata if rows changed since it was last written."""
+        with self._lock:
+            if self._matrix is not None and self._dirty:
+                self._save()
+
+    def rebuild(self, graph):
+        with self._lock, ANALYTICS_SECONDS.time(analysis="embedding_index"):
+            if self._matrix is None:
+                self._open()
+            self._graph = graph
+            self._wanted.clear()
+            for node, row in list(self._rows.items()):
+                if node not in graph:
+                    del self._rows[node]
+                    self._nodes[row] = None
+                    self._live[row] = False
+            self._maybe_compact()
+            pending = []
+            for node, attributes in graph.nodes(data=True):
+                text = node_text(node, attributes)
+                digest = _digest(text)
+                row = self._rows.get(node)
+                if row is None or self._digests[row] != digest:
+                    pending.append((node, digest, text))
+            if pending:
+                vectors = self._embed([text for _, _, text in pending])
+                self._store([(node, digest, vector) for (node, digest, _), vector in zip(pending, vectors)])
+            self._save()
+
+    def prepare(self, rows):
+        """Note ``[(node, attributes), ...]`` as changed and return the texts ``complete`` embeds.
+
+        Cheap enough to call under the graph's write lock, which fixes the
+        order of changes to a node: ``complete`` only stores a vector whose
+        text is still the latest one prepared for its node, so embeddings
+        that finish out of order, or after the node was removed, are dropped.
+        """
+        if self._graph is None:
+            return []
+        pending = []
+        with self._lock:
+            for node, attributes in rows:
+                text = node_text(node, attributes)
+                digest = _digest(text)
+                row = self._rows.get(node)
+                if row is not None and self._digests[row] == digest:
+                    self._wanted.pop(node, None)
+                else:
+                    self._wanted[node] = digest
+                    pending.append((node, digest, text))
+        return pending
+
+    def complete(self, pending):
+        """Embed and store what ``prepare`` returned; call it without holding the graph lock."""
+        if not pending:
+            return
+        # Embed outside the lock: a provider embedder may take a while
+        vectors = self._embed([text for _, _, text in pending])
+        with self._lock:
+            items = []
+            for (node, digest, _), vector in zip(pending, vectors):
+                if self._wanted.get(node) == digest:
+                    del self._wanted[node]
+                    items.append((node, digest, vector))
+            if items:
+                self._store(items)
+
+    def update_many(self, rows):
+        """(Re)embed ``[(node, attributes), ...]`` after nodes were added or changed."""
+        self.complete(self.prepare(rows))
+
+    def update(self, node, attributes):
+        self.update_many([(node, attributes)])
+
+    def remove(self, node):
+        with self._lock:
+            self._wanted.pop(node, None)
+            row = self._rows.pop(node, None) if self._graph is not None else None
+            if row is not None:
+                self._nodes[row] = None
+                self._live[row] = False
+                self._dirty = True
+
+    def _top_k(self, queries, k, exclude):
+        """Best ``k`` ``(row, score)`` per query row; ``exclude[i]`` is a row to skip for query ``i``."""
+        count = len(self._nodes)
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, count)
+            scores = queries @ self._matrix[start:end].T
+            scores[:, ~self._live[start:end]] = -np.inf
+            for i, row in enumerate(exclude):
+                if row is not None and start <= row < end:
+                    scores[i, row - start] = -np.inf
+            block_rows = np.broadcast_to(np.arange(start, end), scores.shape)
+            best_scores = np.hstack([best_scores, scores])
+            best_rows = np.hstack([best_rows, block_rows])
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        return [
+            [(self._nodes[row], float(score)) for row, score in zip(rows, scores) if score > -np.inf]
+            for rows, scores in zip(best_rows.tolist(), best_scores.tolist())
+        ]
+
+    def similar_to_nodes(self, graph, nodes, k=10):
+        """``{node: [(other, score), ...]}`` for each of ``nodes``, best first, excluding the node itself."""
+        if graph is not self._graph:
+            self.rebuild(graph)
+        # Nodes added through a path that does not maintain the index
+        self.update_many([(node, graph.nodes[node]) for node in nodes if node not in self._rows])
+        with self._lock:
+            rows = [self._rows[node] for node in nodes]
+            queries = np.array(self._matrix[rows]) if rows else np.zeros((0, self.embedder.dim), np.float32)
+            return dict(zip(nodes, self._top_k(queries, k, rows)))
+
+    def similar_to_text(self, graph, text, k=10):
+        """``[(node, score), ...]`` most similar to the free text ``text``."""
+        if graph is not self._graph:
+            self.rebuild(graph)
+        query = self.embedder.embed([text])
+        with self._lock:
+            return self._top_k(query, k, [None])[0]
+
+    def __contains__(self, node):
+        return node in self._rows
@@ -0,0 +1,234 @@
+import logging
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from metrics import PROVIDER_RETRIES
+
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_BATCH_SIZE = 50
+# Upper bounds for a job's provider calls in flight and nodes per write-back
+MAX_CONCURRENCY = 32
+MAX_BATCH_SIZE = 1000
+MAX_RETRIES = 5
+# Finished jobs kept for polling; older ones are forgotten
+MAX_FINISHED_JOBS = 256
+
+
+class AdaptiveThrottle:
+    """Backoff shared by all workers of a job.
+
+    Each throttling error raises the delay one exponential step (using the
+    same ``backoff_delay`` schedule as ``query_knowledge_base``); each success
+    lowers it one step, so throughput recovers once the provider stops
+    rejecting calls.
+    """
+
+    def __init__(self, base_delay=1.0, max_delay=30.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.level = 0
+        self.throttled_calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def delay(self):
+        if self.level == 0:
+            return 0.0
+        from bedrock_helper import backoff_delay
+
+        return min(backoff_delay(self.level - 1, self.base_delay), self.max_delay)
+
+    def wait(self):
+        delay = self.delay
+        if delay:
+            time.sleep(delay)
+
+    def throttled(self):
+        with self._lock:
+            self.level += 1
+            self.throttled_calls += 1
+
+    def succeeded(self):
+        with self._lock:
+            self.level = max(0, self.level - 1)
+
+
+def _bounded(name, value, maximum):
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= maximum:
+        raise ValueError(f"{name} must be an integer between 1 and {maximum}")
+    return value
+
+
+class EnrichmentJob:
+    def __init__(self, nodes, concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE):
+        if not isinstance(nodes, list):
+            raise ValueError("nodes must be a list")
+        concurrency = _bounded("concurrency", concurrency, MAX_CONCURRENCY)
+        batch_size = _bounded("batch_size", batch_size, MAX_BATCH_SIZE)
+        self.id = uuid.uuid4().hex
+        self.nodes = list(nodes)
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.status = "queued"
+        self.completed = 0
+        self.failed = 0
+        self.errors = []
+        self.started_at = None
+        self.finished_at = None
+        self.throttle = AdaptiveThrottle()
+
+    def to_dict(self):
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.nodes),
+            "completed": self.completed,
+            "failed": self.failed,
+            "throttled_calls": self.throttle.throttled_calls,
+            "current_backoff": self.throttle.delay,
+            "elapsed_seconds": round(elapsed, 3),
+            "nodes_per_second": round(self.completed / elapsed, 3) if elapsed else 0.0,
+            "errors": self.errors[-10:],
+        }
+
+
+jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def _remember(job):
+    with _jobs_lock:
+        jobs[job.id] = job
+        while len(jobs) > MAX_FINISHED_JOBS:
+            oldest = next(iter(jobs.values()))
+            if oldest.finished_at is None:
+                break
+            jobs.popitem(last=False)
+
+
+def _enrich_with_backoff(job, node, attributes, connections):
+    # Imported here so that loading this module does not pull in boto3
+    from bedrock_helper import ProviderThrottled, enrich_node_info
+
+    for attempt in range(MAX_RETRIES):
+        job.throttle.wait()
+        try:
+            info = enrich_node_info(node, attributes, connections, raise_throttling=True)
+        except ProviderThrottled:
+            job.throttle.throttled()
+            logging.info(f"Throttled enriching {node} (attempt {attempt + 1})")
+            PROVIDER_RETRIES.inc(provider="Bedrock", operation="enrich")
+            continue
+        job.throttle.succeeded()
+        return info.enriched_content
+    raise ProviderThrottled(f"Gave up on {node} after {MAX_RETRIES} throttled attempts")
+
+
+def run_enrichment_job(kg, job, progress=None):
+    """Enrich ``job.nodes`` with up to ``job.concurrency`` provider calls in flight.
+
+    Results are written back through ``kg.apply_enrichments`` every
+    ``job.batch_size`` nodes, i.e. one graph version bump and one database
+    transaction per batch.
+    """
+    job.status = "running"
+    job.started_at = time.time()
+    # Read inputs up front so workers never touch the live graph
+    with kg.reading():
+        inputs = [
+            (node, dict(kg.graph.nodes[node]), list(kg.graph.neighbors(node)))
+            for node in job.nodes
+            if node in kg.graph
+        ]
+    missing = len(job.nodes) - len(inputs)
+    if missing:
+        job.failed += missing
+        job.errors.append(f"{missing} node(s) not found in the graph")
+
+    pending = []
+    try:
+        with ThreadPoolExecutor(max_workers=job.concurrency) as pool:
+            futures = {
+                pool.submit(_enrich_with_backoff, job, node, attributes, connections): node
+                for node, attributes, connections in inputs
+            }
+            for future in as_completed(futures):
+                node = futures[future]
+                try:
+                    pending.append((node, future.result()))
+                    job.completed += 1
+                except Exception as e:
+                    job.failed += 1
+                    job.errors.append(f"{node}: {str(e)}")
+                if len(pending) >= job.batch_size:
+                    kg.apply_enrichments(pending)
+                    pending = []
+                    if progress:
+                        progress(job)
+        if pending:
+            kg.apply_enrichments(pending)
+        job.status = "done"
+    except Exception as e:
+        job.status = "failed"
+        job.errors.append(str(e))
+    finally:
+        job.finished_at = time.time()
+        if progress:
+            progress(job)
+    return job
+
+
+def start_enrichment_job(kg, nodes, concurrency=DEFAULT_CONCURRENCY, batch_size=DEFAULT_BATCH_SIZE):
+    """Run an enrichment job in a background thread and return it immediately.
+
+    Raises ``ValueError`` for invalid ``nodes``, ``concurrency`` or ``batch_size``.
+    """
+    job = EnrichmentJob(nodes, concurrency, batch_size)
+    _remember(job)
+    threading.Thread(
+        target=run_enrichment_job, args=(kg, job), name=f"enrich-{job.id[:8]}", daemon=True
+    ).start()
+    return job
+
+
+def get_job(job_id):
+    return jobs.get(job_id)
+
+
+def main():
+    from app import NeurosymbolicKnowledgeGraph
+    from database import create_database, flush_journal
+
+    args = sys.argv[1:]
+    concurrency = DEFAULT_CONCURRENCY
+    if "--concurrency" in args:
+        i = args.index("--concurrency")
+        concurrency = int(args[i + 1])
+        del args[i : i + 2]
+
+    create_database()
+    kg = NeurosymbolicKnowledgeGraph()
+    kg.load_graph()
+    nodes = args or [n for n, data in kg.graph.nodes(data=True) if "enriched_info" not in data]
+    job = EnrichmentJob(nodes, concurrency)
+    run_enrichment_job(
+        kg,
+        job,
+        progress=lambda j: print(
+            f"{j.completed + j.failed}/{len(j.nodes)} done, "
+            f"{j.to_dict()['nodes_per_second']} nodes/s, backoff {j.throttle.delay}s"
+        ),
+    )
+    flush_journal()
+    print(job.to_dict())
+
+
+if __name__ == "__main__":
+    main()
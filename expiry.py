@@ -0,0 +1,118 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+
+# Seconds between background expiry passes
+EXPIRY_INTERVAL = float(os.environ.get("EXPIRY_INTERVAL", "30"))
+# Nodes removed per expiry pass (and per version)
+EXPIRY_BATCH = 1000
+
+
+def expiry_attributes(ttl_seconds, now=None):
+    """Attributes giving a node ``ttl_seconds`` to live: the TTL and its absolute deadline.
+
+    ``lifetime`` is left alone: the data already uses it for life dates.
+    """
+    ttl_seconds = float(ttl_seconds)
+    if ttl_seconds <= 0:
+        raise ValueError(f"ttl_seconds must be positive, got {ttl_seconds}")
+    return {"ttl_seconds": ttl_seconds, "expires_at": (now or time.time()) + ttl_seconds}
+
+
+def expires_at(attributes):
+    value = attributes.get("expires_at")
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+class ExpiryQueue:
+    """Min-heap of node deadlines, so finding expired nodes never scans the graph.
+
+    Entries are ``(expires_at, seq, node)``; the sequence number keeps node
+    ids out of comparisons. Entries are not removed when a node is deleted
+    or its deadline changes: a popped entry only counts if the node still
+    exists with that same ``expires_at`` attribute. Like ``SearchIndex`` the
+    heap is rebuilt (one pass over the nodes) when handed a different graph
+    object and otherwise maintained with ``schedule``.
+    """
+
+    def __init__(self):
+        self._graph = None
+        self._heap = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def rebuild(self, graph):
+        with self._lock:
+            self._graph = graph
+            self._heap = [
+                (deadline, next(self._seq), node)
+                for node, attributes in graph.nodes(data=True)
+                if (deadline := expires_at(attributes)) is not None
+            ]
+            heapq.heapify(self._heap)
+
+    def schedule(self, node, attributes):
+        """Track ``node``'s deadline after it was added or its attributes changed."""
+        deadline = expires_at(attributes)
+        if deadline is None:
+            return
+        with self._lock:
+            if self._graph is not None:
+                heapq.heappush(self._heap, (deadline, next(self._seq), node))
+
+    def next_deadline(self):
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def may_be_due(self, graph, now=None):
+        """Cheap check whether ``due`` could return nodes; always true before the heap covers ``graph``."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return graph is not self._graph or bool(self._heap and self._heap[0][0] <= now)
+
+    def due(self, graph, now=None, limit=EXPIRY_BATCH):
+        """Pop up to ``limit`` nodes of ``graph`` whose deadline is at or before ``now``."""
+        if graph is not self._graph:
+            self.rebuild(graph)
+        now = time.time() if now is None else now
+        nodes = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now and len(nodes) < limit:
+                deadline, _, node = heapq.heappop(heap)
+                if node in graph and expires_at(graph.nodes[node]) == deadline:
+                    nodes.append(node)
+        return nodes
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class ExpiryWorker:
+    """Daemon thread calling ``expire()`` every ``interval`` seconds until stopped."""
+
+    def __init__(self, expire, interval=EXPIRY_INTERVAL):
+        self.expire = expire
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="node-expiry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.expire()
+            except Exception as e:
+                print(f"Error expiring nodes: {str(e)}")
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import uuid
+from contextlib import nullcontext
+from itertools import islice
+
+# Part of every ETag, so clients revalidate after a restart: versions persist,
+# but a replaced or deleted database starts them over
+BOOT_ID = uuid.uuid4().hex[:12]
+# Largest page (``limit``) of a paginated export
+MAX_PAGE_LIMIT = 100000
+
+
+def graph_etag(version, *parts):
+    """Strong ETag for a response derived from graph ``version`` and request ``parts``."""
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:16]
+    return f"{BOOT_ID}-{version}-{digest}"
+
+
+def _node_record(graph, node):
+    return dict(graph.nodes[node], id=node)
+
+
+def _link_records(graph, node, index, members):
+    """Links of ``node`` it owns: each edge is owned by its lower-indexed endpoint."""
+    position = index[node]
+    for neighbor, data in list(graph.adj[node].items()):
+        if members is not None and neighbor not in members:
+            continue
+        if index.get(neighbor, -1) >= position:
+            yield dict(data, source=node, target=neighbor)
+
+
+def _select(graph, index, nodes, offset, limit):
+    """Resolve the node selection to ``(page, index, members)``.
+
+    Without ``nodes`` every edge owned by a selected node is exported (so the
+    pages of a paginated export add up to the whole graph). With an explicit
+    ``nodes`` subset only the induced subgraph is exported.
+    """
+    stop = None if limit is None else offset + limit
+    if nodes is None:
+        return list(islice(index, offset, stop)), index, None
+    selected = [node for node in dict.fromkeys(nodes) if node in graph]
+    local = {node: i for i, node in enumerate(selected)}
+    return selected[offset:stop], local, local
+
+
+def _chunks(graph, page, records, chunk_size, guard):
+    """Yield lists of the JSON ``records(node)`` of ``chunk_size`` nodes of ``page`` at a time.
+
+    Each chunk is read inside ``guard()`` (e.g. the graph's read lock),
+    which is released before the chunk is handed on to be sent.
+    """
+    for start in range(0, len(page), chunk_size):
+        with guard():
+            buffer = [
+                record
+                for node in page[start : start + chunk_size]
+                if node in graph
+                for record in records(node)
+            ]
+        if buffer:
+            yield buffer
+
+
+def iter_node_link_json(graph, index, nodes=None, offset=0, limit=None, chunk_size=500, guard=nullcontext):
+    """Yield the node-link JSON document for ``graph`` in chunks.
+
+    ``index`` maps every node to a stable position (e.g. a snapshot's
+    ``index``). ``offset``/``limit`` page over the selected nodes. The graph
+    is only read inside ``guard()``, one chunk at a time, so concurrent
+    writers wait for a chunk rather than for a slow client.
+    """
+    with guard():
+        page, index, members = _select(graph, index, nodes, offset, limit)
+        attributes = json.dumps(graph.graph)
+
+    yield '{"directed": false, "multigraph": false, "graph": '
+    yield attributes
+    yield ', "nodes": ['
+    first = True
+    for buffer in _chunks(
+        graph, page, lambda node: [json.dumps(_node_record(graph, node))], chunk_size, guard
+    ):
+        yield ("" if first else ", ") + ", ".join(buffer)
+        first = False
+
+    yield '], "links": ['
+    first = True
+    for buffer in _chunks(
+        graph,
+        page,
+        lambda node: [json.dumps(link) for link in _link_records(graph, node, index, members)],
+        chunk_size,
+        guard,
+    ):
+        yield ("" if first else ", ") + ", ".join(buffer)
+        first = False
+    yield "]}"
+
+
+def iter_node_link_ndjson(graph, index, nodes=None, offset=0, limit=None, chunk_size=500, guard=nullcontext):
+    """Yield newline-delimited JSON: ``{"node": {...}}`` lines, then ``{"link": {...}}`` lines."""
+    with guard():
+        page, index, members = _select(graph, index, nodes, offset, limit)
+
+    for buffer in _chunks(
+        graph, page, lambda node: [json.dumps({"node": _node_record(graph, node)})], chunk_size, guard
+    ):
+        yield "\n".join(buffer) + "\n"
+    for buffer in _chunks(
+        graph,
+        page,
+        lambda node: [json.dumps({"link": link}) for link in _link_records(graph, node, index, members)],
+        chunk_size,
+        guard,
+    ):
+        yield "\n".join(buffer) + "\n"
@@ -0,0 +1,71 @@
+import hashlib
+import os
+import pickle
+
+# Parsed source graphs are cached here as pickles
+CACHE_DIR = os.environ.get("GRAPH_CACHE_DIR", ".graph_cache")
+# Bump when the pickled layout or the graph parsed from a file changes, so
+# stale caches (and history bases recorded from them, see versions.py) are ignored
+CACHE_FORMAT = 2
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(path):
+    tag = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]
+    return os.path.join(CACHE_DIR, f"{os.path.basename(path)}-{tag}.pickle")
+
+
+def load(path):
+    """Return ``(graph, digest)`` for the source file ``path``.
+
+    The cache file holds a small header pickle followed by the graph pickle.
+    When the source's size and mtime match the header the graph is unpickled
+    without reading the source; otherwise the source is hashed, and a cache
+    whose digest still matches (e.g. after a ``touch``) is used and its
+    header refreshed. ``graph`` is None when there is no usable cache.
+    """
+    stat = os.stat(path)
+    digest = None
+    try:
+        with open(_cache_path(path), "rb") as f:
+            header = pickle.load(f)
+            if header.get("format") == CACHE_FORMAT:
+                if (header["size"], header["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                    return pickle.load(f), header["digest"]
+                digest = file_digest(path)
+                if header["digest"] == digest:
+                    graph = pickle.load(f)
+                    save(path, graph, digest, stat)
+                    return graph, digest
+    except (OSError, EOFError, KeyError, pickle.UnpicklingError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Ignoring unreadable graph cache for {path}: {str(e)}")
+    return None, digest or file_digest(path)
+
+
+def save(path, graph, digest, stat=None):
+    """Cache ``graph`` as parsed from ``path``; ``stat`` is the source's stat when it was read."""
+    stat = stat or os.stat(path)
+    header = {
+        "format": CACHE_FORMAT,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "digest": digest,
+    }
+    target = _cache_path(path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    temporary = f"{target}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, target)
+    except OSError as e:
+        print(f"Could not write graph cache for {path}: {str(e)}")
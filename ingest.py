@@ -0,0 +1,304 @@
+import csv
+import json
+import os
+import re
+import sys
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+import networkx as nx
+
+from database import bulk_writer, create_database, flush_journal, load_graph_from_db
+from versions import VersionHistory
+
+BATCH_SIZE = 50000
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Characters that can follow a complete JSON value
+_DELIMITERS = frozenset(" \t\n\r,:]}")
+
+
+@dataclass
+class IngestStats:
+    nodes: int = 0
+    edges: int = 0
+    duplicate_nodes: int = 0
+    duplicate_edges: int = 0
+    invalid: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def __str__(self):
+        return (
+            f"{self.nodes} nodes, {self.edges} edges "
+            f"({self.duplicate_nodes + self.duplicate_edges} duplicates merged, "
+            f"{self.invalid} invalid skipped) in {self.elapsed:.2f}s"
+        )
+
+
+def print_progress(stats):
+    print(f"Loaded {stats}")
+
+
+class _JsonStreamReader:
+    """Incremental reader for a top-level JSON object whose big values are arrays.
+
+    Array items are decoded one at a time, so the whole document never has
+    to be held in memory.
+    """
+
+    def __init__(self, f, chunk_size=1 << 16):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of JSON stream")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # Only a delimiter ends a value: a number split at a chunk boundary
+            # ("0." | "5") decodes as its prefix and must be read again whole
+            if (end == len(self.buffer) or self.buffer[end] not in _DELIMITERS) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """Decode the items of the array whose ``[`` was just consumed."""
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        decode = self.decoder.raw_decode
+        match = _WHITESPACE.match
+        while True:
+            # Fast path: decode straight from the buffer while it holds whole items
+            buffer = self.buffer
+            pos = match(buffer, self.pos).end()
+            try:
+                item, end = decode(buffer, pos)
+                pos = match(buffer, end).end()
+                complete = pos < len(buffer) and buffer[pos] in ",]"
+            except json.JSONDecodeError:
+                complete = False
+            if not complete:
+                item = self.value()
+                pos = None
+            else:
+                self.pos = pos
+            yield item
+            separator = self.buffer[self.pos] if pos is not None else self.peek()
+            self.pos += 1
+            if separator == ",":
+                continue
+            if separator != "]":
+                raise ValueError(f"Expected ',' or ']' at offset {self.pos - 1} of JSON stream")
+            return
+
+    def sections(self):
+        """Yield ``(key, item)`` for array items and ``(key, value)`` for other members."""
+        self.expect("{")
+        if self.peek() == "}":
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            if self.peek() == "[":
+                self.pos += 1
+                for item in self.items():
+                    yield key, item
+            else:
+                yield key, self.value()
+            if self.peek() == ",":
+                self.pos += 1
+                continue
+            self.expect("}")
+            return
+
+
+def _read_json(f):
+    """Yield ``("node", record)`` and ``("edge", record)`` from a node-link JSON file."""
+    for key, value in _JsonStreamReader(f).sections():
+        if key == "nodes":
+            yield "node", value
+        elif key in ("edges", "links"):
+            yield "edge", value
+        elif key == "name":
+            yield "name", value
+
+
+def _read_ndjson(f):
+    """Yield records from NDJSON: node/edge objects or ``{"node": ...}``/``{"link": ...}`` lines."""
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            yield "invalid", line
+            continue
+        if isinstance(record, dict) and "node" in record:
+            yield "node", record["node"]
+        elif isinstance(record, dict) and "link" in record:
+            yield "edge", record["link"]
+        elif isinstance(record, dict) and "source" in record:
+            yield "edge", record
+        else:
+            yield "node", record
+
+
+def _read_csv(f):
+    """Yield edge records from a CSV edge list with a ``source,target[,...]`` header."""
+    for row in csv.DictReader(f):
+        yield "edge", {key: value for key, value in row.items() if value not in (None, "")}
+
+
+READERS = {".json": _read_json, ".ndjson": _read_ndjson, ".jsonl": _read_ndjson, ".csv": _read_csv}
+
+
+def _valid_id(value):
+    # Exact type check: excludes bools, which are ints
+    return type(value) in (str, int) and value != ""
+
+
+def iter_records(path):
+    reader = READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        raise ValueError(f"Unsupported file type for {path}; expected one of {sorted(READERS)}")
+    with open(path, "r", newline="") as f:
+        yield from reader(f)
+
+
+def bulk_load(
+    path, graph=None, replace=True, batch_size=BATCH_SIZE, progress=print_progress, store=True
+):
+    """Stream ``path`` into ``graph`` and SQLite in one transaction.
+
+    Records are validated (nodes need an ``id``, edges a ``source`` and
+    ``target``) and deduplicated: repeated nodes and edges merge their
+    attributes. ``replace`` starts from an empty graph and clears the stored
+    graph; otherwise records are merged into both. ``progress`` is called
+    with the running ``IngestStats`` after every batch. ``store=False`` only
+    builds the graph, for when the database is known to hold it already.
+    Returns ``(graph, stats)``.
+    """
+    graph = nx.Graph() if replace or graph is None else graph
+    stats = IngestStats()
+    # Pending rows keyed by node / (source, target), so repeats within a batch collapse
+    node_batch, edge_batch = {}, {}
+    oriented = set()
+    declared = set()
+
+    def flush(writer):
+        if node_batch and writer is not None:
+            writer.nodes(list(node_batch.items()))
+        if edge_batch and writer is not None:
+            writer.edges([(u, v, attributes) for (u, v), attributes in edge_batch.items()])
+        node_batch.clear()
+        edge_batch.clear()
+        if progress:
+            progress(stats)
+
+    with bulk_writer(replace=replace) if store else nullcontext() as writer:
+        for kind, record in iter_records(path):
+            if kind == "name":
+                graph.graph["name"] = record
+                continue
+            if kind == "node" and isinstance(record, dict) and _valid_id(record.get("id")):
+                node = record["id"]
+                # The id names the node; like node_link_graph, it is not an attribute
+                attributes = {k: val for k, val in record.items() if k != "id"}
+                if node in declared:
+                    stats.duplicate_nodes += 1
+                elif node not in graph:
+                    stats.nodes += 1
+                graph.add_node(node, **attributes)
+                node_batch[node] = graph.nodes[node] if node in declared else attributes
+                declared.add(node)
+            elif (
+                kind == "edge"
+                and isinstance(record, dict)
+                and _valid_id(record.get("source"))
+                and _valid_id(record.get("target"))
+            ):
+                u, v = record["source"], record["target"]
+                attributes = {k: val for k, val in record.items() if k not in ("source", "target")}
+                duplicate = graph.has_edge(u, v)
+                if duplicate:
+                    stats.duplicate_edges += 1
+                    # Keep the orientation the edge was first written with
+                    if (v, u) in oriented:
+                        u, v = v, u
+                else:
+                    stats.edges += 1
+                    oriented.add((u, v))
+                for node in (u, v):
+                    if node not in graph:
+                        stats.nodes += 1
+                graph.add_edge(u, v, **attributes)
+                # New edges hold exactly the record's attributes; repeats need the merge
+                edge_batch[u, v] = graph.adj[u][v] if duplicate else attributes
+            else:
+                stats.invalid += 1
+
+            if len(node_batch) + len(edge_batch) >= batch_size:
+                flush(writer)
+        flush(writer)
+
+    return graph, stats
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python ingest.py <graph.json | edges.ndjson | edges.csv> [--append]")
+        return
+    create_database()
+    append = "--append" in sys.argv[2:]
+    graph, stats = bulk_load(sys.argv[1], replace=not append)
+    # Record the stored graph as a base so the app does not mistake it for an earlier load
+    history = VersionHistory()
+    history.record_base(
+        history.latest() + 1,
+        load_graph_from_db() if append else graph,
+        f"ingest {sys.argv[1]}",
+    )
+    flush_journal()
+    print(f"Done: {stats}")
+
+
+if __name__ == "__main__":
+    main()
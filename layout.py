@@ -0,0 +1,130 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import networkx as nx
+
+
+def _jitter(node, scale=0.05):
+    """Deterministic small offset so nodes placed at the same centroid do not overlap."""
+    digest = hashlib.md5(repr(node).encode()).digest()
+    return (
+        (digest[0] / 255 - 0.5) * scale,
+        (digest[1] / 255 - 0.5) * scale,
+    )
+
+
+class _LayoutState:
+    def __init__(self, version, positions, labels, links):
+        self.version = version
+        self.positions = positions
+        self.labels = labels
+        # frozenset({u, v}) -> (u, v, relation)
+        self.links = links
+
+
+class LayoutCache:
+    """Server-side node positions, computed once per graph version.
+
+    Small edits keep every existing position and place new nodes at the
+    centroid of their already placed neighbors. When more than
+    ``relayout_fraction`` of the nodes are new, the whole graph is re-laid out
+    with ``nx.spring_layout`` warm-started from the previous positions. The
+    last ``history`` states are kept so clients can fetch deltas.
+    """
+
+    def __init__(self, history=4, relayout_fraction=0.1, iterations=50, warm_iterations=15, seed=42):
+        self.history = history
+        self.relayout_fraction = relayout_fraction
+        self.iterations = iterations
+        self.warm_iterations = warm_iterations
+        self.seed = seed
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def payload(self, graph, version, since=None):
+        """Compact layout for ``version``, or a delta against ``since`` when it is still known."""
+        with self._lock:
+            state = self._state(graph, version)
+            base = self._states.get(since) if since is not None else None
+        if base is None:
+            return self._full(state)
+        return self._delta(base, state)
+
+    def _state(self, graph, version):
+        state = self._states.get(version)
+        if state is None:
+            previous = next(reversed(self._states.values()), None)
+            state = self._compute(graph, version, previous)
+            self._states[version] = state
+            while len(self._states) > self.history:
+                self._states.popitem(last=False)
+        return state
+
+    def _compute(self, graph, version, previous):
+        old = previous.positions if previous else {}
+        new_nodes = [node for node in graph if node not in old]
+        if not old or len(new_nodes) > self.relayout_fraction * graph.number_of_nodes():
+            warm = {node: old[node] for node in graph if node in old}
+            layout = nx.spring_layout(
+                graph,
+                pos=warm or None,
+                iterations=self.warm_iterations if warm else self.iterations,
+                seed=self.seed,
+            )
+            positions = {node: tuple(round(float(c), 4) for c in xy) for node, xy in layout.items()}
+        else:
+            positions = {node: old[node] for node in graph if node in old}
+            for node in new_nodes:
+                placed = [positions[n] for n in graph.adj[node] if n in positions]
+                dx, dy = _jitter(node)
+                if placed:
+                    x = sum(p[0] for p in placed) / len(placed) + dx
+                    y = sum(p[1] for p in placed) / len(placed) + dy
+                else:
+                    x, y = dx * 20, dy * 20
+                positions[node] = (round(x, 4), round(y, 4))
+
+        labels = {node: str(data.get("label") or node) for node, data in graph.nodes(data=True)}
+        links = {
+            frozenset((u, v)): (u, v, data.get("relation", ""))
+            for u, v, data in graph.edges(data=True)
+        }
+        return _LayoutState(version, positions, labels, links)
+
+    @staticmethod
+    def _columns(state, nodes):
+        return {
+            "ids": nodes,
+            "labels": [state.labels[node] for node in nodes],
+            "x": [state.positions[node][0] for node in nodes],
+            "y": [state.positions[node][1] for node in nodes],
+        }
+
+    def _full(self, state):
+        nodes = list(state.positions)
+        index = {node: i for i, node in enumerate(nodes)}
+        payload = {"version": state.version, "delta": False}
+        payload.update(self._columns(state, nodes))
+        # Links reference nodes by their position in "ids"
+        payload["links"] = [[index[u], index[v], relation] for u, v, relation in state.links.values()]
+        return payload
+
+    def _delta(self, base, state):
+        changed = [
+            node
+            for node, xy in state.positions.items()
+            if base.positions.get(node) != xy or base.labels.get(node) != state.labels[node]
+        ]
+        payload = {"version": state.version, "since": base.version, "delta": True}
+        payload.update(self._columns(state, changed))
+        payload["removed"] = [node for node in base.positions if node not in state.positions]
+        payload["links_added"] = [
+            [u, v, relation]
+            for key, (u, v, relation) in state.links.items()
+            if base.links.get(key, (None, None, None))[2] != relation
+        ]
+        payload["links_removed"] = [
+            [u, v] for key, (u, v, _) in base.links.items() if key not in state.links
+        ]
+        return payload
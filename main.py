@@ -2,23 +2,50 @@ import json
 
 import matplotlib.pyplot as plt
 import networkx as nx
-from community import community_louvain
+
+from analytics import PageRankCache
+from communities import CommunityCache
+from expiry import ExpiryQueue, expiry_attributes
+from paths import bidirectional_path
+from snapshot import SnapshotCache
 
 
 class NeurosymbolicKnowledgeGraph:
     def __init__(self):
         self.graph = nx.Graph()
-
-    def add_node(self, node, attributes=None, lifetime=None):
-        """Add a new node to the graph with optional attributes and lifetime."""
+        # Bumped on every mutation; caches key their results on it
+        self.version = 0
+        self.snapshots = SnapshotCache()
+        self.pagerank_cache = PageRankCache(self.snapshots)
+        self.community_cache = CommunityCache(self.snapshots)
+        self.expiry = ExpiryQueue()
+
+    def mark_changed(self):
+        self.version += 1
+
+    def expire_nodes(self):
+        """Remove nodes whose TTL has passed; called before every read."""
+        nodes = self.expiry.due(self.graph)
+        if nodes:
+            self.graph.remove_nodes_from(nodes)
+            self.mark_changed()
+        return nodes
+
+    def add_node(self, node, attributes=None, lifetime=None, ttl_seconds=None):
+        """Add a new node to the graph with optional attributes, lifetime and time to live (in seconds)."""
         node_attrs = attributes or {}
         if lifetime:
             node_attrs['lifetime'] = lifetime
+        if ttl_seconds:
+            node_attrs.update(expiry_attributes(ttl_seconds))
         self.graph.add_node(node, **node_attrs)
+        self.expiry.schedule(node, self.graph.nodes[node])
+        self.mark_changed()
 
     def add_edge(self, node1, node2, attributes=None):
         """Add a new edge between two nodes with optional attributes."""
         self.graph.add_edge(node1, node2, **attributes if attributes else {})
+        self.mark_changed()
 
     def visualize(self):
         """Visualize the current state of the graph."""
@@ -42,6 +69,7 @@ class NeurosymbolicKnowledgeGraph:
 
     def query(self, node):
         """Retrieve information about a node and its neighbors."""
+        self.expire_nodes()
         if node not in self.graph:
             return f"Node '{node}' not found in the graph."
 
@@ -71,6 +99,7 @@ class NeurosymbolicKnowledgeGraph:
             with open(filename, "r") as f:
                 data = json.load(f)
             self.graph = nx.node_link_graph(data)
+            self.mark_changed()
             print(f"Graph loaded from {filename}")
         except FileNotFoundError:
             print(f"File {filename} not found. Starting with an empty graph.")
@@ -86,19 +115,24 @@ class NeurosymbolicKnowledgeGraph:
 
     def shortest_path(self, source, target):
         """Find the shortest path between two nodes."""
-        try:
-            path = nx.shortest_path(self.graph, source, target)
-            return f"Shortest path from {source} to {target}: {' -> '.join(path)}"
-        except nx.NetworkXNoPath:
+        self.expire_nodes()
+        for node in (source, target):
+            if node not in self.graph:
+                return f"Node '{node}' not found in the graph."
+        path = bidirectional_path(self.graph, source, target)
+        if path is None:
             return f"No path exists between {source} and {target}"
+        return f"Shortest path from {source} to {target}: {' -> '.join(path)}"
 
     def page_rank(self):
-        """Calculate PageRank for all nodes in the graph."""
-        return nx.pagerank(self.graph)
+        """Calculate PageRank for all nodes in the graph (cached per graph version)."""
+        self.expire_nodes()
+        return self.pagerank_cache.scores(self.graph, self.version)
 
     def detect_communities(self):
-        """Detect communities using the Louvain method."""
-        return community_louvain.best_partition(self.graph)
+        """Detect communities using the Louvain method (cached per graph version)."""
+        self.expire_nodes()
+        return self.community_cache.partition(self.graph, self.version).assignment
 
 
 def main():
@@ -126,7 +160,16 @@ def main():
                 "Enter node attributes (as JSON, press Enter for none): "
             )
             attributes = json.loads(attributes) if attributes else None
-            kg.add_node(node, attributes)
+            while True:
+                ttl_seconds = input("Enter time to live in seconds (press Enter for none): ")
+                try:
+                    ttl_seconds = float(ttl_seconds) if ttl_seconds else None
+                except ValueError:
+                    ttl_seconds = 0
+                if ttl_seconds is None or ttl_seconds > 0:
+                    break
+                print("Please enter a positive number of seconds.")
+            kg.add_node(node, attributes, ttl_seconds=ttl_seconds)
         elif choice == "2":
             node1 = input("Enter first node name: ")
             node2 = input("Enter second node name: ")
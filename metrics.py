@@ -0,0 +1,258 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as _Tally
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from sub-millisecond lookups to slow provider calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            lines.extend(self._render_series(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def _render_series(self, key, value):
+        yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket (not yet cumulative) counts, then sum and count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _render_series(self, key, value):
+        counts, total, count = value
+        labels = _format_labels(self.labelnames, key)
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+            yield f"{self.name}_bucket{le} {cumulative}"
+        yield f"{self.name}_sum{labels} {_format_value(total)}"
+        yield f"{self.name}_count{labels} {count}"
+
+
+class Registry:
+    """Named metrics plus collectors that report values read at scrape time.
+
+    A collector is a callable returning ``[(name, kind, help, samples), ...]``
+    with ``samples`` a list of ``(labels_dict, value)``; it is how caches that
+    already keep their own hit/miss counters are exposed. Registering a
+    collector under an existing name replaces it.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, name, collector):
+        with self._lock:
+            self._collectors[name] = collector
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collector in collectors:
+            for name, kind, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    label_text = _format_labels(list(labels), list(labels.values()))
+                    lines.append(f"{name}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time to produce a response, by route pattern.",
+    ("route", "method", "status"),
+)
+GRAPH_DB_SECONDS = REGISTRY.histogram(
+    "graph_db_duration_seconds",
+    "Graph storage operations: loads, full saves, bulk loads and journal commits.",
+    ("operation",),
+)
+JOURNAL_BATCH_SIZE = REGISTRY.histogram(
+    "graph_db_journal_batch_operations",
+    "Mutations committed per journal transaction.",
+    buckets=SIZE_BUCKETS,
+)
+JOURNAL_FAILURES = REGISTRY.counter(
+    "graph_db_journal_failures_total",
+    "Journal batches that failed to commit.",
+)
+ANALYTICS_SECONDS = REGISTRY.histogram(
+    "analytics_duration_seconds",
+    "Runtime of graph analytics (recomputations only, not cache hits).",
+    ("analysis",),
+)
+PROVIDER_SECONDS = REGISTRY.histogram(
+    "provider_request_duration_seconds",
+    "Latency of calls to model providers.",
+    ("provider", "operation"),
+)
+PROVIDER_ERRORS = REGISTRY.counter(
+    "provider_errors_total",
+    "Failed model provider calls, by exception type.",
+    ("provider", "operation", "error"),
+)
+PROVIDER_RETRIES = REGISTRY.counter(
+    "provider_retries_total",
+    "Provider calls retried after an error or throttling.",
+    ("provider", "operation"),
+)
+
+
+@contextmanager
+def provider_call(provider, operation):
+    """Time one provider call and count it as an error if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        PROVIDER_ERRORS.inc(provider=provider, operation=operation, error=type(e).__name__)
+        raise
+    finally:
+        PROVIDER_SECONDS.observe(time.perf_counter() - start, provider=provider, operation=operation)
+
+
+# Per-request sampling profiles are only taken when this is set
+PROFILING_ENABLED = os.environ.get("PROFILE_REQUESTS", "0") == "1"
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack every ``interval`` seconds from a helper thread.
+
+    Unlike cProfile it adds no per-call overhead to the profiled thread, so
+    timings stay representative. ``collapsed()`` returns the stacks in the
+    folded format read by flamegraph tools: ``root;...;leaf count``.
+    """
+
+    def __init__(self, thread_id=None, interval=0.002):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = 0
+        self._stacks = _Tally()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common()) + "\n"
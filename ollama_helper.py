@@ -4,14 +4,16 @@ import time
 
 import requests
 
+from clients import HTTP_TIMEOUT, get_http_session
 from database import create_database, save_response
+from metrics import PROVIDER_RETRIES, provider_call
 
 OLLAMA_API_URL = "http://localhost:11434/api"
 
 
 def is_ollama_server_running():
     try:
-        response = requests.get(f"{OLLAMA_API_URL}/tags", timeout=5)
+        response = get_http_session().get(f"{OLLAMA_API_URL}/tags", timeout=HTTP_TIMEOUT)
         return response.status_code == 200
     except requests.RequestException:
         return False
@@ -20,7 +22,8 @@ def is_ollama_server_running():
 def get_ollama_models(max_retries=3, retry_delay=5):
     for attempt in range(max_retries):
         try:
-            response = requests.get(f"{OLLAMA_API_URL}/tags", timeout=10)
+            with provider_call("Ollama", "list_models"):
+                response = get_http_session().get(f"{OLLAMA_API_URL}/tags", timeout=HTTP_TIMEOUT)
             if response.status_code == 200:
                 models = response.json().get("models", [])
                 return [model["name"] for model in models]
@@ -33,6 +36,7 @@ def get_ollama_models(max_retries=3, retry_delay=5):
 
         if attempt < max_retries - 1:
             print(f"Retrying in {retry_delay} seconds...")
+            PROVIDER_RETRIES.inc(provider="Ollama", operation="list_models")
             time.sleep(retry_delay)
 
     print("Failed to get Ollama models after all retries.")
@@ -47,8 +51,11 @@ def get_ollama_help(model_name, query, system_prompt=""):
             "system": system_prompt,
             "stream": False,
         }
-        response = requests.post(f"{OLLAMA_API_URL}/generate", json=payload, timeout=30)
-        response.raise_for_status()
+        with provider_call("Ollama", "generate"):
+            response = get_http_session().post(
+                f"{OLLAMA_API_URL}/generate", json=payload, timeout=HTTP_TIMEOUT
+            )
+            response.raise_for_status()
         help_text = response.json().get("response", "No help available.")
 
         save_response(
@@ -72,6 +79,66 @@ def get_ollama_help(model_name, query, system_prompt=""):
         return f"Error: An unexpected error occurred: {str(e)}"
 
 
+def stream_ollama_help(model_name, query, system_prompt=""):
+    """Yield response text from Ollama's streamed generate API as tokens arrive.
+
+    The full text is persisted with ``save_response`` once the stream ends.
+    Failures, including a malformed line from the server, end the stream
+    with an ``Error:`` token instead.
+    """
+    payload = {
+        "model": model_name,
+        "prompt": query,
+        "system": system_prompt,
+        "stream": True,
+    }
+    parts = []
+    try:
+        # Times the call up to the response headers; the stream is paced by the client
+        with provider_call("Ollama", "generate_stream"):
+            response = get_http_session().post(
+                f"{OLLAMA_API_URL}/generate", json=payload, timeout=HTTP_TIMEOUT, stream=True
+            )
+            response.raise_for_status()
+        with response:
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                try:
+                    chunk = json.loads(line)
+                except json.JSONDecodeError:
+                    chunk = None
+                if not isinstance(chunk, dict):
+                    text = line.decode("utf-8", "replace")[:200]
+                    yield f"Error: Malformed response from Ollama: {text}"
+                    return
+                token = chunk.get("response", "")
+                if token:
+                    parts.append(token)
+                    yield token
+                if chunk.get("done"):
+                    break
+    except requests.exceptions.Timeout:
+        yield f"Error: Request timed out when getting help for model {model_name}"
+        return
+    except requests.exceptions.HTTPError as e:
+        yield f"Error: HTTP error occurred: {e.response.status_code} - {e.response.text}"
+        return
+    except requests.exceptions.RequestException as e:
+        yield f"Error: An unexpected error occurred: {str(e)}"
+        return
+
+    save_response(
+        architecture_name="Neurosymbolic Knowledge Graph",
+        provider="Ollama",
+        model=model_name,
+        user_text=query,
+        front_content=system_prompt,
+        back_content="".join(parts),
+        system_prompt=system_prompt,
+    )
+
+
 def main():
     create_database()
     if not is_ollama_server_running():
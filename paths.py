@@ -0,0 +1,207 @@
+import threading
+
+import numpy as np
+
+from metrics import ANALYTICS_SECONDS
+from snapshot import SnapshotCache
+
+DEFAULT_LANDMARKS = 16
+
+
+def _walk(parents, node):
+    """Nodes from ``node`` back to the root of a BFS ``parents`` tree."""
+    path = []
+    while node is not None:
+        path.append(node)
+        node = parents[node]
+    return path
+
+
+def _walk_indexed(visited, node):
+    """Like ``_walk`` over ``{node: (parent, depth)}`` with -1 as the root's parent."""
+    path = []
+    while node != -1:
+        path.append(node)
+        node = visited[node][0]
+    return path
+
+
+def bidirectional_path(graph, source, target):
+    """Shortest hop path from ``source`` to ``target``, or None if they are not connected.
+
+    Runs BFS from both ends, each round expanding one whole level of the
+    smaller frontier, so it visits roughly ``2 * b ** (d / 2)`` nodes instead
+    of the ``b ** d`` of a one-sided search.
+    """
+    if source == target:
+        return [source]
+    forward, backward = {source: None}, {target: None}
+    forward_frontier, backward_frontier = [source], [target]
+    while forward_frontier and backward_frontier:
+        swapped = len(forward_frontier) > len(backward_frontier)
+        if swapped:
+            forward, backward = backward, forward
+            forward_frontier, backward_frontier = backward_frontier, forward_frontier
+
+        next_frontier = []
+        for node in forward_frontier:
+            for neighbor in graph.adj[node]:
+                # Only the other side's frontier can be hit (its interior nodes
+                # have all their neighbors visited), so the first hit is shortest
+                if neighbor in backward:
+                    path = _walk(forward, node)[::-1] + _walk(backward, neighbor)
+                    return path if path[0] == source else path[::-1]
+                if neighbor not in forward:
+                    forward[neighbor] = node
+                    next_frontier.append(neighbor)
+        forward_frontier = next_frontier
+        if swapped:
+            forward, backward = backward, forward
+            forward_frontier, backward_frontier = backward_frontier, forward_frontier
+    return None
+
+
+class LandmarkIndex:
+    """Hop distances from a few landmark nodes to every node (ALT preprocessing).
+
+    ``distances[i, l]`` is the distance from node ``snapshot.node_ids[i]``
+    to landmark ``l`` (-1 when unreachable); rows are node-major so one
+    node's distances are contiguous. By the triangle inequality
+    ``|d(l, u) - d(l, v)| <= d(u, v) <= d(l, u) + d(l, v)`` for every landmark,
+    so bounds on any distance cost O(landmarks).
+    """
+
+    def __init__(self, snapshot, landmarks, distances):
+        self.snapshot = snapshot
+        self.version = snapshot.version
+        self.landmarks = landmarks
+        self.distances = distances
+        self.distances.setflags(write=False)
+
+    @classmethod
+    def build(cls, snapshot, count=DEFAULT_LANDMARKS):
+        """Pick landmarks by farthest-point selection, one BFS per landmark.
+
+        The first landmark is the highest-degree node; each next one is the
+        node farthest from all landmarks so far, preferring nodes no landmark
+        reaches, so every component gets covered.
+        """
+        size = snapshot.number_of_nodes()
+        landmarks, rows = [], []
+        if size:
+            closest = np.full(size, np.iinfo(np.int32).max, dtype=np.int64)
+            candidate = int(np.argmax(snapshot.degrees))
+            for _ in range(min(count, size)):
+                row = snapshot.bfs(snapshot.node_ids[candidate])
+                landmarks.append(snapshot.node_ids[candidate])
+                rows.append(row)
+                reached = row >= 0
+                closest[reached] = np.minimum(closest[reached], row[reached])
+                closest[candidate] = -1
+                candidate = int(np.argmax(closest))
+                if closest[candidate] <= 0:
+                    break
+        distances = np.ascontiguousarray(np.array(rows, dtype=np.int32).reshape(len(rows), size).T)
+        return cls(snapshot, landmarks, distances)
+
+    def bounds(self, source, target):
+        """``(lower, upper)`` hop-distance bounds; ``(None, None)`` if provably unreachable.
+
+        ``upper`` is None when no landmark reaches the pair's component.
+        """
+        index = self.snapshot.index
+        ds = self.distances[index[source]]
+        dt = self.distances[index[target]]
+        if ((ds >= 0) != (dt >= 0)).any():
+            return None, None
+        shared = ds >= 0
+        if not shared.any():
+            return 0, None
+        ds, dt = ds[shared], dt[shared]
+        return int(np.abs(ds - dt).max()), int((ds + dt).min())
+
+    def _lower_bounds(self, nodes, goal):
+        """Landmark lower bounds on the distance from each of ``nodes`` (indices) to ``goal``."""
+        goal_distances = self.distances[goal]
+        usable = goal_distances >= 0
+        if not usable.any():
+            return np.zeros(len(nodes), dtype=np.int32)
+        return np.abs(self.distances[nodes][:, usable] - goal_distances[usable]).max(axis=1)
+
+    def path(self, source, target):
+        """Shortest hop path by bidirectional BFS pruned with the landmark bounds.
+
+        A node reached at depth ``d`` whose lower bound to the other end
+        exceeds ``upper - d`` cannot lie on a shortest path, so it is dropped
+        from the frontier; the check is vectorized once per level.
+        """
+        snapshot = self.snapshot
+        start, goal = snapshot.index[source], snapshot.index[target]
+        lower, upper = self.bounds(source, target)
+        if lower is None:
+            return None
+        if start == goal:
+            return [source]
+
+        # Per side: node -> (parent, depth), the frontier and its depth, the end it heads for
+        visited = ({start: (-1, 0)}, {goal: (-1, 0)})
+        frontiers = [[start], [goal]]
+        depths = [0, 0]
+        toward = (goal, start)
+        best = None
+        while frontiers[0] and frontiers[1]:
+            # Meetings found from here on are at least this long
+            if best is not None and best[0] <= depths[0] + depths[1] + 1:
+                break
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            mine, other = visited[side], visited[1 - side]
+            depth = depths[side] + 1
+            next_frontier = []
+            for node in frontiers[side]:
+                for neighbor in snapshot.indices[snapshot.indptr[node] : snapshot.indptr[node + 1]].tolist():
+                    if neighbor in other:
+                        length = depth + other[neighbor][1]
+                        if best is None or length < best[0]:
+                            best = (length, side, node, neighbor)
+                    elif neighbor not in mine:
+                        mine[neighbor] = (node, depth)
+                        next_frontier.append(neighbor)
+            if upper is not None and next_frontier:
+                keep = (depth + self._lower_bounds(next_frontier, toward[side]) <= upper).tolist()
+                for neighbor, kept in zip(next_frontier, keep):
+                    if not kept:
+                        del mine[neighbor]
+                next_frontier = [neighbor for neighbor, kept in zip(next_frontier, keep) if kept]
+            frontiers[side] = next_frontier
+            depths[side] = depth
+
+        if best is None:
+            return None
+        _, side, node, neighbor = best
+        path = _walk_indexed(visited[side], node)[::-1] + _walk_indexed(visited[1 - side], neighbor)
+        if side == 1:
+            path.reverse()
+        return [snapshot.node_ids[i] for i in path]
+
+
+class LandmarkCache:
+    """The ``LandmarkIndex`` of the latest graph version, rebuilt when the version changes."""
+
+    def __init__(self, snapshots=None, count=DEFAULT_LANDMARKS):
+        self.snapshots = snapshots or SnapshotCache()
+        self.count = count
+        self.hits = 0
+        self.misses = 0
+        self._index = None
+        self._lock = threading.Lock()
+
+    def get(self, graph, version):
+        with self._lock:
+            if self._index is None or self._index.version != version:
+                self.misses += 1
+                snapshot = self.snapshots.get(graph, version)
+                with ANALYTICS_SECONDS.time(analysis="landmarks"):
+                    self._index = LandmarkIndex.build(snapshot, self.count)
+            else:
+                self.hits += 1
+            return self._index
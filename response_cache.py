@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from database import get_cached_response, prune_cached_responses, put_cached_response
+from singleflight import SingleFlight
+
+DEFAULT_TTL = float(os.environ.get("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+DEFAULT_MEMORY_ENTRIES = int(os.environ.get("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+DEFAULT_PERSISTENT_ENTRIES = int(os.environ.get("LLM_CACHE_PERSISTENT_ENTRIES", "100000"))
+# Prune expired SQLite rows after this many stores
+PRUNE_EVERY = 500
+
+
+def cache_key(provider, model, system_prompt, prompt, params=None):
+    """Content address of a model call: SHA-256 over every input that shapes the output."""
+    material = json.dumps(
+        [provider, model, system_prompt, prompt, params or {}],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Read-through cache for LLM responses.
+
+    An in-memory LRU tier of ``memory_entries`` sits in front of the SQLite
+    ``response_cache`` table. Entries older than ``ttl`` seconds are treated as
+    misses in both tiers. Concurrent misses for the same key share one
+    upstream call.
+    """
+
+    def __init__(
+        self,
+        ttl=DEFAULT_TTL,
+        memory_entries=DEFAULT_MEMORY_ENTRIES,
+        persistent_entries=DEFAULT_PERSISTENT_ENTRIES,
+        persistent=True,
+    ):
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.persistent_entries = persistent_entries
+        self.persistent = persistent
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._stores = 0
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def stats(self):
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        return {
+            "hits": hits,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._entries),
+            "upstream_calls": self._flights.calls,
+            "coalesced": self._flights.coalesced,
+        }
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[1] <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[0]
+                del self._entries[key]
+
+        row = None
+        if self.persistent:
+            try:
+                row = get_cached_response(key)
+            except sqlite3.Error as e:
+                logging.error(f"Error reading LLM response cache: {str(e)}")
+        with self._lock:
+            if row is not None and now - row[1] <= self.ttl:
+                self.persistent_hits += 1
+                self._remember(key, row[0], row[1])
+                return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, provider, model, response):
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, response, created_at)
+            self._stores += 1
+            prune = self._stores % PRUNE_EVERY == 0
+        if self.persistent:
+            put_cached_response(key, provider, model, response, created_at)
+            if prune:
+                prune_cached_responses(created_at - self.ttl, self.persistent_entries)
+
+    def _remember(self, key, response, created_at):
+        self._entries[key] = (response, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.memory_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_call(self, provider, model, system_prompt, prompt, params, call, cacheable=None):
+        """Return the cached response or ``call()``'s result, storing it if ``cacheable(result)``."""
+        key = cache_key(provider, model, system_prompt, prompt, params)
+        response = self.get(key)
+        if response is not None:
+            return response
+
+        def fetch():
+            # A call that finished between our miss and joining the flight has
+            # already stored its result
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None and time.time() - entry[1] <= self.ttl:
+                return entry[0]
+            result = call()
+            if cacheable is None or cacheable(result):
+                self.put(key, provider, model, result)
+            return result
+
+        return self._flights.do(key, fetch)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,76 @@
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """Any number of readers or a single writer.
+
+    Waiting writers hold off new readers, so a steady stream of reads cannot
+    starve them; the readers already waiting when a writer finishes go
+    before the next writer, so back-to-back writes cannot starve reads
+    either. Reads are reentrant, and the thread holding the write lock may
+    read as well (code it calls can use ``read()`` freely). Asking for the
+    write lock while holding a read lock raises ``RuntimeError`` instead of
+    deadlocking.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._waiting_readers = 0
+        self._waiting_writers = 0
+        # Readers let in ahead of waiting writers when the last writer released
+        self._granted = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def read(self):
+        depth = getattr(self._local, "depth", 0)
+        if depth or self._writer == threading.get_ident():
+            self._local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self._local.depth = depth
+            return
+
+        with self._cond:
+            self._waiting_readers += 1
+            try:
+                while self._writer is not None or (self._waiting_writers and not self._granted):
+                    self._cond.wait()
+            finally:
+                self._waiting_readers -= 1
+            if self._granted:
+                self._granted -= 1
+            self._readers += 1
+        self._local.depth = 1
+        try:
+            yield
+        finally:
+            self._local.depth = 0
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        if getattr(self._local, "depth", 0):
+            raise RuntimeError("Cannot take the write lock while holding a read lock")
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers or self._granted:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = threading.get_ident()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = None
+                self._granted = self._waiting_readers
+                self._cond.notify_all()
@@ -0,0 +1,198 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from analytics import MAX_TOP_K
+from database import get_analytics_result, put_analytics_result
+
+DEFAULT_WORKERS = int(os.environ.get("ANALYTICS_WORKERS", "2"))
+# Finished jobs kept for polling; older ones are forgotten
+MAX_FINISHED_JOBS = 256
+
+
+def _pagerank(kg, graph, version, params):
+    return [[node, score] for node, score in kg.pagerank_cache.ranking(graph, version)]
+
+
+def _distances(kg, graph, version, params):
+    k = max(1, min(int(params.get("k", 20)), MAX_TOP_K))
+    result = kg.distance_cache.top_k(graph, version, k)
+    return {
+        "nodes": result.nodes,
+        "matrix": result.matrix.tolist(),
+        "max_distance": result.max_distance,
+        "mean_distance": result.mean_distance,
+        "unreachable_pairs": result.unreachable_pairs,
+    }
+
+
+def _communities(kg, graph, version, params):
+    state = kg.community_cache.partition(graph, version)
+    return {
+        "partition": [[node, community] for node, community in state.assignment.items()],
+        "modularity": state.modularity,
+        "communities": kg.community_cache.summaries(graph, version, int(params.get("top", 5))),
+    }
+
+
+def _landmarks(kg, graph, version, params):
+    index = kg.landmark_cache.get(graph, version)
+    return {"landmarks": index.landmarks, "nodes": index.snapshot.number_of_nodes()}
+
+
+# Analysis name -> fn(kg, graph, version, params) returning a JSON-serializable
+# result; ``graph`` is a private copy of kg.graph at ``version``, so it runs
+# without holding the graph lock
+ANALYSES = {
+    "pagerank": _pagerank,
+    "distances": _distances,
+    "communities": _communities,
+    "landmarks": _landmarks,
+}
+
+
+def graph_version_key(version):
+    # Versions are recorded in the history and continue across restarts, so a
+    # version names the same graph in every process
+    return str(version)
+
+
+class AnalyticsJob:
+    def __init__(self, kind, params, version):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.version = version
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.cached = False
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "graph_version": self.version,
+            "status": self.status,
+            "cached": self.cached,
+            "error": self.error,
+            "queued_seconds": round((self.started_at or time.time()) - self.submitted_at, 3),
+            "run_seconds": round(
+                (self.finished_at or time.time()) - self.started_at, 3
+            ) if self.started_at else 0.0,
+        }
+
+
+class AnalyticsScheduler:
+    """Runs heavy graph analytics on a worker pool instead of in request handlers.
+
+    Results are stored in SQLite keyed by graph version, so an analysis is
+    computed once per version: resubmitting it returns a finished job with
+    the stored result, and an identical job still queued or running is
+    returned instead of starting another. A job copies the graph when it
+    starts (the only time it holds the read lock), computes on the copy and
+    is keyed on the copied version, which is later than the submitted one
+    if the graph changed while it was queued.
+    """
+
+    def __init__(self, kg, workers=DEFAULT_WORKERS):
+        self.kg = kg
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analytics")
+        self._jobs = OrderedDict()
+        # (kind, params, version) -> job still queued or running
+        self._active = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _params_key(params):
+        return json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+    def submit(self, kind, params=None):
+        if kind not in ANALYSES:
+            raise ValueError(f"Unknown analysis '{kind}'; expected one of {sorted(ANALYSES)}")
+        if params is not None and not isinstance(params, dict):
+            raise ValueError("params must be an object")
+        params = params or {}
+        version = self.kg.version
+        params_key = self._params_key(params)
+        active_key = (kind, params_key, version)
+
+        with self._lock:
+            job = self._active.get(active_key)
+            if job is not None:
+                return job
+            job = AnalyticsJob(kind, params, version)
+            stored = get_analytics_result(kind, params_key, graph_version_key(version))
+            if stored is not None:
+                job.status = "done"
+                job.cached = True
+                job.result = json.loads(stored)
+                job.started_at = job.finished_at = job.submitted_at
+            else:
+                self._active[active_key] = job
+            self._remember(job)
+
+        if not job.finished:
+            self._pool.submit(self._run, job, params_key, active_key)
+        return job
+
+    def _remember(self, job):
+        self._jobs[job.id] = job
+        while len(self._jobs) > MAX_FINISHED_JOBS:
+            oldest = next(iter(self._jobs.values()))
+            if not oldest.finished:
+                break
+            self._jobs.popitem(last=False)
+
+    def _run(self, job, params_key, active_key):
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            with self.kg.reading():
+                job.version = self.kg.version
+                graph = self.kg.graph.copy()
+            stored = get_analytics_result(job.kind, params_key, graph_version_key(job.version))
+            if stored is not None:
+                job.cached = True
+                job.result = json.loads(stored)
+            else:
+                job.result = ANALYSES[job.kind](self.kg, graph, job.version, job.params)
+                put_analytics_result(
+                    job.kind,
+                    params_key,
+                    graph_version_key(job.version),
+                    json.dumps(job.result),
+                    time.time(),
+                )
+            job.status = "done"
+        except Exception as e:
+            logging.exception(f"Analytics job {job.id} ({job.kind}) failed")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active.pop(active_key, None)
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        return list(self._jobs.values())
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,197 @@
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from database import search_nodes_fulltext
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _TOKEN.findall(str(text).lower())
+
+
+def fulltext_query(query):
+    """FTS5 match expression for ``query``: all terms, the last one as a prefix."""
+    terms = tokenize(query)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms) + "*"
+
+
+class SearchIndex:
+    """In-memory inverted index over node ids and the ``fields`` attributes.
+
+    Tokens are kept in a sorted list next to the postings, so a prefix lookup
+    is a bisect plus a scan over the matching tokens. Attributes listed in
+    ``facets`` also get a value -> nodes index for filtering. The index is
+    rebuilt when handed a different graph object and otherwise maintained
+    with ``update``/``remove`` as nodes change.
+    """
+
+    def __init__(self, fields=("label", "school"), facets=("school",), max_candidates=200):
+        self.fields = fields
+        self.facets = facets
+        self.max_candidates = max_candidates
+        self._graph = None
+        self._postings = defaultdict(set)
+        self._tokens = []
+        self._node_tokens = {}
+        self._facet_values = {facet: defaultdict(set) for facet in facets}
+        self._lock = threading.Lock()
+
+    def _node_terms(self, node, attributes):
+        values = [str(node)] + [str(attributes[f]) for f in self.fields if f in attributes]
+        return set(tokenize(" ".join(values)))
+
+    def _index(self, node, attributes):
+        """Record ``node``'s postings and facets; returns tokens that are new to the index."""
+        tokens = self._node_terms(node, attributes)
+        facets = {f: str(attributes[f]) for f in self.facets if f in attributes}
+        self._node_tokens[node] = (tokens, facets)
+        new_tokens = []
+        for token in tokens:
+            postings = self._postings[token]
+            if not postings:
+                new_tokens.append(token)
+            postings.add(node)
+        for facet, value in facets.items():
+            self._facet_values[facet][value].add(node)
+        return new_tokens
+
+    def _add(self, node, attributes):
+        for token in self._index(node, attributes):
+            insort(self._tokens, token)
+
+    def _remove(self, node):
+        entry = self._node_tokens.pop(node, None)
+        if entry is None:
+            return
+        tokens, facets = entry
+        for token in tokens:
+            postings = self._postings[token]
+            postings.discard(node)
+            if not postings:
+                del self._postings[token]
+                del self._tokens[bisect_left(self._tokens, token)]
+        for facet, value in facets.items():
+            self._facet_values[facet][value].discard(node)
+
+    def rebuild(self, graph):
+        with self._lock:
+            self._graph = graph
+            self._postings = defaultdict(set)
+            self._node_tokens = {}
+            self._facet_values = {facet: defaultdict(set) for facet in self.facets}
+            for node, attributes in graph.nodes(data=True):
+                self._index(node, attributes)
+            self._tokens = sorted(self._postings)
+
+    def update(self, node, attributes):
+        """(Re)index ``node`` after it was added or its attributes changed."""
+        with self._lock:
+            if self._graph is None:
+                return
+            self._remove(node)
+            self._add(node, attributes)
+
+    def remove(self, node):
+        with self._lock:
+            if self._graph is not None:
+                self._remove(node)
+
+    def _prefix_matches(self, prefix, within, cap):
+        """Up to ``cap`` nodes having a token that starts with ``prefix``, in token order.
+
+        Tokens sort exact matches first, so the cap only cuts off the least
+        specific completions.
+        """
+        tokens = self._tokens
+        start = bisect_left(tokens, prefix)
+        end = bisect_left(tokens, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+        if within is not None and len(within) < end - start:
+            # Fewer candidates than completions: test each candidate's own tokens
+            matches = {}
+            for node in within:
+                if any(token.startswith(prefix) for token in self._node_tokens[node][0]):
+                    matches[node] = None
+                    if len(matches) >= cap:
+                        break
+            return matches
+
+        matches = {}
+        for i in range(start, end):
+            token = tokens[i]
+            postings = self._postings[token]
+            if within is None:
+                source = postings
+            elif len(within) < len(postings):
+                source = (node for node in within if node in postings)
+            else:
+                source = (node for node in postings if node in within)
+            for node in source:
+                matches[node] = None
+                if len(matches) >= cap:
+                    return matches
+        return matches
+
+    def search(self, graph, query="", filters=None, limit=10):
+        """Node ids matching every term of ``query`` (the last as a prefix) and ``filters``.
+
+        ``filters`` maps attribute names to required values. Exact and
+        prefix matches on the id or label rank first.
+        """
+        if graph is not self._graph:
+            self.rebuild(graph)
+        filters = filters or {}
+        with self._lock:
+            candidates = None
+            for facet, value in filters.items():
+                if facet in self._facet_values:
+                    nodes = self._facet_values[facet].get(str(value), set())
+                    candidates = nodes if candidates is None else candidates & nodes
+            terms = tokenize(query)
+            for term in terms[:-1]:
+                nodes = self._postings.get(term, set())
+                candidates = nodes if candidates is None else candidates & nodes
+            if terms:
+                cap = min(self.max_candidates, max(limit * 5, 50))
+                candidates = self._prefix_matches(terms[-1], candidates, cap)
+            elif candidates is None:
+                candidates = graph.nodes
+
+            scanned = [name for name in filters if name not in self.facets]
+            results = []
+            for node in candidates:
+                if node not in graph:
+                    continue
+                attributes = graph.nodes[node]
+                if any(str(attributes.get(name)) != str(filters[name]) for name in scanned):
+                    continue
+                results.append(node)
+                # Without a query there is nothing to rank, so stop at the limit
+                if not terms and len(results) >= limit:
+                    break
+
+        needle = query.strip().lower()
+        results.sort(key=lambda node: self._rank(graph, node, needle))
+        return results[:limit]
+
+    @staticmethod
+    def _rank(graph, node, needle):
+        label = str(graph.nodes[node].get("label", node)).lower()
+        name = str(node).lower()
+        if name == needle or label == needle:
+            tier = 0
+        elif name.startswith(needle) or label.startswith(needle):
+            tier = 1
+        else:
+            tier = 2
+        return (tier, len(label), label)
+
+    @staticmethod
+    def fulltext(query, limit=10):
+        """Search labels, schools and enriched info through SQLite FTS5."""
+        match = fulltext_query(query)
+        return search_nodes_fulltext(match, limit) if match else []
@@ -0,0 +1,175 @@
+import threading
+
+import numpy as np
+
+from metrics import ANALYTICS_SECONDS
+
+# Attribute code for nodes/edges that do not carry the attribute
+MISSING = -1
+
+
+def _intern(values):
+    """Encode ``values`` as int32 codes into a list of distinct categories."""
+    categories = []
+    lookup = {}
+    codes = np.full(len(values), MISSING, dtype=np.int32)
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(categories)
+            categories.append(value)
+        codes[i] = code
+    return codes, categories
+
+
+class GraphSnapshot:
+    """Frozen, compact CSR copy of an undirected ``nx.Graph`` for read-only analytics.
+
+    Nodes are interned to ``0..n-1`` (``node_ids[i]`` / ``index[node]``). The
+    neighbors of ``i`` are ``indices[indptr[i]:indptr[i + 1]]``; every edge is
+    stored once per direction. Node attributes are held as
+    ``node_columns[name] = (codes, categories)`` and edge attributes as
+    ``edge_columns[name]`` aligned with ``indices``.
+    """
+
+    def __init__(self, node_ids, indptr, indices, node_columns, edge_columns, version=None):
+        self.node_ids = node_ids
+        self.index = {node: i for i, node in enumerate(node_ids)}
+        self.indptr = indptr
+        self.indices = indices
+        self.node_columns = node_columns
+        self.edge_columns = edge_columns
+        self.version = version
+        self.degrees = np.diff(indptr).astype(np.int32)
+        # Source node of every CSR entry, used to vectorize per-edge work
+        self.rows = np.repeat(np.arange(len(node_ids), dtype=np.int32), self.degrees)
+        for array in (indptr, indices, self.degrees, self.rows):
+            array.setflags(write=False)
+
+    @classmethod
+    def from_graph(cls, graph, node_attrs=("school",), edge_attrs=("relation",), version=None):
+        node_ids = list(graph.nodes)
+        index = {node: i for i, node in enumerate(node_ids)}
+        size = len(node_ids)
+
+        degrees = np.fromiter((len(graph.adj[node]) for node in node_ids), np.int64, size)
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(degrees, out=indptr[1:])
+        indices = np.empty(int(indptr[-1]), dtype=np.int32)
+        edge_values = {name: [None] * len(indices) for name in edge_attrs}
+        for i, node in enumerate(node_ids):
+            start = indptr[i]
+            for offset, (neighbor, data) in enumerate(graph.adj[node].items()):
+                indices[start + offset] = index[neighbor]
+                for name in edge_attrs:
+                    edge_values[name][start + offset] = data.get(name)
+
+        node_columns = {
+            name: _intern([graph.nodes[node].get(name) for node in node_ids])
+            for name in node_attrs
+        }
+        edge_columns = {name: _intern(values) for name, values in edge_values.items()}
+        return cls(node_ids, indptr, indices, node_columns, edge_columns, version)
+
+    def number_of_nodes(self):
+        return len(self.node_ids)
+
+    def number_of_edges(self):
+        # A self-loop is stored once, every other edge once per direction
+        loops = int((self.rows == self.indices).sum())
+        return (len(self.indices) + loops) // 2
+
+    def neighbors(self, node):
+        i = self.index[node]
+        return [self.node_ids[j] for j in self.indices[self.indptr[i] : self.indptr[i + 1]]]
+
+    def degree(self):
+        """``{node: degree}`` like ``nx.Graph.degree``, which counts a self-loop twice."""
+        loops = self.rows[self.rows == self.indices]
+        degrees = self.degrees + np.bincount(loops, minlength=self.number_of_nodes())
+        return dict(zip(self.node_ids, degrees.tolist()))
+
+    def node_attribute(self, name):
+        """Return ``{node: value}`` for nodes that carry attribute ``name``."""
+        codes, categories = self.node_columns[name]
+        return {
+            self.node_ids[i]: categories[code]
+            for i, code in enumerate(codes.tolist())
+            if code != MISSING
+        }
+
+    def _expand(self, frontier):
+        """All CSR entry positions of the nodes in ``frontier``."""
+        starts = self.indptr[frontier]
+        counts = self.degrees[frontier]
+        total = int(counts.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return offsets + np.arange(total)
+
+    def bfs(self, source, targets=None):
+        """Hop distances from ``source`` as an int32 array, -1 where unreachable.
+
+        With ``targets`` (an array of node indices) the search stops once all
+        of them are reached; farther nodes are then left at -1.
+        """
+        distances = np.full(self.number_of_nodes(), -1, dtype=np.int32)
+        start = self.index[source]
+        distances[start] = 0
+        frontier = np.array([start], dtype=np.int32)
+        depth = 0
+        while frontier.size:
+            if targets is not None and (distances[targets] >= 0).all():
+                break
+            depth += 1
+            neighbors = np.unique(self.indices[self._expand(frontier)])
+            frontier = neighbors[distances[neighbors] == -1]
+            distances[frontier] = depth
+        return distances
+
+    def pagerank(self, alpha=0.85, tol=1e-06, max_iter=100, nstart=None):
+        """Power-iteration PageRank matching ``nx.pagerank`` on unweighted graphs.
+
+        ``nstart`` is an optional starting vector aligned with ``node_ids``.
+        Returns ``(scores, iterations)``.
+        """
+        size = self.number_of_nodes()
+        if size == 0:
+            return np.zeros(0), 0
+        x = np.full(size, 1.0 / size) if nstart is None else np.asarray(nstart, float)
+        x = x / x.sum()
+        dangling = self.degrees == 0
+        inverse_degree = np.zeros(size)
+        inverse_degree[~dangling] = 1.0 / self.degrees[~dangling]
+        weights = inverse_degree[self.rows]
+
+        for iteration in range(1, max_iter + 1):
+            previous = x
+            spread = np.bincount(self.indices, weights=previous[self.rows] * weights, minlength=size)
+            x = alpha * (spread + previous[dangling].sum() / size) + (1 - alpha) / size
+            if np.abs(x - previous).sum() < size * tol:
+                return x, iteration
+        raise RuntimeError(f"PageRank failed to converge in {max_iter} iterations")
+
+
+class SnapshotCache:
+    """Holds the latest ``GraphSnapshot`` and rebuilds it only when the version changes."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def get(self, graph, version):
+        with self._lock:
+            if self._snapshot is None or self._snapshot.version != version:
+                self.misses += 1
+                with ANALYTICS_SECONDS.time(analysis="csr_snapshot"):
+                    self._snapshot = GraphSnapshot.from_graph(graph, version=version)
+            else:
+                self.hits += 1
+            return self._snapshot
@@ -0,0 +1,132 @@
+// Renders the server-computed layout from /layout as SVG. Positions come
+// from the server, so the browser never lays out the graph itself; after the
+// first load only deltas since the last seen version are fetched.
+function GraphView(container) {
+    this.container = container;
+    this.version = null;
+    this.nodes = {};   // id -> {label, x, y}
+    this.links = {};   // "source\u0000target" -> {source, target, relation}
+    this.communities = {};   // id -> community id from /communities
+}
+
+GraphView.prototype.palette = [
+    '#8dd3c7', '#ffffb3', '#bebada', '#fb8072', '#80b1d3',
+    '#fdb462', '#b3de69', '#fccde5', '#d9d9d9', '#bc80bd'
+];
+
+GraphView.prototype.linkKey = function(source, target) {
+    return source < target ? source + '\u0000' + target : target + '\u0000' + source;
+};
+
+GraphView.prototype.applyNodes = function(payload) {
+    for (var i = 0; i < payload.ids.length; i++) {
+        this.nodes[payload.ids[i]] = {
+            label: payload.labels[i],
+            x: payload.x[i],
+            y: payload.y[i]
+        };
+    }
+};
+
+GraphView.prototype.apply = function(payload) {
+    var self = this;
+    if (!payload.delta) {
+        this.nodes = {};
+        this.links = {};
+        this.applyNodes(payload);
+        payload.links.forEach(function(link) {
+            var source = payload.ids[link[0]], target = payload.ids[link[1]];
+            self.links[self.linkKey(source, target)] = {source: source, target: target, relation: link[2]};
+        });
+    } else {
+        this.applyNodes(payload);
+        payload.removed.forEach(function(id) { delete self.nodes[id]; });
+        payload.links_removed.forEach(function(link) {
+            delete self.links[self.linkKey(link[0], link[1])];
+        });
+        payload.links_added.forEach(function(link) {
+            self.links[self.linkKey(link[0], link[1])] = {source: link[0], target: link[1], relation: link[2]};
+        });
+    }
+    this.version = payload.version;
+};
+
+GraphView.prototype.refresh = function() {
+    var self = this;
+    var url = this.version === null ? '/layout' : '/layout?since=' + this.version;
+    return $.get(url, function(payload) {
+        if (payload.version !== self.version || !payload.delta) {
+            self.apply(payload);
+            self.render();
+            self.refreshCommunities();
+        }
+    });
+};
+
+GraphView.prototype.refreshCommunities = function() {
+    var self = this;
+    return $.get('/communities?limit=0', function(payload) {
+        self.communities = payload.assignment;
+        self.render();
+    });
+};
+
+GraphView.prototype.render = function() {
+    var svgNS = 'http://www.w3.org/2000/svg';
+    var ids = Object.keys(this.nodes);
+    var width = this.container.clientWidth || 800, height = 600, margin = 60;
+    var minX = Infinity, maxX = -Infinity, minY = Infinity, maxY = -Infinity;
+    var self = this;
+    ids.forEach(function(id) {
+        var node = self.nodes[id];
+        minX = Math.min(minX, node.x); maxX = Math.max(maxX, node.x);
+        minY = Math.min(minY, node.y); maxY = Math.max(maxY, node.y);
+    });
+    var scaleX = (width - 2 * margin) / ((maxX - minX) || 1);
+    var scaleY = (height - 2 * margin) / ((maxY - minY) || 1);
+    function px(node) { return margin + (node.x - minX) * scaleX; }
+    function py(node) { return margin + (node.y - minY) * scaleY; }
+
+    var svg = document.createElementNS(svgNS, 'svg');
+    svg.setAttribute('width', width);
+    svg.setAttribute('height', height);
+
+    Object.keys(this.links).forEach(function(key) {
+        var link = self.links[key];
+        var source = self.nodes[link.source], target = self.nodes[link.target];
+        if (!source || !target) {
+            return;
+        }
+        var line = document.createElementNS(svgNS, 'line');
+        line.setAttribute('x1', px(source));
+        line.setAttribute('y1', py(source));
+        line.setAttribute('x2', px(target));
+        line.setAttribute('y2', py(target));
+        line.setAttribute('stroke', '#999');
+        var title = document.createElementNS(svgNS, 'title');
+        title.textContent = link.relation;
+        line.appendChild(title);
+        svg.appendChild(line);
+    });
+
+    ids.forEach(function(id) {
+        var node = self.nodes[id];
+        var circle = document.createElementNS(svgNS, 'circle');
+        circle.setAttribute('cx', px(node));
+        circle.setAttribute('cy', py(node));
+        circle.setAttribute('r', 6);
+        var community = self.communities[id];
+        circle.setAttribute('fill', community === undefined ? 'lightblue' : self.palette[community % self.palette.length]);
+        circle.setAttribute('stroke', '#333');
+        svg.appendChild(circle);
+        var text = document.createElementNS(svgNS, 'text');
+        text.setAttribute('x', px(node) + 8);
+        text.setAttribute('y', py(node) + 4);
+        text.setAttribute('font-size', '12');
+        text.textContent = node.label;
+        svg.appendChild(text);
+    });
+
+    this.container.innerHTML = '';
+    this.container.appendChild(svg);
+};
@@ -1,26 +1,24 @@
-function escapeLabel(label) {
-    return label.replace(/[&<>'"]/g, function(char) {
-        switch (char) {
-            case '&': return '&amp;';
-            case '<': return '&lt;';
-            case '>': return '&gt;';
-            case "'": return '&#39;';
-            case '"': return '&quot;';
-            default: return char;
-        }
-    });
-}
-
 $(document).ready(function() {
     // Initialize clipboard.js
     new ClipboardJS('.copy-icon');
 
-    // Load nodes
-    $.get('/get_nodes', function(nodes) {
-        var select = $('#node-select');
-        nodes.forEach(function(node) {
-            select.append($('<option></option>').val(node).text(node));
+    // Fill the node list from the search index as the user types
+    var searchRequest = null;
+    function loadNodes(query) {
+        if (searchRequest) {
+            searchRequest.abort();
+        }
+        searchRequest = $.get('/search', {q: query, limit: 50}, function(response) {
+            var select = $('#node-select');
+            select.find('option:not(:first)').remove();
+            response.results.forEach(function(node) {
+                select.append($('<option></option>').val(node.id).text(node.label || node.id));
+            });
         });
+    }
+    loadNodes('');
+    $('#node-search').on('input', function() {
+        loadNodes($(this).val());
     });
     
     // Query node
@@ -78,23 +76,7 @@ $(document).ready(function() {
         window.location.href = '/export_json';
     });
 
-    // Load and render graph
-    function loadAndRenderGraph() {
-        $.get('/graph_data', function(data) {
-            var nodes = data.nodes;
-            var links = data.links;
-            var mermaidCode = 'graph TD\n';
-
-            links.forEach(function(link) {
-                mermaidCode += `    ${escapeLabel(link.source)}["${escapeLabel(nodes.find(n => n.id === link.source).label || link.source)}"] -->|${escapeLabel(link.relation)}| ${escapeLabel(link.target)}["${escapeLabel(nodes.find(n => n.id === link.target).label || link.target)}"]\n`;
-            });
-
-            var mermaidDiv = document.getElementById('mermaid-graph');
-            mermaidDiv.innerHTML = mermaidCode;
-            mermaid.init(undefined, mermaidDiv);
-        });
-    }
-
-    // Initial graph load
-    loadAndRenderGraph();
+    // Render the server-side layout; later refreshes only fetch deltas
+    var graphView = new GraphView(document.getElementById('graph-view'));
+    graphView.refresh();
 });
@@ -0,0 +1,140 @@
+from dataclasses import dataclass, field
+from itertools import islice
+
+from export import _node_record
+
+DEFAULT_MAX_NODES = 500
+DEFAULT_MAX_EDGES = 2000
+
+
+@dataclass
+class Neighborhood:
+    seeds: list
+    hops: int
+    # node -> hop distance from the nearest seed, in visiting order
+    depth: dict = field(default_factory=dict)
+    links: list = field(default_factory=list)
+    # Nodes with neighbors left out of the result (hop limit or budget)
+    expandable: list = field(default_factory=list)
+    truncated: bool = False
+
+    def node_link_data(self, graph):
+        """Node-link JSON (with ``links``, like ``/graph_data``) for just this neighborhood."""
+        return {
+            "directed": False,
+            "multigraph": False,
+            "graph": graph.graph,
+            "nodes": [dict(_node_record(graph, node), hop=hop) for node, hop in self.depth.items()],
+            "links": [dict(data, source=u, target=v) for u, v, data in self.links],
+            "seeds": self.seeds,
+            "hops": self.hops,
+            "expandable": self.expandable,
+            "truncated": self.truncated,
+        }
+
+
+def k_hop(
+    graph,
+    seeds,
+    hops=1,
+    relations=None,
+    max_nodes=DEFAULT_MAX_NODES,
+    max_edges=DEFAULT_MAX_EDGES,
+    max_scan=None,
+):
+    """Breadth-first neighborhood of ``seeds`` up to ``hops`` hops.
+
+    Only edges whose ``relation`` is in ``relations`` are followed (all when
+    None). The traversal stops adding nodes at ``max_nodes``, the result
+    holds at most ``max_edges`` links among the visited nodes, and at most
+    ``max_scan`` adjacency entries (default: ten per node and edge of the
+    budgets) are examined while collecting them, so a hub's neighbor list
+    is never walked in full. Hitting a budget sets ``truncated``. Nodes
+    whose neighbors were not all examined count as ``expandable``.
+
+    Raises ``ValueError`` for negative ``hops`` or ``max_edges`` and
+    non-positive ``max_nodes``.
+    """
+    if hops < 0:
+        raise ValueError("hops must not be negative")
+    if max_nodes < 1:
+        raise ValueError("max_nodes must be positive")
+    if max_edges < 0:
+        raise ValueError("max_edges must not be negative")
+    if max_scan is None:
+        max_scan = 10 * (max_nodes + max_edges)
+
+    seeds = [node for node in dict.fromkeys(seeds) if node in graph]
+    result = Neighborhood(seeds=seeds, hops=hops)
+    depth = result.depth
+    scanned = 0
+
+    def follow(data):
+        return relations is None or data.get("relation") in relations
+
+    def scan(items):
+        # (neighbor, data) pairs, each charged to the scan budget
+        nonlocal scanned
+        for item in items:
+            if scanned >= max_scan:
+                return
+            scanned += 1
+            yield item
+
+    for seed in seeds[:max_nodes]:
+        depth[seed] = 0
+    result.truncated = len(seeds) > max_nodes
+    frontier = list(depth)
+    level = 0
+    while frontier and level < hops and not result.truncated:
+        level += 1
+        next_frontier = []
+        for node in frontier:
+            for neighbor, data in scan(graph.adj[node].items()):
+                if neighbor in depth or not follow(data):
+                    continue
+                if len(depth) >= max_nodes:
+                    result.truncated = True
+                    break
+                depth[neighbor] = level
+                next_frontier.append(neighbor)
+            if scanned >= max_scan:
+                result.truncated = True
+            if result.truncated:
+                break
+        frontier = next_frontier
+
+    # Each link is emitted once, by whichever endpoint was visited first
+    position = {node: i for i, node in enumerate(depth)}
+    for node, i in position.items():
+        adjacency = graph.adj[node]
+        if len(adjacency) > len(position) - i:
+            # A hub: look the later visited nodes up instead of walking its neighbors
+            candidates = (
+                (other, adjacency[other]) for other in islice(position, i, None) if other in adjacency
+            )
+        else:
+            candidates = adjacency.items()
+        for neighbor, data in scan(candidates):
+            if position.get(neighbor, -1) >= i and follow(data):
+                if len(result.links) >= max_edges:
+                    result.truncated = True
+                    break
+                result.links.append((node, neighbor, data))
+        if scanned >= max_scan:
+            result.truncated = True
+        if len(result.links) >= max_edges or scanned >= max_scan:
+            break
+
+    # A fresh budget: once it runs out, the remaining nodes are listed unchecked
+    scanned = 0
+    result.expandable = [
+        node
+        for node in depth
+        if any(
+            neighbor not in depth and follow(data)
+            for neighbor, data in scan(graph.adj[node].items())
+        )
+        or scanned >= max_scan
+    ]
+    return result
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh database in a temporary working directory."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "knowledge_graph.db"))
+    database.create_database()
+    yield database
+    database.flush_journal()
+
+
+@pytest.fixture
+def client(db):
+    """A test client for the app, started on an empty database."""
+    from app import create_app
+
+    return create_app().test_client()
@@ -0,0 +1,79 @@
+import networkx as nx
+import pytest
+
+from batch import MAX_BATCH_OPS, BatchError, plan_batch
+
+
+@pytest.fixture
+def graph():
+    graph = nx.Graph()
+    graph.add_node("Kant", born=1724)
+    graph.add_node("Hume")
+    graph.add_edge("Kant", "Hume", relation="influenced_by")
+    return graph
+
+
+def test_upserts_merge_or_replace_attributes(graph):
+    changes = plan_batch(graph, [
+        {"op": "upsert_node", "id": "Kant", "attributes": {"died": 1804}},
+        {"op": "upsert_node", "id": "Hume", "attributes": {"born": 1711}, "replace": True},
+    ])
+    assert changes == [
+        ("node", "Kant", {"born": 1724}, {"born": 1724, "died": 1804}),
+        ("node", "Hume", {}, {"born": 1711}),
+    ]
+
+
+def test_upsert_edge_creates_missing_endpoints(graph):
+    changes = plan_batch(graph, [
+        {"op": "upsert_edge", "source": "Hegel", "target": 7, "attributes": {"relation": "read"}},
+    ])
+    assert changes == [
+        ("node", "Hegel", None, {}),
+        ("node", 7, None, {}),
+        ("edge", ("Hegel", 7), None, {"relation": "read"}),
+    ]
+
+
+def test_delete_node_removes_its_edges_including_new_ones(graph):
+    changes = plan_batch(graph, [
+        {"op": "upsert_edge", "source": "Kant", "target": "Hegel"},
+        {"op": "delete_node", "id": "Kant"},
+    ])
+    # The edge to Hegel was added and deleted within the batch, so it nets out
+    assert changes == [
+        ("node", "Hegel", None, {}),
+        ("edge", ("Kant", "Hume"), {"relation": "influenced_by"}, None),
+        ("node", "Kant", {"born": 1724}, None),
+    ]
+    # Planning leaves the graph alone
+    assert graph.has_edge("Kant", "Hume")
+
+
+def test_deleting_missing_elements_is_a_no_op(graph):
+    assert plan_batch(graph, [
+        {"op": "delete_node", "id": "Hegel"},
+        {"op": "delete_edge", "source": "Kant", "target": "Hegel"},
+    ]) == []
+
+
+@pytest.mark.parametrize("ops, index", [
+    ({"op": "upsert_node"}, None),
+    ([{"op": "upsert_node", "id": "a"}, "oops"], 1),
+    ([{"op": "upsert_node", "id": ""}], 0),
+    ([{"op": "upsert_node", "id": True}], 0),
+    ([{"op": "upsert_node", "id": "a", "attributes": ["x"]}], 0),
+    ([{"op": "upsert_node", "id": "a", "ttl_seconds": -1}], 0),
+    ([{"op": "rename_node", "id": "a"}], 0),
+    ([{"op": "delete_node", "id": "a"}] * (MAX_BATCH_OPS + 1), None),
+])
+def test_invalid_batches_are_rejected(graph, ops, index):
+    with pytest.raises(BatchError) as excinfo:
+        plan_batch(graph, ops)
+    assert excinfo.value.index == index
+
+
+def test_ttl_seconds_sets_a_deadline(graph):
+    [(_, _, _, after)] = plan_batch(graph, [{"op": "upsert_node", "id": "a", "ttl_seconds": 60}])
+    assert after["ttl_seconds"] == 60.0
+    assert after["expires_at"] > 0
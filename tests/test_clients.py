@@ -0,0 +1,70 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import clients
+import ollama_helper
+
+
+class _TagsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = set()
+
+    def do_GET(self):
+        self.connections.add(self.client_address)
+        body = b'{"models": [{"name": "stub:latest"}]}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def ollama(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _TagsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(ollama_helper, "OLLAMA_API_URL", f"http://127.0.0.1:{server.server_port}/api")
+    _TagsHandler.connections.clear()
+    clients.reset_clients()
+    yield _TagsHandler.connections
+    clients.reset_clients()
+    server.shutdown()
+    server.server_close()
+
+
+def test_threads_share_one_session_and_its_connections(ollama):
+    sessions = []
+
+    def call():
+        sessions.append(clients.get_http_session())
+        assert ollama_helper.get_ollama_models() == ["stub:latest"]
+
+    for _ in range(3):
+        # One thread per call, like the dev server's request threads
+        thread = threading.Thread(target=call)
+        thread.start()
+        thread.join()
+
+    assert len({id(session) for session in sessions}) == 1
+    assert len(ollama) == 1
+
+
+def test_requests_use_the_configured_timeouts(ollama, monkeypatch):
+    seen = []
+    session = clients.get_http_session()
+    get = session.get
+
+    def recording_get(url, **kwargs):
+        seen.append(kwargs.get("timeout"))
+        return get(url, **kwargs)
+
+    monkeypatch.setattr(session, "get", recording_get)
+    assert ollama_helper.is_ollama_server_running()
+    ollama_helper.get_ollama_models()
+    assert seen == [clients.HTTP_TIMEOUT] * 2
+    assert clients.HTTP_TIMEOUT == (clients.CONNECT_TIMEOUT, clients.READ_TIMEOUT)
@@ -0,0 +1,72 @@
+import networkx as nx
+import pytest
+from community import community_louvain
+
+import communities
+from app import NeurosymbolicKnowledgeGraph
+from communities import CommunityCache
+
+
+@pytest.fixture
+def kg(db):
+    kg = NeurosymbolicKnowledgeGraph()
+    kg.history.record_base(kg.version, kg.graph, "empty")
+    graph = nx.connected_caveman_graph(20, 6)
+    kg.apply_batch([
+        {"op": "upsert_edge", "source": u, "target": v, "attributes": {"weight": 1 + (u + v) % 3}}
+        for u, v in graph.edges
+    ])
+    return kg
+
+
+def check(kg, state):
+    assert set(state.assignment) == set(kg.graph)
+    expected = community_louvain.modularity(state.assignment, kg.graph, weight="weight")
+    assert state.modularity == pytest.approx(expected, abs=1e-9)
+
+
+def test_small_edits_are_refined_from_the_version_diff(kg, monkeypatch):
+    cache = CommunityCache(history=kg.history)
+    check(kg, cache.partition(kg.graph, kg.version))
+    assert cache.full_runs == 1
+
+    # Refinements never look at the whole edge list
+    def whole_graph(*args):
+        raise AssertionError("refinement scanned the graph")
+
+    monkeypatch.setattr(communities._CommunityStats, "from_graph", whole_graph)
+    edits = [
+        [{"op": "upsert_edge", "source": 0, "target": 20, "attributes": {"weight": 5}}],
+        [{"op": "upsert_edge", "source": "new", "target": 3}, {"op": "upsert_edge", "source": 7, "target": 7}],
+        [{"op": "upsert_edge", "source": 0, "target": 20, "attributes": {"weight": 2}}],
+        [{"op": "delete_node", "id": 4}],
+        [{"op": "delete_edge", "source": 0, "target": 20}],
+    ]
+    for ops in edits:
+        kg.apply_batch(ops)
+        state = cache.partition(kg.graph, kg.version)
+        assert state.mode == "refined"
+        check(kg, state)
+    assert cache.refinements == len(edits)
+
+
+def test_refinement_moves_nodes_toward_their_neighbors(kg):
+    cache = CommunityCache(history=kg.history)
+    before = cache.partition(kg.graph, kg.version).assignment
+    kg.apply_batch([{"op": "upsert_edge", "source": "new", "target": 3, "attributes": {"weight": 9}}])
+    state = cache.partition(kg.graph, kg.version)
+    assert state.assignment["new"] == state.assignment[3]
+    assert {node: c for node, c in state.assignment.items() if node != "new"} == before
+
+
+def test_large_edits_and_missing_history_recompute(kg):
+    cache = CommunityCache(history=kg.history)
+    cache.partition(kg.graph, kg.version)
+    kg.apply_batch([{"op": "delete_node", "id": node} for node in range(0, 120, 2)])
+    state = cache.partition(kg.graph, kg.version)
+    assert state.mode == "full"
+    check(kg, state)
+
+    without_history = CommunityCache()
+    without_history.partition(kg.graph, 1)
+    assert without_history.partition(kg.graph, 2).mode == "full"
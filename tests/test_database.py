@@ -0,0 +1,87 @@
+import json
+import sqlite3
+
+import networkx as nx
+
+import database
+
+
+def _mixed_graph():
+    graph = nx.Graph()
+    graph.add_node(5, label="Five")
+    graph.add_node("5", label="Five as text")
+    graph.add_node("a", label="Alpha", school="Stoicism")
+    graph.add_edge(5, "a", relation=":influenced")
+    graph.add_edge("5", 7)
+    return graph
+
+
+def _assert_same(graph, expected):
+    assert sorted(graph.nodes, key=repr) == sorted(expected.nodes, key=repr)
+    assert dict(graph.nodes(data=True)) == dict(expected.nodes(data=True))
+    assert {frozenset(e) for e in graph.edges} == {frozenset(e) for e in expected.edges}
+    assert graph.edges[5, "a"] == {"relation": ":influenced"}
+
+
+def test_mixed_ids_round_trip_through_save_and_load(db):
+    expected = _mixed_graph()
+    db.save_graph_to_db(expected)
+    _assert_same(db.load_graph_from_db(), expected)
+
+
+def test_mixed_ids_round_trip_through_journal_operations(db):
+    expected = _mixed_graph()
+    for node, attributes in expected.nodes(data=True):
+        db.save_node(node, attributes)
+    for source, target, attributes in expected.edges(data=True):
+        db.save_edge(source, target, attributes)
+    _assert_same(db.load_graph_from_db(), expected)
+
+    db.delete_node(5)
+    graph = db.load_graph_from_db()
+    assert 5 not in graph and "5" in graph
+    assert graph.number_of_edges() == 1
+
+
+def test_mixed_ids_round_trip_through_graph_changes(db):
+    db.save_graph_changes([
+        ("node", 5, None, {"label": "Five"}),
+        ("node", "a", None, {}),
+        ("edge", (5, "a"), None, {}),
+    ])
+    graph = db.load_graph_from_db()
+    assert set(graph.nodes) == {5, "a"}
+    assert db.search_nodes_fulltext("Five") == [5]
+
+
+def test_legacy_blob_migration_keeps_integer_ids(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "legacy.db"))
+    expected = _mixed_graph()
+    conn = sqlite3.connect(database.DB_FILE)
+    conn.execute("CREATE TABLE graph_data (id INTEGER PRIMARY KEY, data TEXT)")
+    conn.execute("INSERT INTO graph_data VALUES (1, ?)", (json.dumps(nx.node_link_data(expected)),))
+    conn.commit()
+    conn.close()
+
+    database.create_database()
+    _assert_same(database.load_graph_from_db(), expected)
+
+
+def test_text_id_databases_are_migrated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "DB_FILE", str(tmp_path / "text_ids.db"))
+    conn = sqlite3.connect(database.DB_FILE)
+    conn.executescript(database.SCHEMA)
+    conn.execute("INSERT INTO nodes (id) VALUES ('a'), ('b')")
+    conn.execute("""INSERT INTO node_attrs VALUES ('a', 'label', '"Alpha"')""")
+    conn.execute("INSERT INTO edges (source, target) VALUES ('a', 'b')")
+    conn.commit()
+    conn.close()
+
+    database.create_database()
+    graph = database.load_graph_from_db()
+    assert set(graph.nodes) == {"a", "b"}
+    assert graph.nodes["a"] == {"label": "Alpha"}
+    assert graph.has_edge("a", "b")
+    assert database.search_nodes_fulltext("Alpha") == ["a"]
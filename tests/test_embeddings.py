@@ -0,0 +1,92 @@
+import threading
+
+import networkx as nx
+
+from app import NeurosymbolicKnowledgeGraph
+from embeddings import EmbeddingIndex, HashingEmbedder, _digest, node_text
+
+
+def index_for(graph, tmp_path, embedder=None):
+    index = EmbeddingIndex(embedder or HashingEmbedder(dim=32), directory=str(tmp_path / "emb"))
+    index.rebuild(graph)
+    return index
+
+
+def stored_digest(index, node):
+    return index._digests[index._rows[node]]
+
+
+def test_out_of_order_completions_keep_the_latest_text(tmp_path):
+    graph = nx.Graph()
+    graph.add_node("Kant", school="rationalism")
+    index = index_for(graph, tmp_path)
+
+    older = index.prepare([("Kant", {"school": "idealism"})])
+    newer = index.prepare([("Kant", {"school": "critical philosophy"})])
+    index.complete(newer)
+    index.complete(older)
+
+    expected = _digest(node_text("Kant", {"school": "critical philosophy"}))
+    assert stored_digest(index, "Kant") == expected
+
+
+def test_reverting_to_the_stored_text_cancels_an_embedding_in_flight(tmp_path):
+    graph = nx.Graph()
+    graph.add_node("Kant", school="rationalism")
+    index = index_for(graph, tmp_path)
+    original = stored_digest(index, "Kant")
+
+    changed = index.prepare([("Kant", {"school": "idealism"})])
+    assert index.prepare([("Kant", {"school": "rationalism"})]) == []
+    index.complete(changed)
+
+    assert stored_digest(index, "Kant") == original
+
+
+def test_a_node_removed_while_embedding_is_not_stored(tmp_path):
+    index = index_for(nx.Graph(), tmp_path)
+
+    pending = index.prepare([("Hume", {})])
+    index.remove("Hume")
+    index.complete(pending)
+
+    assert "Hume" not in index._rows
+
+
+class ReadProbe(HashingEmbedder):
+    """Checks, on every embed call, whether another thread could read the graph."""
+
+    def __init__(self):
+        super().__init__(dim=32)
+        self.kg = None
+        self.readable = []
+
+    def embed(self, texts):
+        if self.kg is not None:
+            reader = threading.Thread(target=self._read, daemon=True)
+            reader.start()
+            reader.join(timeout=2)
+            self.readable.append(not reader.is_alive())
+        return super().embed(texts)
+
+    def _read(self):
+        with self.kg.reading():
+            pass
+
+
+def test_writers_embed_after_releasing_the_graph_lock(db, tmp_path):
+    kg = NeurosymbolicKnowledgeGraph()
+    kg.history.record_base(kg.version, kg.graph, "empty")
+    probe = ReadProbe()
+    kg.embedding_index = index_for(kg.graph, tmp_path, probe)
+    probe.kg = kg
+
+    kg.add_node("Kant", {"school": "idealism"})
+    kg.add_edge("Kant", "Hume")
+    kg.apply_enrichments([("Kant", "Wrote the Critique of Pure Reason.")])
+    kg.apply_batch([{"op": "upsert_node", "id": "Locke", "attributes": {"school": "empiricism"}}])
+    kg.checkout(1)
+
+    assert len(probe.readable) == 5
+    assert all(probe.readable)
+    assert stored_digest(kg.embedding_index, "Kant") == _digest(node_text("Kant", kg.graph.nodes["Kant"]))
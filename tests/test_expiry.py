@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from app import NeurosymbolicKnowledgeGraph
+from expiry import expiry_attributes
+
+
+@pytest.fixture
+def kg(db):
+    kg = NeurosymbolicKnowledgeGraph()
+    kg.history.record_base(kg.version, kg.graph, "empty")
+    return kg
+
+
+def edges(graph):
+    return {frozenset(edge) for edge in graph.edges}
+
+
+def build(kg):
+    kg.add_node("Kant", ttl_seconds=10)
+    kg.add_node("Hume", ttl_seconds=100)
+    kg.add_node("Smith", lifetime="1723-1790")
+    kg.add_edge("Kant", "Hume")
+    kg.add_edge("Kant", "Smith")
+    kg.add_edge("Hume", "Smith")
+
+
+def test_expired_nodes_and_their_edges_are_removed_as_one_version(kg, db):
+    build(kg)
+    before = kg.version
+
+    assert kg.expire_nodes(now=time.time() + 50) == ["Kant"]
+
+    assert set(kg.graph) == {"Hume", "Smith"}
+    assert edges(kg.graph) == {frozenset(("Hume", "Smith"))}
+    assert kg.version == before + 1
+    assert kg.expired == 1
+    latest = kg.history.versions(limit=1)[0]
+    assert (latest["version"], latest["message"]) == (kg.version, "expire 1 nodes")
+    changes = kg.history.changes(before, kg.version)
+    assert sorted((kind, after) for kind, _, _, after in changes) == [
+        ("edge", None),
+        ("edge", None),
+        ("node", None),
+    ]
+    stored = db.load_graph_from_db()
+    assert set(stored) == {"Hume", "Smith"}
+    assert edges(stored) == {frozenset(("Hume", "Smith"))}
+
+
+def test_nothing_due_changes_nothing(kg):
+    build(kg)
+    version = kg.version
+
+    assert kg.expire_nodes() == []
+    assert kg.version == version
+    assert kg.expire_nodes(now=time.time() + 1000) == ["Kant", "Hume"]
+    assert kg.expire_nodes(now=time.time() + 1000) == []
+    assert set(kg.graph) == {"Smith"}
+    assert kg.version == version + 1
+
+
+def test_lifetime_is_not_a_ttl(kg):
+    build(kg)
+    assert kg.graph.nodes["Smith"] == {"lifetime": "1723-1790"}
+    assert kg.graph.nodes["Kant"]["ttl_seconds"] == 10.0
+    assert "lifetime" not in kg.graph.nodes["Kant"]
+
+
+def test_a_renewed_deadline_replaces_the_old_one(kg):
+    kg.add_node("Kant", ttl_seconds=10)
+    kg.add_node("Kant", ttl_seconds=1000)
+
+    assert kg.expire_nodes(now=time.time() + 50) == []
+    assert "Kant" in kg.graph
+    assert kg.expire_nodes(now=time.time() + 2000) == ["Kant"]
+
+
+def test_checkout_brings_back_expired_nodes_and_their_deadlines(kg):
+    build(kg)
+    version = kg.version
+    kg.expire_nodes(now=time.time() + 50)
+
+    kg.checkout(version)
+
+    assert edges(kg.graph) == {
+        frozenset(("Kant", "Hume")),
+        frozenset(("Kant", "Smith")),
+        frozenset(("Hume", "Smith")),
+    }
+    assert kg.expire_nodes(now=time.time() + 50) == ["Kant"]
+
+
+def test_non_positive_ttls_are_rejected():
+    with pytest.raises(ValueError):
+        expiry_attributes(0)
+    assert expiry_attributes(5, now=100) == {"ttl_seconds": 5.0, "expires_at": 105}
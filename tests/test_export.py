@@ -0,0 +1,73 @@
+import json
+
+import networkx as nx
+
+
+def build(client, graph):
+    ops = [{"op": "upsert_node", "id": node, "attributes": data} for node, data in graph.nodes(data=True)]
+    ops += [
+        {"op": "upsert_edge", "source": u, "target": v, "attributes": data}
+        for u, v, data in graph.edges(data=True)
+    ]
+    response = client.post("/graph/batch", json={"ops": ops})
+    assert response.status_code == 200
+
+
+def edge_keys(links):
+    return [frozenset((link["source"], link["target"])) for link in links]
+
+
+def test_pages_cover_every_node_and_edge_exactly_once(client):
+    graph = nx.gnm_random_graph(60, 150, seed=3)
+    nx.relabel_nodes(graph, {n: f"n{n}" for n in graph if n % 2}, copy=False)
+    graph.add_edge("n1", "n1", relation="self")
+    build(client, graph)
+
+    for output_format in ("json", "ndjson"):
+        nodes, links = [], []
+        for offset in range(0, 60, 7):
+            response = client.get(f"/graph_data?format={output_format}&offset={offset}&limit=7")
+            assert response.status_code == 200
+            if output_format == "json":
+                page = response.get_json()
+                nodes += page["nodes"]
+                links += page["links"]
+            else:
+                for line in response.get_data(as_text=True).splitlines():
+                    record = json.loads(line)
+                    if "node" in record:
+                        nodes.append(record["node"])
+                    else:
+                        links.append(record["link"])
+
+        assert sorted(str(node["id"]) for node in nodes) == sorted(str(node) for node in graph)
+        keys = edge_keys(links)
+        assert len(keys) == len(set(keys)) == graph.number_of_edges()
+        assert set(keys) == {frozenset(edge) for edge in graph.edges}
+
+
+def test_etag_round_trip(client):
+    build(client, nx.path_graph(5))
+    first = client.get("/graph_data?limit=2")
+    etag = first.headers["ETag"]
+    assert len(first.get_json()["nodes"]) == 2
+
+    cached = client.get("/graph_data?limit=2", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+    assert cached.get_data() == b""
+
+    # Other parameters and other versions have other tags
+    other = client.get("/graph_data?limit=3")
+    assert other.headers["ETag"] != etag
+    other.get_data()
+    client.post("/graph/batch", json={"ops": [{"op": "upsert_node", "id": 9}]})
+    changed = client.get("/graph_data?limit=2", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    changed.get_data()
+
+
+def test_invalid_pages_are_rejected(client):
+    assert client.get("/graph_data?offset=-1").status_code == 400
+    assert client.get("/graph_data?limit=0").status_code == 400
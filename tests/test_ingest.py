@@ -0,0 +1,68 @@
+import io
+import json
+import random
+
+import pytest
+
+from database import load_graph_from_db
+from ingest import _JsonStreamReader, bulk_load
+
+
+def _document(rng, items=200):
+    scalars = [0.5, -0.25, 1e-7, 6.02e23, -3, 0, 12345678901234, True, False, None,
+               "", "plain", 'quo"ted', "back\\slash", "unié中", "\U0001f600", "a,b]c}"]
+    nodes = []
+    for i in range(items):
+        value = rng.choice(scalars)
+        nodes.append(rng.choice([
+            value,
+            {"id": i, "weight": rng.random(), "tag": value},
+            [value, {"nested": [value, -rng.random()]}],
+        ]))
+    return {"directed": False, "graph": {"name": "fuzz"}, "nodes": nodes, "links": [], "n": 1.5}
+
+
+def _sections(text, chunk_size):
+    return list(_JsonStreamReader(io.StringIO(text), chunk_size=chunk_size).sections())
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_stream_reader_matches_json_loads_at_any_chunk_size(seed):
+    rng = random.Random(seed)
+    document = _document(rng)
+    text = json.dumps(document, indent=rng.choice([None, 1]), ensure_ascii=rng.random() < 0.5)
+    expected = [("directed", False), ("graph", {"name": "fuzz"})]
+    expected += [("nodes", item) for item in document["nodes"]] + [("n", 1.5)]
+
+    for chunk_size in [1, 2, 3, 5, 7, 64, rng.randint(8, 4096)]:
+        assert _sections(text, chunk_size) == expected, chunk_size
+
+
+def test_number_split_after_the_decimal_point():
+    text = '{"nodes": [' + " " * 65523 + "0.5, 1e5, 2]}"
+    assert text.index("0.5") + 2 == 65536
+    assert [item for _, item in _sections(text, 1 << 16)] == [0.5, 1e5, 2]
+
+
+def test_malformed_arrays_are_rejected():
+    for text in ['{"nodes": [1 2]}', '{"nodes": [0.5.5]}', '{"nodes": [1,]']:
+        with pytest.raises(ValueError):
+            _sections(text, 3)
+
+
+def test_node_ids_are_not_stored_as_attributes(db, tmp_path):
+    path = tmp_path / "graph.json"
+    path.write_text(json.dumps({
+        "nodes": [{"id": "Heidegger", "school": "phenomenology"}, {"id": 7}, {"id": "Heidegger", "born": 1889}],
+        "links": [{"source": "Heidegger", "target": 7, "relation": "read"}],
+    }))
+    graph, stats = bulk_load(str(path), progress=None)
+
+    assert dict(graph.nodes(data=True)) == {
+        "Heidegger": {"school": "phenomenology", "born": 1889},
+        7: {},
+    }
+    assert stats.nodes == 2 and stats.duplicate_nodes == 1
+    stored = load_graph_from_db()
+    assert dict(stored.nodes(data=True)) == dict(graph.nodes(data=True))
+    assert dict(stored.edges) == {("Heidegger", 7): {"relation": "read"}}
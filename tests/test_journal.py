@@ -0,0 +1,105 @@
+import sqlite3
+import time
+
+import pytest
+
+import database
+
+
+def _committed_nodes():
+    conn = sqlite3.connect(database.DB_FILE)
+    try:
+        return {row[0] for row in conn.execute("SELECT id FROM nodes")}
+    finally:
+        conn.close()
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_group_commit_waits_for_flush(db):
+    journal = database.MutationJournal(durability="group", max_batch=1000, max_latency=60)
+    journal.submit("upsert_node", "a", {"label": "Alpha"})
+    journal.submit("upsert_edge", "a", "b", {})
+    assert _committed_nodes() == set()
+
+    journal.flush()
+    assert _committed_nodes() == {'"a"', '"b"'}
+    assert journal.operations == 2 and journal.commits == 1
+
+
+def test_background_flusher_commits_after_latency(db):
+    journal = database.MutationJournal(durability="group", max_batch=1000, max_latency=0.01)
+    journal.submit("upsert_node", "a", {})
+    _wait_for(lambda: journal.commits == 1)
+    assert _committed_nodes() == {'"a"'}
+
+
+def test_sync_commits_before_returning(db):
+    journal = database.MutationJournal(durability="sync")
+    journal.submit("upsert_node", "a", {})
+    assert _committed_nodes() == {'"a"'}
+
+
+def test_background_failure_is_raised_by_next_flush(db, monkeypatch):
+    def broken(cursor):
+        raise TypeError("not serializable")
+
+    monkeypatch.setitem(database._OPERATIONS, "broken", broken)
+    journal = database.MutationJournal(durability="group", max_batch=1, max_latency=0.01)
+    journal.submit("broken")
+    _wait_for(lambda: journal._error is not None)
+
+    with pytest.raises(database.JournalError):
+        journal.flush()
+    journal.flush()
+
+    # The flusher survived and keeps committing
+    journal.submit("upsert_node", "a", {})
+    _wait_for(lambda: journal.commits == 1)
+    assert _committed_nodes() == {'"a"'}
+
+
+def test_operational_errors_keep_the_batch(db, monkeypatch):
+    failures = iter([sqlite3.OperationalError("database is locked")])
+
+    def flaky(cursor, node):
+        error = next(failures, None)
+        if error:
+            raise error
+        database._upsert_node(cursor, node, {})
+
+    monkeypatch.setitem(database._OPERATIONS, "flaky", flaky)
+    journal = database.MutationJournal(durability="group", max_batch=1000, max_latency=60)
+    journal.submit("flaky", "a")
+    with pytest.raises(sqlite3.OperationalError):
+        journal.flush()
+    assert _committed_nodes() == set()
+
+    journal.flush()
+    assert _committed_nodes() == {'"a"'}
+
+
+def test_reads_do_not_raise_earlier_write_failures(db, monkeypatch):
+    def broken(cursor):
+        raise TypeError("not serializable")
+
+    monkeypatch.setitem(database._OPERATIONS, "broken", broken)
+    monkeypatch.setattr(database, "journal", database.MutationJournal(
+        durability="group", max_batch=1000, max_latency=60
+    ))
+    database.journal.submit("broken")
+    failures = database.JOURNAL_FAILURES._series.get((), 0)
+
+    assert database.get_cached_response("missing") is None
+    assert database.get_cached_response("missing") is None
+    assert database.JOURNAL_FAILURES._series.get((), 0) == failures + 1
+
+    # The failure is reported once, to the next writer
+    with pytest.raises(database.JournalError):
+        database.flush_journal()
+    database.flush_journal()
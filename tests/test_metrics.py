@@ -0,0 +1,15 @@
+from metrics import Registry
+
+
+def test_counter_samples_match_type_and_help_names():
+    registry = Registry()
+    counter = registry.counter("jobs_total", "Jobs run.", ("kind",))
+    counter.inc(kind="a")
+    counter.inc(2, kind="a")
+
+    lines = registry.render().splitlines()
+    assert lines == [
+        "# HELP jobs_total Jobs run.",
+        "# TYPE jobs_total counter",
+        'jobs_total{kind="a"} 3',
+    ]
@@ -0,0 +1,78 @@
+import random
+
+import networkx as nx
+import pytest
+
+from paths import LandmarkCache, LandmarkIndex, bidirectional_path
+from snapshot import GraphSnapshot
+
+
+# Sparse random graphs have several components, grids many equal-length paths
+GRAPHS = {
+    "gnp": nx.gnp_random_graph(300, 0.01, seed=1),
+    "scale-free": nx.barabasi_albert_graph(400, 2, seed=2),
+    "grid": nx.convert_node_labels_to_integers(nx.grid_2d_graph(12, 15)),
+    "path": nx.relabel_nodes(nx.path_graph(30), lambda n: f"n{n}"),
+}
+
+
+def pairs(graph, count=300, seed=0):
+    nodes = list(graph)
+    rng = random.Random(seed)
+    return [(rng.choice(nodes), rng.choice(nodes)) for _ in range(count)]
+
+
+def expected_length(graph, source, target):
+    try:
+        return nx.shortest_path_length(graph, source, target)
+    except nx.NetworkXNoPath:
+        return None
+
+
+def assert_shortest(graph, path, source, target):
+    length = expected_length(graph, source, target)
+    if length is None:
+        assert path is None
+        return
+    assert path[0] == source and path[-1] == target
+    assert len(path) == length + 1
+    assert all(graph.has_edge(u, v) for u, v in zip(path, path[1:]))
+
+
+@pytest.mark.parametrize("graph", GRAPHS.values(), ids=GRAPHS.keys())
+def test_bidirectional_path_is_shortest(graph):
+    for source, target in pairs(graph):
+        assert_shortest(graph, bidirectional_path(graph, source, target), source, target)
+
+
+@pytest.mark.parametrize("count", [1, 3, 16])
+@pytest.mark.parametrize("graph", GRAPHS.values(), ids=GRAPHS.keys())
+def test_landmark_path_is_shortest(graph, count):
+    index = LandmarkIndex.build(GraphSnapshot.from_graph(graph), count)
+    for source, target in pairs(graph):
+        assert_shortest(graph, index.path(source, target), source, target)
+
+
+@pytest.mark.parametrize("graph", GRAPHS.values(), ids=GRAPHS.keys())
+def test_landmark_bounds_enclose_the_distance(graph):
+    index = LandmarkIndex.build(GraphSnapshot.from_graph(graph), 4)
+    for source, target in pairs(graph):
+        lower, upper = index.bounds(source, target)
+        length = expected_length(graph, source, target)
+        if lower is None:
+            assert length is None
+        elif length is not None:
+            assert lower <= length
+            assert upper is None or length <= upper
+
+
+def test_landmark_cache_rebuilds_on_a_new_version():
+    graph = nx.path_graph(5)
+    cache = LandmarkCache(count=2)
+    first = cache.get(graph, 1)
+    assert cache.get(graph, 1) is first
+    graph.add_edge(0, 4)
+    second = cache.get(graph, 2)
+    assert second is not first
+    assert second.path(0, 4) == [0, 4]
+    assert (cache.hits, cache.misses) == (1, 2)
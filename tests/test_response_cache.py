@@ -0,0 +1,73 @@
+import pytest
+
+import response_cache as rc
+from response_cache import ResponseCache
+
+
+class StubProvider:
+    """Counts calls and answers each with a numbered response."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return f"response {self.calls}"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rc.time, "time", lambda: now[0])
+    return now
+
+
+def ask(cache, provider, prompt="What is a category?", **kwargs):
+    return cache.get_or_call("stub", "stub-model", "system", prompt, {"temperature": 0}, provider, **kwargs)
+
+
+def test_miss_calls_the_provider_and_hit_reuses_it(clock):
+    cache = ResponseCache(ttl=60, persistent=False)
+    provider = StubProvider()
+
+    assert ask(cache, provider) == "response 1"
+    assert ask(cache, provider) == "response 1"
+    assert ask(cache, provider, prompt="What is a monad?") == "response 2"
+    assert provider.calls == 2
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(ttl=60, persistent=False)
+    provider = StubProvider()
+
+    ask(cache, provider)
+    clock[0] += 60
+    assert ask(cache, provider) == "response 1"
+    clock[0] += 1
+    assert ask(cache, provider) == "response 2"
+    assert provider.calls == 2
+
+
+def test_uncacheable_responses_are_not_stored(clock):
+    cache = ResponseCache(ttl=60, persistent=False)
+    provider = StubProvider()
+
+    ask(cache, provider, cacheable=lambda response: False)
+    ask(cache, provider, cacheable=lambda response: False)
+    assert provider.calls == 2
+    assert cache.stats()["memory_entries"] == 0
+
+
+def test_persistent_tier_survives_a_new_process(db, clock):
+    provider = StubProvider()
+    ask(ResponseCache(ttl=60), provider)
+
+    cache = ResponseCache(ttl=60)
+    assert ask(cache, provider) == "response 1"
+    assert cache.stats()["persistent_hits"] == 1
+
+    clock[0] += 61
+    assert ask(ResponseCache(ttl=60), provider) == "response 2"
+    assert provider.calls == 2
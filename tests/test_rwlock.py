@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from rwlock import ReadWriteLock
+
+
+def _start(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_readers_share_the_lock():
+    lock = ReadWriteLock()
+    inside = threading.Barrier(2, timeout=2)
+
+    def read():
+        with lock.read():
+            inside.wait()
+
+    threads = [_start(read) for _ in range(2)]
+    for thread in threads:
+        thread.join(2)
+        assert not thread.is_alive()
+
+
+def test_writer_waits_for_readers():
+    lock = ReadWriteLock()
+    events = []
+    def write():
+        with lock.write():
+            events.append("write")
+
+    with lock.read():
+        writer = _start(write)
+        time.sleep(0.05)
+        assert events == []
+    writer.join(2)
+    assert events == ["write"]
+
+
+def test_waiting_writer_holds_off_new_readers_until_it_is_done():
+    lock = ReadWriteLock()
+    events = []
+
+    def write():
+        with lock.write():
+            events.append("write")
+
+    def read():
+        with lock.read():
+            events.append("read")
+
+    with lock.read():
+        writer = _start(write)
+        time.sleep(0.05)
+        reader = _start(read)
+        time.sleep(0.05)
+        assert events == []
+    writer.join(2)
+    reader.join(2)
+    assert events == ["write", "read"]
+
+
+def test_readers_waiting_on_a_writer_go_before_the_next_writer():
+    lock = ReadWriteLock()
+    events = []
+
+    def write(name):
+        with lock.write():
+            events.append(name)
+
+    def read():
+        with lock.read():
+            events.append("read")
+
+    with lock.write():
+        reader = _start(read)
+        time.sleep(0.05)
+        second = _start(lambda: write("second write"))
+        time.sleep(0.05)
+    reader.join(2)
+    second.join(2)
+    assert events == ["read", "second write"]
+
+
+def test_reads_are_reentrant_and_allowed_under_the_write_lock():
+    lock = ReadWriteLock()
+    with lock.read():
+        with lock.read():
+            pass
+    with lock.write():
+        with lock.read():
+            pass
+    # Both were fully released
+    with lock.write():
+        pass
+
+
+def test_upgrading_a_read_lock_raises():
+    lock = ReadWriteLock()
+    with lock.read():
+        with pytest.raises(RuntimeError):
+            with lock.write():
+                pass
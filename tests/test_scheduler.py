@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+import scheduler
+from app import NeurosymbolicKnowledgeGraph
+from scheduler import AnalyticsScheduler
+
+
+@pytest.fixture
+def kg(db):
+    kg = NeurosymbolicKnowledgeGraph()
+    kg.history.record_base(kg.version, kg.graph, "empty")
+    kg.add_edge("Kant", "Hegel", {"relation": "influenced"})
+    kg.add_edge("Hegel", "Marx", {"relation": "influenced"})
+    return kg
+
+
+def wait(job, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not job.finished:
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+    return job
+
+
+def test_results_are_reused_after_a_restart(kg):
+    jobs = AnalyticsScheduler(kg, workers=1)
+    job = wait(jobs.submit("pagerank"))
+    jobs.shutdown()
+    assert job.status == "done" and not job.cached
+
+    # A new process continues from the recorded version
+    restarted = NeurosymbolicKnowledgeGraph()
+    restarted.version = restarted.history.latest()
+    restarted.graph = kg.graph
+    again = AnalyticsScheduler(restarted, workers=1).submit("pagerank")
+    assert again.cached and again.version == job.version
+    assert again.result == job.result
+
+
+def test_analyses_run_without_holding_the_graph_lock(kg, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow(kg, graph, version, params):
+        started.set()
+        assert release.wait(10)
+        return graph.number_of_nodes()
+
+    monkeypatch.setitem(scheduler.ANALYSES, "slow", slow)
+    jobs = AnalyticsScheduler(kg, workers=1)
+    job = jobs.submit("slow")
+    assert started.wait(10)
+
+    # A writer (and the readers queued behind it) are not held up by the job
+    kg.add_node("Engels")
+    with kg.reading():
+        assert "Engels" in kg.graph
+    release.set()
+    wait(job)
+    jobs.shutdown()
+
+    # The job computed on the graph as it was when it started
+    assert job.result == 3
+    assert job.version == kg.version - 1
+
+
+def test_params_must_be_an_object(kg):
+    with pytest.raises(ValueError):
+        AnalyticsScheduler(kg, workers=1).submit("pagerank", ["k", 5])
@@ -0,0 +1,105 @@
+import random
+
+import networkx as nx
+import pytest
+
+from search import SearchIndex, fulltext_query, tokenize
+
+WORDS = ["kant", "kantian", "hume", "humean", "reason", "critique", "pure", "treatise", "human"]
+SCHOOLS = ["idealism", "empiricism", "rationalism"]
+
+
+@pytest.fixture
+def graph():
+    rng = random.Random(5)
+    graph = nx.Graph()
+    for i in range(300):
+        attributes = {"label": " ".join(rng.sample(WORDS, 2))}
+        if i % 4:
+            attributes["school"] = rng.choice(SCHOOLS)
+        if i % 3 == 0:
+            attributes["era"] = rng.choice(["modern", "ancient"])
+        graph.add_node(f"n{i}", **attributes)
+    return graph
+
+
+def brute_force(graph, query, filters):
+    terms = tokenize(query)
+    matches = set()
+    for node, attributes in graph.nodes(data=True):
+        if any(str(attributes.get(name)) != str(value) for name, value in filters.items()):
+            continue
+        text = " ".join([node] + [str(attributes[f]) for f in ("label", "school") if f in attributes])
+        tokens = set(tokenize(text))
+        if terms and not (
+            all(term in tokens for term in terms[:-1])
+            and any(token.startswith(terms[-1]) for token in tokens)
+        ):
+            continue
+        matches.add(node)
+    return matches
+
+
+QUERIES = [
+    ("kant", {}),
+    ("kan", {}),
+    ("pure reas", {}),
+    ("hum", {"school": "empiricism"}),
+    ("", {"school": "idealism"}),
+    ("critique", {"era": "modern"}),
+    ("idealism treat", {}),
+    ("nothing", {}),
+    ("kant", {"school": "cynicism"}),
+]
+
+
+@pytest.mark.parametrize("query, filters", QUERIES)
+def test_search_matches_a_full_scan(graph, query, filters):
+    index = SearchIndex(max_candidates=1000)
+    expected = brute_force(graph, query, filters)
+    assert set(index.search(graph, query, filters, limit=1000)) == expected
+    assert len(index.search(graph, query, filters, limit=5)) == min(5, len(expected))
+
+
+def test_exact_and_prefix_matches_rank_first():
+    graph = nx.Graph()
+    graph.add_node("Kantianism", label="Kantianism")
+    graph.add_node("Neo-Kantian", label="Neo Kantian school")
+    graph.add_node("Kant", label="Kant")
+    assert SearchIndex().search(graph, "kant") == ["Kant", "Kantianism", "Neo-Kantian"]
+
+
+def test_updates_and_removals_are_reflected():
+    graph = nx.Graph()
+    graph.add_node("Hume", school="empiricism")
+    index = SearchIndex()
+    assert index.search(graph, "", {"school": "empiricism"}) == ["Hume"]
+
+    graph.nodes["Hume"]["school"] = "skepticism"
+    index.update("Hume", graph.nodes["Hume"])
+    assert index.search(graph, "empiric") == []
+    assert index.search(graph, "skept") == ["Hume"]
+    assert index.search(graph, "", {"school": "skepticism"}) == ["Hume"]
+
+    graph.remove_node("Hume")
+    index.remove("Hume")
+    assert index.search(graph, "hume") == []
+    assert index.search(graph, "", {"school": "skepticism"}) == []
+
+
+def test_limit_bounds_unranked_results(graph):
+    assert len(SearchIndex().search(graph, "", {"school": "idealism"}, limit=7)) == 7
+
+
+def test_fulltext_query_quotes_terms_and_prefixes_the_last():
+    assert fulltext_query('Pure "reason') == '"pure" "reason"*'
+    assert fulltext_query("  ") is None
+
+
+def test_fulltext_searches_enriched_info(db):
+    db.save_node("Kant", {"label": "Immanuel Kant", "enriched_info": "Wrote the Critique of Pure Reason."})
+    db.save_node("Hume", {"label": "David Hume", "school": "empiricism"})
+
+    assert SearchIndex.fulltext("critique pur") == ["Kant"]
+    assert SearchIndex.fulltext("empiricism") == ["Hume"]
+    assert SearchIndex.fulltext("") == []
@@ -0,0 +1,68 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from analytics import UNREACHABLE, distance_matrix
+from communities import CommunityCache
+from snapshot import GraphSnapshot
+
+
+@pytest.fixture
+def graph():
+    graph = nx.powerlaw_cluster_graph(300, 2, 0.3, seed=7)
+    # A second component, an isolated node, a self-loop and mixed id types
+    graph.add_edges_from([("a", "b"), ("b", "c")])
+    graph.add_node("alone")
+    graph.add_edge(5, 5)
+    for node in list(graph)[::3]:
+        graph.nodes[node]["school"] = f"school {hash(str(node)) % 4}"
+    return graph
+
+
+def test_bfs_matches_networkx(graph):
+    snapshot = GraphSnapshot.from_graph(graph)
+    for source in [0, 5, 299, "a", "alone"]:
+        distances = snapshot.bfs(source)
+        reached = {
+            snapshot.node_ids[i]: int(distances[i]) for i in np.flatnonzero(distances >= 0)
+        }
+        assert reached == nx.single_source_shortest_path_length(graph, source)
+
+
+def test_bfs_stops_once_targets_are_reached(graph):
+    snapshot = GraphSnapshot.from_graph(graph)
+    target = snapshot.index[next(iter(graph.adj[0]))]
+    distances = snapshot.bfs(0, np.array([target]))
+    assert distances[target] == 1
+    assert distances.max() == 1
+
+
+def test_degree_and_attributes_match_networkx(graph):
+    snapshot = GraphSnapshot.from_graph(graph)
+    assert snapshot.degree() == dict(graph.degree)
+    assert snapshot.node_attribute("school") == nx.get_node_attributes(graph, "school")
+    assert snapshot.number_of_edges() == graph.number_of_edges()
+
+
+def test_distance_matrix_matches_networkx(graph):
+    snapshot = GraphSnapshot.from_graph(graph)
+    nodes = [0, 1, 299, "a", "c", "alone"]
+    result = distance_matrix(snapshot, nodes)
+    for i, source in enumerate(nodes):
+        lengths = nx.single_source_shortest_path_length(graph, source)
+        for j, target in enumerate(nodes):
+            assert result.matrix[i, j] == lengths.get(target, UNREACHABLE)
+    assert result.unreachable_pairs == int((result.matrix == UNREACHABLE).sum())
+
+
+def test_community_summaries_match_networkx(graph):
+    cache = CommunityCache()
+    assignment = cache.partition(graph, 1).assignment
+    summaries = cache.summaries(graph, 1, top_members=3)
+
+    assert sum(summary["size"] for summary in summaries) == graph.number_of_nodes()
+    for summary in summaries:
+        members = [node for node, community in assignment.items() if community == summary["id"]]
+        assert summary["internal_edges"] == graph.subgraph(members).number_of_edges()
+        degrees = sorted((graph.degree(node) for node in members), reverse=True)
+        assert [graph.degree(node) for node in summary["top_members"]] == degrees[:3]
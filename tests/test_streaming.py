@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+import bedrock_helper
+import ollama_helper
+from response_cache import ResponseCache
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    records = []
+    monkeypatch.setattr(bedrock_helper, "save_response", lambda **kwargs: records.append(kwargs))
+    monkeypatch.setattr(ollama_helper, "save_response", lambda **kwargs: records.append(kwargs))
+    monkeypatch.setattr(bedrock_helper, "response_cache", ResponseCache(persistent=False))
+    return records
+
+
+class _StreamingResponse:
+    def __init__(self, lines):
+        self.lines = lines
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self):
+        return iter(self.lines)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+def test_cached_bedrock_prompts_are_saved(saved):
+    key = bedrock_helper.cache_key(
+        "Bedrock", "anthropic.claude-v2", "sys", "hello", bedrock_helper.GENERATION_PARAMS
+    )
+    bedrock_helper.response_cache.put(key, "Bedrock", "anthropic.claude-v2", "cached text")
+
+    tokens = list(bedrock_helper.stream_bedrock_model("anthropic.claude-v2", "hello", "sys"))
+    assert tokens == ["cached text"]
+    assert [record["back_content"] for record in saved] == ["cached text"]
+
+
+def test_non_streaming_bedrock_models_are_saved(saved, monkeypatch):
+    answers = iter(["whole text", "Error: throttled"])
+    monkeypatch.setattr(bedrock_helper, "invoke_bedrock_model", lambda *args: next(answers))
+
+    assert list(bedrock_helper.stream_bedrock_model("ai21.j2-ultra", "hello")) == ["whole text"]
+    assert list(bedrock_helper.stream_bedrock_model("ai21.j2-ultra", "hello")) == ["Error: throttled"]
+    assert [record["back_content"] for record in saved] == ["whole text"]
+
+
+def test_malformed_ollama_lines_end_the_stream_with_an_error(saved, monkeypatch):
+    lines = [json.dumps({"response": "Hel"}).encode(), b"{not json", json.dumps({"response": "lo"}).encode()]
+    session = type("Session", (), {"post": lambda self, *args, **kwargs: _StreamingResponse(lines)})()
+    monkeypatch.setattr(ollama_helper, "get_http_session", lambda: session)
+
+    tokens = list(ollama_helper.stream_ollama_help("llama2", "hello"))
+    assert tokens[0] == "Hel"
+    assert tokens[1].startswith("Error: Malformed response from Ollama: {not json")
+    assert len(tokens) == 2
+    assert saved == []
+
+
+def test_complete_ollama_streams_are_saved(saved, monkeypatch):
+    lines = [json.dumps({"response": token}).encode() for token in ("Hel", "lo")]
+    lines.append(json.dumps({"done": True}).encode())
+    session = type("Session", (), {"post": lambda self, *args, **kwargs: _StreamingResponse(lines)})()
+    monkeypatch.setattr(ollama_helper, "get_http_session", lambda: session)
+
+    assert list(ollama_helper.stream_ollama_help("llama2", "hello")) == ["Hel", "lo"]
+    assert [record["back_content"] for record in saved] == ["Hello"]
@@ -0,0 +1,130 @@
+import networkx as nx
+import pytest
+
+from subgraph import k_hop
+
+
+class CountingAdjacency(dict):
+    """Neighbor dict counting how many entries are iterated, across all instances."""
+
+    reads = 0
+
+    def __iter__(self):
+        for key in super().__iter__():
+            CountingAdjacency.reads += 1
+            yield key
+
+
+class CountingGraph(nx.Graph):
+    adjlist_inner_dict_factory = CountingAdjacency
+
+
+def boundary(graph, nodes):
+    return [node for node in nodes if any(neighbor not in nodes for neighbor in graph.adj[node])]
+
+
+@pytest.mark.parametrize("hops", [0, 1, 2, 3])
+def test_unbounded_neighborhood_matches_networkx(hops):
+    graph = nx.gnp_random_graph(200, 0.03, seed=3)
+    result = k_hop(graph, [0], hops=hops, max_nodes=1000, max_edges=10000)
+
+    assert result.depth == nx.single_source_shortest_path_length(graph, 0, cutoff=hops)
+    assert not result.truncated
+    links = {frozenset((u, v)) for u, v, _ in result.links}
+    assert len(links) == len(result.links)
+    assert links == {frozenset(edge) for edge in graph.subgraph(result.depth).edges}
+    assert result.expandable == boundary(graph, result.depth)
+
+
+def test_several_seeds_take_the_nearest_distance():
+    graph = nx.path_graph(10)
+    result = k_hop(graph, [0, 9, 42], hops=2)
+    assert result.seeds == [0, 9]
+    assert result.depth == {0: 0, 9: 0, 1: 1, 8: 1, 2: 2, 7: 2}
+    assert result.expandable == [2, 7]
+
+
+def test_only_listed_relations_are_followed():
+    graph = nx.Graph()
+    graph.add_edge("Kant", "Hume", relation="influenced_by")
+    graph.add_edge("Kant", "Fichte", relation="student")
+    graph.add_edge("Hume", "Smith", relation="friend")
+
+    result = k_hop(graph, ["Kant"], hops=2, relations={"influenced_by"})
+
+    assert result.depth == {"Kant": 0, "Hume": 1}
+    assert [(u, v) for u, v, _ in result.links] == [("Kant", "Hume")]
+    # Hume's friendship is not followed, so nothing is left to expand
+    assert result.expandable == []
+
+
+def test_node_budget_truncates_with_true_distances():
+    graph = nx.gnp_random_graph(200, 0.05, seed=4)
+    result = k_hop(graph, [0], hops=3, max_nodes=25)
+
+    assert result.truncated
+    assert len(result.depth) == 25
+    distances = nx.single_source_shortest_path_length(graph, 0)
+    assert all(distances[node] == hop for node, hop in result.depth.items())
+    assert result.expandable == boundary(graph, result.depth)
+
+
+def test_edge_budget_truncates_links():
+    graph = nx.complete_graph(30)
+    result = k_hop(graph, [0], hops=1, max_edges=40)
+
+    assert result.truncated
+    assert len(result.depth) == 30
+    assert len(result.links) == 40
+    assert all(graph.has_edge(u, v) for u, v, _ in result.links)
+
+
+def test_a_hub_is_never_walked_in_full():
+    graph = CountingGraph()
+    graph.add_edges_from(("hub", leaf) for leaf in range(20000))
+    graph.add_edge(0, "tail")
+    CountingAdjacency.reads = 0
+
+    result = k_hop(graph, ["hub"], hops=2, max_nodes=20, max_edges=20, max_scan=100)
+
+    assert result.truncated
+    assert len(result.depth) <= 20 and len(result.links) <= 20
+    # Two scan budgets, plus one look-ahead entry per scanned node
+    assert CountingAdjacency.reads <= 2 * 100 + 3 * 20
+    assert "hub" in result.expandable
+
+
+def test_a_hub_reached_late_links_by_lookup():
+    graph = CountingGraph()
+    graph.add_edges_from(("hub", leaf) for leaf in range(20000))
+    CountingAdjacency.reads = 0
+
+    result = k_hop(graph, [0], hops=1)
+
+    assert result.depth == {0: 0, "hub": 1}
+    assert [(u, v) for u, v, _ in result.links] == [(0, "hub")]
+    assert result.expandable == ["hub"]
+    assert not result.truncated
+    assert CountingAdjacency.reads < 100
+
+
+@pytest.mark.parametrize("kwargs", [{"hops": -1}, {"max_nodes": 0}, {"max_edges": -1}])
+def test_invalid_budgets_raise(kwargs):
+    with pytest.raises(ValueError):
+        k_hop(nx.path_graph(3), [0], **kwargs)
+
+
+def test_subgraph_route(client):
+    ops = [
+        {"op": "upsert_edge", "source": "Kant", "target": "Hume"},
+        {"op": "upsert_edge", "source": "Hume", "target": "Smith"},
+    ]
+    assert client.post("/graph/batch", json={"ops": ops}).status_code == 200
+
+    response = client.get("/subgraph?seeds=Kant&hops=1")
+    data = response.get_json()
+    assert response.status_code == 200
+    assert [node["id"] for node in data["nodes"]] == ["Kant", "Hume"]
+    assert data["expandable"] == ["Hume"]
+    assert client.get("/subgraph?seeds=Kant&hops=-1").status_code == 400
+    assert client.get("/subgraph?seeds=Nobody").status_code == 404
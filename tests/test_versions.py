@@ -0,0 +1,74 @@
+import pytest
+
+from app import NeurosymbolicKnowledgeGraph
+from versions import fold, invert, summarize
+
+
+@pytest.fixture
+def kg(db):
+    kg = NeurosymbolicKnowledgeGraph()
+    kg.history.record_base(kg.version, kg.graph, "empty")
+    return kg
+
+
+def state(graph):
+    return (
+        {node: dict(data) for node, data in graph.nodes(data=True)},
+        {frozenset((u, v)): dict(data) for u, v, data in graph.edges(data=True)},
+    )
+
+
+def test_checkout_restores_earlier_states(kg):
+    kg.add_node("Kant", {"born": 1724})
+    kg.add_node("Hume")
+    kg.add_edge("Kant", "Hume", {"relation": "influenced_by"})
+    at_edge = state(kg.graph)
+    edge_version = kg.version
+    kg.add_node("Kant", {"born": 1725})
+    kg.apply_batch([{"op": "delete_node", "id": "Hume"}])
+
+    changes = kg.checkout(edge_version)
+    assert state(kg.graph) == at_edge
+    assert kg.version == edge_version + 3
+    assert summarize(changes)["nodes"] == {"added": 1, "removed": 0, "changed": 1}
+
+    kg.checkout(0)
+    assert kg.graph.number_of_nodes() == 0
+
+
+def test_checkout_of_unknown_version_raises(kg):
+    with pytest.raises(KeyError):
+        kg.checkout(42)
+
+
+def test_diff_between_versions_in_both_directions(kg):
+    kg.add_node("Kant")
+    start = kg.version
+    kg.add_node("Hegel", {"school": "idealism"})
+    kg.add_edge("Kant", "Hegel")
+    end = kg.version
+
+    forward = kg.history.changes(start, end)
+    assert summarize(forward) == {
+        "nodes": {"added": 1, "removed": 0, "changed": 0},
+        "edges": {"added": 1, "removed": 0, "changed": 0},
+    }
+    assert kg.history.changes(end, start) == invert(forward)
+    assert kg.history.changes(start, start) == []
+
+
+def test_diff_folds_changes_that_cancel_out(kg):
+    kg.add_node("Kant")
+    start = kg.version
+    kg.add_node("Hume")
+    kg.apply_batch([{"op": "delete_node", "id": "Hume"}])
+    assert kg.history.changes(start, kg.version) == []
+
+
+def test_fold_keeps_first_before_and_last_after():
+    changes = fold([
+        [("node", "a", None, {"x": 1})],
+        [("node", "a", {"x": 1}, {"x": 2})],
+        [("edge", ("b", "a"), None, {}), ("edge", ("a", "b"), {}, {"w": 1})],
+    ])
+    assert changes == [("node", "a", None, {"x": 2}), ("edge", ("b", "a"), None, {"w": 1})]
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import zlib
+
+import networkx as nx
+
+from database import (get_graph_snapshot, get_graph_version, has_graph_snapshot,
+                      latest_graph_base, latest_graph_version, list_graph_versions,
+                      load_graph_versions, put_graph_snapshot, record_graph_version)
+from graph_cache import CACHE_FORMAT
+
+# A change is (kind, key, before, after): kind "node" with a node id key or
+# "edge" with a (source, target) key; before/after are attribute dicts, None
+# when the node or edge does not exist on that side.
+
+
+def node_state(graph, node):
+    return dict(graph.nodes[node]) if node in graph else None
+
+
+def edge_state(graph, source, target):
+    return dict(graph.adj[source][target]) if graph.has_edge(source, target) else None
+
+
+def _identity(kind, key):
+    if kind == "node":
+        return kind, key
+    source, target = key
+    # Undirected: both orientations name the same edge
+    return kind, (source, target) if str(source) <= str(target) else (target, source)
+
+
+def _ordered(changes):
+    """Order net changes so they can be replayed in either direction.
+
+    Nodes that exist afterwards come first, then edges, then deleted nodes:
+    forwards, edges get their endpoints before them and lose them after;
+    backwards (reversed) the same holds for the ``before`` states.
+    """
+    kept = [c for c in changes if c[0] == "node" and c[3] is not None]
+    edges = [c for c in changes if c[0] == "edge"]
+    deleted = [c for c in changes if c[0] == "node" and c[3] is None]
+    return kept + edges + deleted
+
+
+def fold(change_lists):
+    """Net effect of consecutive change lists: first ``before`` and last ``after`` per element."""
+    net = {}
+    for changes in change_lists:
+        for kind, key, before, after in changes:
+            identity = _identity(kind, key)
+            if identity in net:
+                net[identity][3] = after
+            else:
+                net[identity] = [kind, key, before, after]
+    return _ordered([tuple(change) for change in net.values() if change[2] != change[3]])
+
+
+def invert(changes):
+    return _ordered([(kind, key, after, before) for kind, key, before, after in changes])
+
+
+def graph_changes(old, new):
+    """Changes turning graph ``old`` into graph ``new`` by comparing every node and edge."""
+    changes = []
+    for node in set(old.nodes) | set(new.nodes):
+        before, after = node_state(old, node), node_state(new, node)
+        if before != after:
+            changes.append(("node", node, before, after))
+    for source, target in old.edges:
+        before, after = edge_state(old, source, target), edge_state(new, source, target)
+        if before != after:
+            changes.append(("edge", (source, target), before, after))
+    for source, target in new.edges:
+        if not old.has_edge(source, target):
+            changes.append(("edge", (source, target), None, edge_state(new, source, target)))
+    return _ordered(changes)
+
+
+def apply_changes(graph, changes, reverse=False):
+    """Bring ``graph`` to the ``after`` states (the ``before`` states when ``reverse``)."""
+    for kind, key, before, after in reversed(changes) if reverse else changes:
+        state = before if reverse else after
+        if kind == "node":
+            if state is None:
+                if key in graph:
+                    graph.remove_node(key)
+            else:
+                graph.add_node(key)
+                attributes = graph.nodes[key]
+                attributes.clear()
+                attributes.update(state)
+        else:
+            source, target = key
+            if state is None:
+                if graph.has_edge(source, target):
+                    graph.remove_edge(source, target)
+            else:
+                graph.add_edge(source, target)
+                data = graph.adj[source][target]
+                data.clear()
+                data.update(state)
+
+
+def file_snapshot(file_digest):
+    # Bases recorded by an older loader do not match the graph it parses now
+    return f"file-{CACHE_FORMAT}-{file_digest}"
+
+
+def _decode(changes):
+    return [
+        (kind, tuple(key) if kind == "edge" else key, before, after)
+        for kind, key, before, after in json.loads(changes)
+    ]
+
+
+class VersionHistory:
+    """Persistent graph history: a full base snapshot plus per-version diffs.
+
+    Every recorded version stores only the before/after state of the nodes
+    and edges it touched, so going between versions replays those diffs
+    (forwards or backwards) instead of reloading whole graphs. Snapshots are
+    only written for bulk loads and only read when a request crosses one.
+    """
+
+    def __init__(self):
+        # Last version whose state was recorded; None until the history is read
+        self.head = None
+
+    def latest(self):
+        return latest_graph_version()
+
+    def record(self, version, changes, message=""):
+        record_graph_version(version, "diff", message, json.dumps(changes))
+        self.head = version
+
+    def record_base(self, version, graph, message="", file_digest=None):
+        """Record ``graph`` as a full snapshot.
+
+        With ``file_digest`` (the hash of the file the graph was loaded from)
+        the snapshot is keyed by it, so reloading an unchanged file reuses it
+        without serializing the graph again.
+        """
+        if file_digest is not None:
+            digest = file_snapshot(file_digest)
+            if not has_graph_snapshot(digest):
+                put_graph_snapshot(digest, self._encode(graph))
+        else:
+            data = self._encode(graph)
+            digest = hashlib.sha256(data).hexdigest()
+            put_graph_snapshot(digest, data)
+        record_graph_version(version, "base", message, snapshot=digest)
+        self.head = version
+
+    @staticmethod
+    def _encode(graph):
+        # Not node-link data: that format drops an ``id`` node attribute
+        return zlib.compress(json.dumps({
+            "graph": graph.graph,
+            "nodes": [[node, attributes] for node, attributes in graph.nodes(data=True)],
+            "edges": [[source, target, data] for source, target, data in graph.edges(data=True)],
+        }).encode())
+
+    @staticmethod
+    def _decode(data):
+        payload = json.loads(zlib.decompress(data))
+        graph = nx.Graph(**payload["graph"])
+        graph.add_nodes_from((node, attributes) for node, attributes in payload["nodes"])
+        graph.add_edges_from((source, target, data) for source, target, data in payload["edges"])
+        return graph
+
+    def versions(self, limit=50, before=None):
+        return [
+            {
+                "version": version,
+                "kind": kind,
+                "message": message,
+                "changes": count,
+                "created_at": created_at,
+            }
+            for version, kind, message, count, created_at in list_graph_versions(limit, before)
+        ]
+
+    def exists(self, version):
+        return get_graph_version(version) is not None
+
+    def materialize(self, version):
+        """The graph at ``version``: its nearest base snapshot plus the diffs after it."""
+        base = latest_graph_base(version)
+        if base is None:
+            raise ValueError(f"No snapshot at or before version {version}")
+        base_version, digest = base
+        graph = self._decode(get_graph_snapshot(digest))
+        for _, _, changes, _ in load_graph_versions(base_version, version):
+            apply_changes(graph, _decode(changes))
+        return graph
+
+    def changes(self, start, end):
+        """Net changes from the state at ``start`` to the state at ``end``.
+
+        Folds the diffs recorded in between; only when a base lies in between
+        are both versions materialized and compared.
+        """
+        low, high = sorted((start, end))
+        rows = load_graph_versions(low, high)
+        if any(kind == "base" for _, kind, _, _ in rows):
+            return graph_changes(self.materialize(start), self.materialize(end))
+        net = fold(_decode(changes) for _, _, changes, _ in rows)
+        return net if start <= end else invert(net)
+
+    def base_before(self, version):
+        base = latest_graph_base(version)
+        return base[0] if base else None
+
+    def restorable_from(self, file_digest):
+        """Latest version, if the newest base in the history was loaded from this file.
+
+        The stored graph then differs from the file only by the diffs
+        recorded since that base.
+        """
+        latest = self.latest()
+        base = latest_graph_base(latest)
+        if base is None or base[1] != file_snapshot(file_digest):
+            return None
+        return base[0], latest
+
+
+def summarize(changes):
+    """Counts of added/removed/changed nodes and edges in ``changes``."""
+    summary = {
+        kind: {"added": 0, "removed": 0, "changed": 0} for kind in ("nodes", "edges")
+    }
+    for kind, _, before, after in changes:
+        counts = summary[kind + "s"]
+        if before is None:
+            counts["added"] += 1
+        elif after is None:
+            counts["removed"] += 1
+        else:
+            counts["changed"] += 1
+    return summary